@@ -0,0 +1,205 @@
+'''
+This module contracts open 2D lattices one row at a time. The lattice below the current
+row is summarized by a boundary, a TreeTensor whose network is a chain with one external
+index per column. Each row is linked onto the boundary, merged into it column by column,
+and the doubled bonds along the chain are then truncated back in canonical form, which
+makes each truncation optimal for the boundary as a whole.
+
+Rows are requested from the caller one at a time, so only the boundary and a single row
+are ever held in memory. Row cells carry indices (left, right, down, up) as in
+TNR.Models.lattice.latticeCell, and those on the edges of the lattice have indices of
+dimension one in place of the missing bonds.
+'''
+import numpy as np
+
+from TNR.Network.link import Link
+from TNR.Network.node import Node
+from TNR.TreeTensor.treeTensor import TreeTensor
+from TNR.Tensor.arrayTensor import ArrayTensor
+from TNR.Utilities.plans import tensordot
+from TNR.Utilities.svd import rankByPrecision
+
+from TNR.Utilities.logger import makeLogger
+from TNR import config
+logger = makeLogger(__name__, config.levels['boundaryMPS'])
+
+
+def emptyBoundary(width, accuracy, dtype=None):
+    '''
+    Returns a chain TreeTensor of the specified width in which every index has dimension
+    one, which is the boundary below the first row of an open lattice.
+    '''
+    boundary = TreeTensor(accuracy, dtype=dtype)
+    nodes = []
+    for i in range(width):
+        rank = 1 + (i > 0) + (i < width - 1)
+        nodes.append(Node(ArrayTensor(np.ones((1,) * rank))))
+    for n1, n2 in zip(*(nodes[:-1], nodes[1:])):
+        Link(n1.buckets[-1], n2.buckets[0])
+    for n in nodes:
+        boundary.network.addNode(n)
+    boundary.externalBuckets = [n.buckets[int(i > 0)] for i, n in enumerate(nodes)]
+    return boundary
+
+
+def rowNodes(row):
+    '''
+    Returns Nodes holding the cells of a row, with the outer indices of the cells at its
+    ends removed, along with a dictionary for each Node from the names 'l', 'r', 'd' and
+    'u' to the Buckets which remain.
+    '''
+    nodes = []
+    buckets = []
+    for i, t in enumerate(row):
+        names = ['l', 'r', 'd', 'u']
+        arr = t.scaledArray
+        if i == len(row) - 1:
+            if arr.shape[1] != 1:
+                raise ValueError('Cells on the edge of the lattice must have dimension ' +
+                                 'one in place of the missing bond.')
+            arr = arr[:, 0]
+            names.remove('r')
+        if i == 0:
+            if arr.shape[0] != 1:
+                raise ValueError('Cells on the edge of the lattice must have dimension ' +
+                                 'one in place of the missing bond.')
+            arr = arr[0]
+            names.remove('l')
+        n = Node(ArrayTensor(arr, logScalar=t.logScalar, dtype=t.dtype))
+        nodes.append(n)
+        buckets.append(dict(zip(*(names, n.buckets))))
+    return nodes, buckets
+
+
+def chainArrays(boundary):
+    '''
+    Returns the arrays of the Nodes along the boundary, each with indices ordered as
+    (left, external, right) and with indices of dimension one standing in for the
+    missing bonds at the ends, the sum of their logScalars, and for each Node the order
+    of its Buckets.
+    '''
+    nodes = [b.node for b in boundary.externalBuckets]
+    arrs = []
+    orders = []
+    logScalar = 0
+    for i, n in enumerate(nodes):
+        order = []
+        if i > 0:
+            order.append(n.findLink(nodes[i - 1]))
+        order.append(boundary.externalBuckets[i])
+        if i < len(nodes) - 1:
+            order.append(n.findLink(nodes[i + 1]))
+        order = [b if not isinstance(b, Link) else
+                 (b.bucket1 if b.bucket1.node is n else b.bucket2) for b in order]
+
+        arr = np.transpose(n.tensor.scaledArray, [b.index for b in order])
+        shape = (order[0].size if i > 0 else 1,
+                 boundary.externalBuckets[i].size,
+                 order[-1].size if i < len(nodes) - 1 else 1)
+        arrs.append(np.reshape(arr, shape))
+        orders.append(order)
+        logScalar += n.tensor.logScalar
+    return arrs, logScalar, orders
+
+
+def canonicalize(boundary, accuracy, maxBond=None):
+    '''
+    Brings the boundary into canonical form and truncates each bond along it to the
+    specified accuracy, such that the discarded singular values carry at most that
+    fraction of the weight of the bond. Returns the largest bond dimension kept.
+    '''
+    arrs, logScalar, orders = chainArrays(boundary)
+
+    # Sweep right with QR decompositions, so that everything left of each bond is an
+    # isometry.
+    for i in range(len(arrs) - 1):
+        sh = arrs[i].shape
+        q, r = np.linalg.qr(np.reshape(arrs[i], (sh[0] * sh[1], sh[2])))
+        arrs[i] = np.reshape(q, (sh[0], sh[1], -1))
+        arrs[i + 1] = tensordot(r, arrs[i + 1], axes=((1,), (0,)))
+        scale = np.max(np.abs(arrs[i + 1]))
+        arrs[i + 1] /= scale
+        logScalar += np.log(scale)
+
+    # Sweep back truncating each bond, where its singular values are now the Schmidt
+    # coefficients of the boundary.
+    for i in range(len(arrs) - 1, 0, -1):
+        sh = arrs[i].shape
+        u, s, v = np.linalg.svd(np.reshape(arrs[i], (sh[0], -1)), full_matrices=False)
+        rank = rankByPrecision(s, accuracy, maxRank=maxBond)
+        arrs[i] = np.reshape(v[:rank], (rank, sh[1], sh[2]))
+        arrs[i - 1] = tensordot(arrs[i - 1], u[:, :rank] * s[:rank], axes=((2,), (0,)))
+        scale = np.max(np.abs(arrs[i - 1]))
+        arrs[i - 1] /= scale
+        logScalar += np.log(scale)
+
+    for i, (arr, order) in enumerate(zip(*(arrs, orders))):
+        sh = [arr.shape[0]] * (i > 0) + [arr.shape[1]] + [arr.shape[2]] * (i < len(arrs) - 1)
+        arr = np.transpose(np.reshape(arr, sh), np.argsort([b.index for b in order]))
+        n = order[0].node
+        n.tensor = ArrayTensor(arr, logScalar=logScalar if i == 0 else 0, dtype=n.tensor.dtype)
+
+    return max([1] + [a.shape[0] for a in arrs])
+
+
+def absorbRow(boundary, row, accuracy, maxBond=None):
+    '''
+    Contracts a row of cells into the boundary, whose external indices join the down
+    indices of the cells, and truncates the result. The up indices of the cells become
+    the external indices of the boundary. Returns the largest bond dimension kept.
+    '''
+    nodes = [b.node for b in boundary.externalBuckets]
+    cells, buckets = rowNodes(row)
+
+    for b1, b2 in zip(*(buckets[:-1], buckets[1:])):
+        Link(b1['r'], b2['l'])
+    for b, cb in zip(*(boundary.externalBuckets, buckets)):
+        Link(b, cb['d'])
+    for c in cells:
+        boundary.network.addNode(c)
+
+    nodes = [boundary.network.mergeNodes(n, c) for n, c in zip(*(nodes, cells))]
+    for n in nodes[:-1]:
+        boundary.network.mergeLinks(n)
+
+    boundary.externalBuckets = [b['u'] for b in buckets]
+    return canonicalize(boundary, accuracy, maxBond=maxBond)
+
+
+def boundaryMPS(rows, nRows, accuracy, maxBond=None, dtype=None):
+    '''
+    Contracts an open 2D lattice row by row.
+
+    The arguments are:
+            rows		-	A function taking the index of a row, counted from the bottom,
+                                    and returning a list of its cell Tensors from left to right.
+            nRows		-	The number of rows.
+            accuracy	-	The largest fraction of the weight of each bond of the
+                                    boundary which may be discarded after each row, as in the
+                                    SVD truncation used elsewhere in the package.
+            maxBond		-	The largest bond dimension to keep. If None there is no limit.
+            dtype		-	The dtype policy of the boundary.
+
+    Returns a rank-0 ArrayTensor holding the contraction, whose logScalar is the log of
+    the partition function.
+    '''
+    boundary = None
+    for y in range(nRows):
+        row = rows(y)
+        if boundary is None:
+            boundary = emptyBoundary(len(row), accuracy, dtype=dtype)
+        bond = absorbRow(boundary, row, accuracy, maxBond=maxBond)
+        logger.debug('Absorbed row ' + str(y) + ', bond dimension ' + str(bond) + '.')
+
+    # The external indices of the boundary now have dimension one.
+    arrs, logScalar, _ = chainArrays(boundary)
+    vec = np.ones(1)
+    for arr in arrs:
+        vec = tensordot(vec, arr[:, 0], axes=((0,), (0,)))
+        scale = np.max(np.abs(vec))
+        vec /= scale
+        logScalar += np.log(scale)
+
+    logger.info('Contracted ' + str(nRows) + ' rows of ' + str(len(arrs)) + ' cells.')
+
+    return ArrayTensor(vec[0], logScalar=logScalar)
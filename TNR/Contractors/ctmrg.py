@@ -0,0 +1,202 @@
+'''
+This module computes thermodynamic-limit properties of translation-invariant 2D models by
+the corner transfer matrix renormalization group (CTMRG, arXiv:0905.3225). The infinite
+lattice around a single cell is replaced by four corner matrices and four edge tensors
+of bond dimension at most chi, which are grown one row or column at a time and truncated
+back until they stop changing. The cost of each iteration is independent of the size of
+the lattice.
+
+Cell tensors carry indices (left, right, down, up) as in TNR.Models.lattice.latticeCell.
+The environment is numbered clockwise from the top-left:
+        C1[right, down]		T1[left, right, down]		C2[left, down]
+        T4[up, down, right]		cell					T2[up, down, left]
+        C4[up, right]		T3[left, right, up]		C3[up, left]
+where each index is named by the direction in which it points.
+'''
+import numpy as np
+
+from TNR.Utilities.plans import einsum
+from TNR.Utilities.svd import rankByPrecision
+
+from TNR.Utilities.logger import makeLogger
+from TNR import config
+logger = makeLogger(__name__, config.levels['ctmrg'])
+
+
+def rotate(cell, corners, edges):
+    '''
+    Returns the cell and environment rotated anticlockwise by a quarter turn, so that
+    what was above the cell is now to its left.
+    '''
+    c1, c2, c3, c4 = corners
+    t1, t2, t3, t4 = edges
+    cell = np.transpose(cell, (3, 2, 0, 1))
+    corners = [c2.T, c3, c4.T, c1]
+    edges = [t2, np.transpose(t3, (1, 0, 2)), t4, np.transpose(t1, (1, 0, 2))]
+    return cell, corners, edges
+
+
+def growLeft(cell, corners, edges, chi, accuracy, minRank=0):
+    '''
+    Absorbs a column of the lattice into the left side of the environment and truncates
+    the vertical bonds which this doubles. At least minRank states are kept on each, if
+    there are that many, whether or not they carry weight. Returns the new top-left
+    corner, left edge and bottom-left corner, which are not normalized, and the fraction
+    of weight discarded.
+    '''
+    c1, c2, c3, c4 = corners
+    t1, t2, t3, t4 = edges
+
+    # Grow the corners by an edge and the left edge by a cell, fusing the vertical bonds.
+    c1 = einsum('pq,prs->rqs', c1, t1)
+    c1 = np.reshape(c1, (c1.shape[0], -1))
+    c4 = einsum('qm,mns->qsn', c4, t3)
+    c4 = np.reshape(c4, (-1, c4.shape[-1]))
+    t4 = einsum('qvw,wxys->qsvyx', t4, cell)
+    sh = t4.shape
+    t4 = np.reshape(t4, (sh[0] * sh[1], sh[2] * sh[3], sh[4]))
+
+    # The projector onto the dominant part of the fused bond, from the corners on
+    # either side of it.
+    rho = np.dot(c1.T, c1.conj()) + np.dot(c4, c4.conj().T)
+    w, z = np.linalg.eigh((rho + rho.conj().T) / 2)
+    w = np.maximum(w[::-1], 0)
+    z = z[:, ::-1]
+    rank = max(rankByPrecision(np.sqrt(w), accuracy, maxRank=chi), min(minRank, len(w)))
+    error = 1 - np.sum(w[:rank]) / np.sum(w) if np.sum(w) > 0 else 0
+    z = z[:, :rank]
+
+    c1 = np.dot(c1, z)
+    c4 = np.dot(z.conj().T, c4)
+    t4 = einsum('ab,acr,cd->bdr', z.conj(), t4, z)
+    return c1, t4, c4, error
+
+
+def leftMove(cell, corners, edges, chi, accuracy):
+    '''
+    Absorbs a column of the lattice into the left side of the environment as in growLeft.
+    Returns the new environment and the fraction of weight discarded.
+    '''
+    c1, t4, c4, error = growLeft(cell, corners, edges, chi, accuracy)
+    _, c2, c3, _ = corners
+    t1, t2, t3, _ = edges
+
+    # The environment is only defined up to scale.
+    corners = [c1 / np.max(np.abs(c1)), c2, c3, c4 / np.max(np.abs(c4))]
+    edges = [t1, t2, t3, t4 / np.max(np.abs(t4))]
+    return corners, edges, error
+
+
+def surround(corners, edges, cell):
+    '''
+    Returns the contraction of the environment around the specified cell.
+    '''
+    c1, c2, c3, c4 = corners
+    t1, t2, t3, t4 = edges
+    return einsum('pq,prs,rt,qvw,wxys,tzx,vm,mny,zn->',
+                  c1, t1, c2, t4, cell, t2, c4, t3, c3)
+
+
+class CornerEnvironment:
+    '''
+    A CornerEnvironment holds the converged environment of a single cell of an infinite
+    square lattice, from which the free energy and local expectation values follow.
+    '''
+
+    def __init__(self, site, chi, accuracy=0, tol=1e-10, maxIter=1000):
+        '''
+        Takes as input:
+                site		-	The cell tensor, with indices ordered as in latticeCell.
+                chi			-	The largest bond dimension of the environment.
+                accuracy	-	The largest fraction of the weight of each environment
+                                        bond which may be discarded, in addition to the
+                                        limit set by chi.
+                tol			-	The change in the corner spectrum below which the
+                                        environment is taken to have converged.
+                maxIter		-	The largest number of iterations, each of which moves
+                                        in all four directions.
+
+        After construction the attribute converged records whether tol was reached,
+        iterations the number of iterations made, and history the change in the corner
+        spectrum and the largest discarded weight at each iteration.
+        '''
+        if site.rank != 4:
+            raise ValueError('CTMRG requires a cell tensor of rank 4. Got rank ' +
+                             str(site.rank) + '.')
+
+        self.site = site
+        self.chi = chi
+        self.cell = np.array(site.scaledArray)
+
+        # Start from the cell with its outward indices summed over.
+        a = self.cell
+        self.corners = [np.sum(a, axis=(0, 3)), np.sum(a, axis=(1, 3)),
+                        np.sum(a, axis=(1, 2)).T, np.sum(a, axis=(0, 2)).T]
+        self.edges = [np.sum(a, axis=3),
+                      np.transpose(np.sum(a, axis=1), (2, 1, 0)),
+                      np.sum(a, axis=2),
+                      np.transpose(np.sum(a, axis=0), (2, 1, 0))]
+
+        self.history = []
+        self.converged = False
+        spectrum = self.spectrum()
+        for self.iterations in range(1, maxIter + 1):
+            error = 0
+            cell, corners, edges = self.cell, self.corners, self.edges
+            for _ in range(4):
+                corners, edges, e = leftMove(cell, corners, edges, chi, accuracy)
+                error = max(error, e)
+                cell, corners, edges = rotate(cell, corners, edges)
+            self.corners, self.edges = corners, edges
+
+            new = self.spectrum()
+            n = max(len(new), len(spectrum))
+            change = np.max(np.abs(np.pad(new, (0, n - len(new))) -
+                                   np.pad(spectrum, (0, n - len(spectrum)))))
+            spectrum = new
+            self.history.append((change, error))
+            logger.debug('Iteration ' + str(self.iterations) + ': spectrum change ' +
+                         str(change) + ', discarded weight ' + str(error) + '.')
+            if change < tol:
+                self.converged = True
+                break
+
+        if self.converged:
+            logger.info('Converged in ' + str(self.iterations) + ' iterations at bond ' +
+                        'dimension ' + str(self.corners[0].shape) + '.')
+        else:
+            logger.warning('Did not converge in ' + str(self.iterations) +
+                           ' iterations. Last spectrum change ' + str(change) + '.')
+
+    def spectrum(self):
+        '''
+        Returns the singular values of the top-left corner, normalized to sum to one.
+        '''
+        s = np.linalg.svd(self.corners[0], compute_uv=False)
+        return s / np.sum(s)
+
+    def contract(self, cell):
+        '''
+        Returns the contraction of the environment around the specified cell.
+        '''
+        return surround(self.corners, self.edges, cell)
+
+    def logPartition(self):
+        '''
+        Returns the log of the partition function per site.
+        '''
+        c1, c2, c3, c4 = self.corners
+        t1, t2, t3, t4 = self.edges
+        full = self.contract(self.cell)
+        empty = einsum('pq,pt,tn,qn->', c1, c2, c3, c4)
+        rows = einsum('pq,prs,rt,qm,mns,tn->', c1, t1, c2, c4, t3, c3)
+        columns = einsum('pq,qvw,vm,pt,tzw,zm->', c1, t4, c4, c2, t2, c3)
+        return np.log(np.abs(full * empty / (rows * columns))) + self.site.logScalar
+
+    def expectation(self, impurity):
+        '''
+        Returns the expectation value of the observable inserted into the cell tensor
+        impurity, which must have the same shape as the site tensor.
+        '''
+        ratio = self.contract(np.array(impurity.scaledArray)) / self.contract(self.cell)
+        return ratio * np.exp(impurity.logScalar - self.site.logScalar)
@@ -0,0 +1,146 @@
+'''
+This module computes free energies of 2D models on infinitely long cylinders. On a
+cylinder of circumference W the free energy per site is log(lambda) / W, where lambda is
+the dominant eigenvalue of the column transfer operator: a ring of W cells joined along
+their down and up indices, mapping their left indices to their right ones.
+
+The operator is never formed. leadingEigenvalue finds lambda exactly with ARPACK's
+Arnoldi iteration, applying the ring one cell at a time, at a cost exponential in W.
+cylinderMPS instead holds the dominant eigenvector as a chain of bond dimension at most
+maxBond around the circumference and finds it by power iteration, applying each column
+with the boundary-MPS machinery of TNR.Contractors.boundaryMPS, at a cost linear in W.
+
+Cell tensors carry indices (left, right, down, up) as in TNR.Models.lattice.latticeCell.
+'''
+import numpy as np
+from scipy.sparse.linalg import LinearOperator, eigs
+
+from TNR.Tensor.arrayTensor import ArrayTensor
+from TNR.Contractors.boundaryMPS import absorbRow, chainArrays, emptyBoundary
+from TNR.Utilities.plans import tensordot, einsum
+
+from TNR.Utilities.logger import makeLogger
+from TNR import config
+logger = makeLogger(__name__, config.levels['cylinder'])
+
+
+def columnOperator(site, width):
+    '''
+    Returns the column transfer operator of a cylinder of the specified circumference as
+    a LinearOperator acting on the left indices of its cells, which are flattened in
+    order around the cylinder. The cells are normalized as in site.scaledArray.
+    '''
+    cell = np.asarray(site.scaledArray)
+    dim = cell.shape[0]
+
+    def matvec(v):
+        state = np.reshape(v, (dim,) * width)
+        state = np.moveaxis(tensordot(state, cell, axes=((0,), (0,))), -2, 0)
+        # The state holds (first down, remaining left, right so far, last up) indices.
+        for _ in range(width - 1):
+            state = tensordot(state, cell, axes=((1, state.ndim - 1), (0, 2)))
+        return np.reshape(np.trace(state, axis1=0, axis2=-1), (-1,))
+
+    return LinearOperator((dim**width, dim**width), matvec=matvec,
+                          dtype=np.result_type(cell.dtype, np.float64))
+
+
+def leadingEigenvalue(site, width):
+    '''
+    Returns the free energy per site, log(lambda) / width, of the cylinder of the
+    specified circumference from the exact dominant eigenvalue of its column transfer
+    operator.
+    '''
+    op = columnOperator(site, width)
+    if op.shape[0] <= 2:
+        # ARPACK needs room for its Krylov space, so tiny operators are formed densely.
+        w = np.linalg.eigvals(op.matmat(np.identity(op.shape[0])))
+    else:
+        w = eigs(op, k=1, which='LM', return_eigenvectors=False)
+    lam = np.max(np.abs(w))
+    return np.log(lam) / width + site.logScalar
+
+
+def columnCells(site, width):
+    '''
+    Returns the cells of a column as a row of the kind absorbed by boundaryMPS, running
+    around the cylinder. The bond closing the ring is carried alongside the others, so
+    the cells in between pass it through unchanged.
+    '''
+    cell = np.asarray(site.scaledArray)
+    dim = cell.shape[2]
+
+    # Along the row the down and up indices of the cells join one another, while their
+    # left indices face the boundary.
+    cell = np.transpose(cell, (2, 3, 0, 1))
+
+    if width == 1:
+        arrs = [einsum('wwlr->lr', cell)[np.newaxis, np.newaxis]]
+    else:
+        first = np.transpose(cell, (2, 1, 0, 3))
+        first = np.reshape(first, (1, cell.shape[2], -1, cell.shape[3]))
+        first = np.transpose(first, (0, 2, 1, 3))
+        middle = einsum('abcd,wv->awbvcd', cell, np.identity(dim))
+        sh = middle.shape
+        middle = np.reshape(middle, (sh[0] * sh[1], sh[2] * sh[3], sh[4], sh[5]))
+        last = np.reshape(cell, (-1, 1, cell.shape[2], cell.shape[3]))
+        arrs = [first] + [middle] * (width - 2) + [last]
+
+    return [ArrayTensor(a, logScalar=site.logScalar) for a in arrs]
+
+
+def logNorm(boundary):
+    '''
+    Returns the log of the norm of the vector held by a boundary.
+    '''
+    arrs, logScalar, _ = chainArrays(boundary)
+    env = np.ones((1, 1))
+    logSquare = 2 * logScalar
+    for arr in arrs:
+        env = einsum('ab,apc,bpd->cd', env, arr, arr.conj())
+        scale = np.max(np.abs(env))
+        env /= scale
+        logSquare += np.log(scale)
+    return (logSquare + np.log(np.abs(env[0, 0]))) / 2
+
+
+def cylinderMPS(site, width, accuracy, maxBond=None, tol=1e-10, maxIter=1000):
+    '''
+    Returns the free energy per site of the cylinder of the specified circumference by
+    power iteration on its column transfer operator.
+
+    The arguments are:
+            site		-	The cell tensor, with indices ordered as in latticeCell.
+            width		-	The circumference of the cylinder.
+            accuracy	-	The largest fraction of the weight of each bond of the
+                                    eigenvector which may be discarded after each step, as in
+                                    the SVD truncation used elsewhere in the package.
+            maxBond		-	The largest bond dimension of the eigenvector. If None there
+                                    is no limit.
+            tol			-	The change in the estimate below which iteration stops.
+            maxIter		-	The largest number of iterations.
+    '''
+    cells = columnCells(site, width)
+
+    # Start from the column with its left indices summed over.
+    start = [ArrayTensor(np.sum(c.scaledArray, axis=2, keepdims=True), logScalar=c.logScalar)
+             for c in cells]
+    boundary = emptyBoundary(width, accuracy)
+    absorbRow(boundary, start, accuracy, maxBond=maxBond)
+
+    prev = logNorm(boundary)
+    estimate = None
+    for iteration in range(maxIter):
+        bond = absorbRow(boundary, cells, accuracy, maxBond=maxBond)
+        norm = logNorm(boundary)
+        new = (norm - prev) / width
+        prev = norm
+        if estimate is not None and abs(new - estimate) < tol:
+            estimate = new
+            logger.info('Converged in ' + str(iteration + 1) + ' iterations at bond ' +
+                        'dimension ' + str(bond) + '.')
+            return estimate
+        estimate = new
+
+    logger.warning('Did not converge in ' + str(maxIter) + ' iterations.')
+    return estimate
@@ -0,0 +1,169 @@
+'''
+This module contracts series of open square lattices of growing size, as used in
+finite-size scaling studies, without contracting each size from scratch. The L by L
+lattice is held as four corner blocks and four edge strips around a single cell, with
+the environment layout of TNR.Contractors.ctmrg, and is grown into the (L+1) by (L+1)
+lattice by absorbing one column and one row into the blocks already contracted. Each
+size in the series therefore costs only the work of adding its outermost row and column,
+and a whole series costs the same as its largest member.
+
+Unlike CTMRG on the infinite lattice the corners start from the cells on the corners of
+an open lattice and the edges from those on its sides, and the scale of every block is
+kept, so that the contraction around the cell is the partition function of the lattice
+grown so far. The bonds of the blocks are truncated to at most chi states, chosen from
+the corners as in CTMRG. States which carry no weight in the current lattice may gain it
+once an edge is copied into a larger block, so up to chi states are always kept, and
+with no limit on chi the result is exact.
+
+A BlockCache holds the blocks of each model it has seen, keyed by the model parameters
+and chi, so that later requests for larger lattices continue from them.
+'''
+import numpy as np
+
+from TNR.Contractors.ctmrg import growLeft, rotate, surround
+from TNR.Utilities.plans import einsum
+
+from TNR.Utilities.logger import makeLogger
+from TNR import config
+logger = makeLogger(__name__, config.levels['finiteSize'])
+
+
+class CornerBlocks:
+    '''
+    CornerBlocks grows an open square lattice one row or column at a time and records the
+    log of the partition function of each square lattice it passes through.
+    '''
+
+    def __init__(self, cells, chi=None):
+        '''
+        Takes as input:
+                cells		-	A function taking a pair of pairs of booleans marking the
+                                        open sides of a cell, as in latticeCell, and returning
+                                        the cell Tensor with indices of dimension one on them.
+                chi			-	The largest bond dimension of the blocks. If None there is
+                                        no limit.
+
+        After construction the attribute logZ maps each side length reached to the log of
+        the partition function of that lattice, and error records the largest fraction of
+        weight discarded so far.
+        '''
+        self.chi = chi
+
+        def cell(left, right, down, up):
+            t = cells(((left, right), (down, up)))
+            return np.array(t.scaledArray), t.logScalar
+
+        # The 3 by 3 lattice, with the open indices of the outer cells summed over.
+        c1, l1 = cell(True, False, False, True)
+        c2, l2 = cell(False, True, False, True)
+        c3, l3 = cell(False, True, True, False)
+        c4, l4 = cell(True, False, True, False)
+        t1, e1 = cell(False, False, False, True)
+        t2, e2 = cell(False, True, False, False)
+        t3, e3 = cell(False, False, True, False)
+        t4, e4 = cell(True, False, False, False)
+        self.cell, self.cellLog = cell(False, False, False, False)
+
+        self.corners = [np.sum(c1, axis=(0, 3)), np.sum(c2, axis=(1, 3)),
+                        np.sum(c3, axis=(1, 2)).T, np.sum(c4, axis=(0, 2)).T]
+        self.edges = [np.sum(t1, axis=3),
+                      np.transpose(np.sum(t2, axis=1), (2, 1, 0)),
+                      np.sum(t3, axis=2),
+                      np.transpose(np.sum(t4, axis=0), (2, 1, 0))]
+        self.cornerLogs = [l1, l2, l3, l4]
+        self.edgeLogs = [e1, e2, e3, e4]
+
+        self.moves = 0
+        self.error = 0
+        self.logZ = {}
+
+        # The corners alone make up the 2 by 2 lattice.
+        z = einsum('pq,pt,tn,qn->', *self.corners)
+        self.logZ[2] = np.log(np.abs(z)) + sum(self.cornerLogs)
+        self.record()
+
+    def size(self):
+        '''
+        Returns the shape of the lattice held, in the orientation in which it was built.
+        '''
+        return (3 + (self.moves + 1) // 2, 3 + self.moves // 2)
+
+    def record(self):
+        '''
+        Records the partition function of the lattice held if it is square.
+        '''
+        nX, nY = self.size()
+        if nX == nY:
+            z = surround(self.corners, self.edges, self.cell)
+            self.logZ[nX] = np.log(np.abs(z)) + self.cellLog + \
+                sum(self.cornerLogs) + sum(self.edgeLogs)
+
+    def grow(self):
+        '''
+        Absorbs one column or row into the blocks, alternating between the sides of the
+        lattice so that it stays close to square.
+        '''
+        minRank = self.chi if self.chi is not None else np.inf
+        c1, t4, c4, error = growLeft(self.cell, self.corners, self.edges,
+                                     self.chi, 0, minRank=minRank)
+        self.error = max(self.error, error)
+
+        l1, l2, l3, l4 = self.cornerLogs
+        e1, e2, e3, e4 = self.edgeLogs
+        s1 = np.max(np.abs(c1))
+        s4 = np.max(np.abs(c4))
+        s = np.max(np.abs(t4))
+        self.corners = [c1 / s1, self.corners[1], self.corners[2], c4 / s4]
+        self.edges = self.edges[:3] + [t4 / s]
+        self.cornerLogs = [l1 + e1 + np.log(s1), l2, l3, l4 + e3 + np.log(s4)]
+        self.edgeLogs = [e1, e2, e3, e4 + self.cellLog + np.log(s)]
+
+        # Turn the lattice so that the next side to grow faces left.
+        self.cell, self.corners, self.edges = rotate(self.cell, self.corners, self.edges)
+        self.cornerLogs = self.cornerLogs[1:] + self.cornerLogs[:1]
+        self.edgeLogs = self.edgeLogs[1:] + self.edgeLogs[:1]
+
+        self.moves += 1
+        self.record()
+        logger.debug('Grew to ' + str(self.size()) + ', bond dimension ' +
+                     str(self.corners[0].shape) + ', discarded weight ' + str(error) + '.')
+
+    def logPartition(self, size):
+        '''
+        Returns the log of the partition function of the size by size lattice, growing
+        the blocks as far as needed.
+        '''
+        if size < 2:
+            raise ValueError('Lattice sides must be at least two. Got ' + str(size) + '.')
+        while size not in self.logZ:
+            self.grow()
+        return self.logZ[size]
+
+
+class BlockCache:
+    '''
+    A BlockCache holds CornerBlocks keyed by the parameters of their model and their
+    truncation, so that a series of lattice sizes, or several series with the same model,
+    reuse the blocks contracted for one another.
+    '''
+
+    def __init__(self):
+        self.blocks = {}
+
+    def logPartition(self, key, cells, size, chi=None):
+        '''
+        Returns the log of the partition function of the size by size open lattice.
+
+        The arguments are:
+                key			-	A hashable identifying the model, such as a tuple of its
+                                        parameters. Calls with equal keys must pass equivalent
+                                        cells.
+                cells		-	The function returning cell Tensors, as in CornerBlocks.
+                size		-	The side length of the lattice.
+                chi			-	The largest bond dimension of the blocks, or None.
+        '''
+        k = (key, chi)
+        if k not in self.blocks:
+            logger.debug('No blocks cached for ' + str(k) + '.')
+            self.blocks[k] = CornerBlocks(cells, chi=chi)
+        return self.blocks[k].logPartition(size)
@@ -1,21 +1,51 @@
+'''
+Each heuristic takes a network n and returns [metric, n1, n2] for the pair of Nodes it
+would merge next. Given a count it instead returns a list of up to count such candidates,
+ranked from best to worst, so that callers can fall back on the next best merge when the
+best one is declined.
+'''
 from TNR.TreeTensor.treeTensor import TreeTensor
 from TNR.Network.traceMin import traceMin
 import numpy as np
 import networkx
 
 
-def utilHeuristic(n):
-    biggest = [-1e100, None, None]
+def ranked(candidates, count, largest, default):
+    '''
+    Returns the best of the [metric, n1, n2] candidates, the first of any tied for best, or
+    default if there are none. If count is not None, returns instead the list of the best
+    count candidates from best to worst.
+    '''
+    sign = -1 if largest else 1
+    if count is not None:
+        return sorted(candidates, key=lambda c: sign * c[0])[:count]
+    if len(candidates) == 0:
+        return default
+    return min(candidates, key=lambda c: sign * c[0])
+
+
+def rankedRows(table, metric, i, j, count, largest):
+    '''
+    The counterpart of ranked for metrics computed over the edge rows of a NetworkTable,
+    where i and j hold the node rows of the ends of each edge.
+    '''
+    order = np.argsort(-metric if largest else metric, kind='stable')
+    candidates = [[metric[k], table.nodes[i[k]], table.nodes[j[k]]]
+                  for k in order[:1 if count is None else count]]
+    return candidates[0] if count is None else candidates
+
 
+def utilHeuristic(n, count=None):
     for n1 in n.nodes:
         for n2 in n1.connectedNodes:
             if n1.tensor.rank <= 2 or n2.tensor.rank <= 2:
-                return [1e20, n1, n2]
+                return ranked([[1e20, n1, n2]], count, True, None)
 
+    candidates = []
     for n1 in n.nodes:
         for n2 in n1.connectedNodes:
             length = len(n1.linksConnecting(n2))
-            connected = n1.connectedNodes
+            connected = set(n1.connectedNodes)
             connected.update(n2.connectedNodes)
             connected.remove(n1)
             connected.remove(n2)
@@ -23,52 +53,48 @@ def utilHeuristic(n):
             tm = traceMin(t.network, None)
             util = (length**2) / (n1.tensor.size * n2.tensor.size)
             util /= (1 + tm.util)**0.5
-            if util > biggest[0]:
-                biggest = [util, n1, n2]
+            candidates.append([util, n1, n2])
 
-    return biggest
+    return ranked(candidates, count, True, [-1e100, None, None])
 
 
-def entropyHeuristic(n):
+def entropyHeuristic(n, count=None):
     '''
     This method estimates the contraction in a network n which minimizes the resulting network entropy.
     '''
-    smallest = [1e20, None, None]
-    for nn in n.nodes:
-        for nnn in nn.connectedNodes:
-            length = nn.linksConnecting(nnn)[0].bucket1.size
-            metric = nn.tensor.size * nnn.tensor.size / length**2
-            commonNodes = set(
-                nn.connectedNodes).intersection(
-                nnn.connectedNodes)
-            metric *= 0.7**len(commonNodes)
-            metric = metric - nn.tensor.size - nnn.tensor.size
-            if metric < smallest[0]:
-                smallest[0] = metric
-                smallest[1] = nn
-                smallest[2] = nnn
-    return smallest
-
-
-def mergeHeuristic(n):
+    table = n.table
+    rows = table.edges()
+    if len(rows) == 0:
+        return ranked([], count, False, [1e20, None, None])
+
+    i, j = table.ends[rows].T
+    size1 = table.size[i]
+    size2 = table.size[j]
+    metric = size1 * size2 / table.dim[rows]**2
+    metric *= 0.7**table.commonNeighbours(rows)
+    metric = metric - size1 - size2
+
+    return rankedRows(table, metric, i, j, count, False)
+
+
+def mergeHeuristic(n, count=None):
     '''
     This method estimates the contraction in a network n which maximizes the number of merged links.
     '''
-    biggest = [-1e20, None, None]
-    for nn in n.nodes:
-        for nnn in nn.connectedNodes:
-            if nnn.tensor.rank <= 2 or nn.tensor.rank <= 2:
-                return [1e20, nn, nnn]
-            commonNodes = set(
-                nn.connectedNodes).intersection(
-                nnn.connectedNodes)
-            metric = len(commonNodes)
-            if metric > biggest[0]:
-                biggest = [metric, nn, nnn]
-    return biggest
-
-
-def smallLoopHeuristic(n):
+    table = n.table
+    rows = table.edges()
+    if len(rows) == 0:
+        return ranked([], count, True, [-1e20, None, None])
+
+    # Merges involving a Node of rank at most two come first.
+    i, j = table.ends[rows].T
+    metric = table.commonNeighbours(rows).astype(float)
+    metric[(table.rank[i] <= 2) | (table.rank[j] <= 2)] = 1e20
+
+    return rankedRows(table, metric, i, j, count, True)
+
+
+def smallLoopHeuristic(n, count=None):
     '''
     This method estimates the contraction in a network which minimizes the size of the loop which
     is eliminated in the process while penalizing rank increases.
@@ -81,7 +107,7 @@ def smallLoopHeuristic(n):
     and picks the smallest weight. This means that it prioritizes handling smaller tensors,
     handling smaller loops, and handling pairs of tensors which share many nodes.
     '''
-    smallest = [1e20, None, None]
+    candidates = []
     for nn in n.nodes:
         for nnn in nn.connectedNodes:
             indices = nn.indicesConnecting(nnn)
@@ -112,20 +138,16 @@ def smallLoopHeuristic(n):
                 length -= len(commonNodes)
                 length += nn.tensor.rank
                 length += nnn.tensor.rank
-            metric = length
-            if metric < smallest[0]:
-                smallest[0] = metric
-                smallest[1] = nn
-                smallest[2] = nnn
-    return smallest
+            candidates.append([length, nn, nnn])
+    return ranked(candidates, count, False, [1e20, None, None])
 
 
-def loopHeuristic(n):
+def loopHeuristic(n, count=None):
     '''
     This method estimates the contraction in a network which maximizes the size of the loop which
     is eliminated in the process.
     '''
-    biggest = [-1, None, None]
+    candidates = []
     for nn in n.nodes:
         for nnn in nn.connectedNodes:
             indices = nn.indicesConnecting(nnn)
@@ -148,21 +170,18 @@ def loopHeuristic(n):
                                 indices[1][i], indices[1][j])
                             if length1 > length:
                                 length = length1
-            if length > biggest[0]:
-                biggest[0] = length
-                biggest[1] = nn
-                biggest[2] = nnn
-    return biggest
+            candidates.append([length, nn, nnn])
+    return ranked(candidates, count, True, [-1, None, None])
 
 
-def oneLoopHeuristic(n):
+def oneLoopHeuristic(n, count=None):
     '''
     This method estimates the contraction in a network which maximizes the size of the loop which
     is eliminated in the process.
     '''
     node = next(iter(n.nodes))
 
-    biggest = [100000, None, None]
+    candidates = []
     for nnn in node.connectedNodes:
         indices = node.indicesConnecting(nnn)
         length = 10000
@@ -176,8 +195,5 @@ def oneLoopHeuristic(n):
                             indices[0][i], indices[0][j])
                         if length1 < length:
                             length = length1
-        if length < biggest[0]:
-            biggest[0] = length
-            biggest[1] = node
-            biggest[2] = nnn
-    return biggest
+        candidates.append([length, node, nnn])
+    return ranked(candidates, count, False, [100000, None, None])
@@ -0,0 +1,310 @@
+'''
+This module contracts translation-invariant networks by higher-order tensor
+renormalization (HOTRG). Rather than merging the sites of a network one pair at a time,
+the unit-cell tensor of a periodic hypercubic lattice is coarse-grained directly: each
+step contracts two copies of it along one axis and truncates the doubled bonds along the
+others with a higher-order SVD, halving the number of sites. A lattice of N sites is
+therefore contracted in log2(N) steps. hotrg handles periodic lattices, whose cells are
+all the same. hotrgOpen handles open lattices, keeping one tensor for each kind of cell
+according to where it lies relative to the boundary.
+
+Cell tensors carry one index before and one after the site along each axis in turn, as
+returned by TNR.Models.lattice.latticeCell.
+'''
+import itertools
+import numpy as np
+
+from TNR.Tensor.arrayTensor import ArrayTensor
+from TNR.Utilities.plans import tensordot
+from TNR.Utilities.svd import rankByPrecision
+
+from TNR.Utilities.logger import makeLogger
+from TNR import config
+logger = makeLogger(__name__, config.levels['hotrg'])
+
+
+def gramSpectrum(arr, ind):
+    '''
+    Returns the eigenvectors and eigenvalues of the Gram matrix of arr over the specified
+    index, in order of decreasing eigenvalue.
+    '''
+    mat = np.moveaxis(arr, ind, 0).reshape((arr.shape[ind], -1))
+    w, u = np.linalg.eigh(np.dot(mat, mat.conj().T))
+    w = np.maximum(w[::-1], 0)
+    u = u[:, ::-1]
+    return u, w
+
+
+def chooseIsometry(spectra, precision, maxBond=None):
+    '''
+    Returns the isometry used to truncate a bond and the fraction of the weight it
+    discards, given the Gram spectra, as returned by gramSpectrum, of the indices on its
+    two ends.
+
+    The isometry is chosen from whichever end loses less weight when truncated to the
+    rank required by the precision, and is then applied to both so that the bond stays
+    consistent.
+    '''
+    rank = max(rankByPrecision(np.sqrt(w), precision, maxRank=maxBond)
+               for _, w in spectra)
+
+    best = None
+    for u, w in spectra:
+        total = np.sum(w)
+        error = 1 - np.sum(w[:rank]) / total if total > 0 else 0
+        if best is None or error < best[1]:
+            best = (u[:, :rank], error)
+    return best
+
+
+def truncation(arr, minus, plus, precision, maxBond=None):
+    '''
+    Returns the isometry used to truncate the pair of indices minus and plus of arr, which
+    are joined to one another across the boundary of the cell, and the fraction of the
+    weight it discards.
+    '''
+    return chooseIsometry([gramSpectrum(arr, i) for i in (minus, plus)], precision,
+                          maxBond=maxBond)
+
+
+def truncate(cell, axis, u, before=True, after=True):
+    '''
+    Applies the isometry u to the indices of cell before and after the site along the
+    specified axis. The index before the site takes its conjugate, so that contracting
+    the index after one cell with the index before the next projects their bond onto u.
+    '''
+    if before:
+        cell = np.moveaxis(tensordot(cell, u.conj(), axes=((2 * axis,), (0,))), -1, 2 * axis)
+    if after:
+        cell = np.moveaxis(tensordot(cell, u, axes=((2 * axis + 1,), (0,))), -1, 2 * axis + 1)
+    return cell
+
+
+def join(left, right, axis):
+    '''
+    Returns the contraction of the cell tensors left and right, with right following left
+    along the specified axis. Along every other axis the indices of the two are paired into
+    a single index, that of left varying slowest.
+    '''
+    ndim = left.ndim // 2
+
+    # Join the index after the first copy to the index before the second one. The
+    # remaining indices of the first copy come first, then those of the second.
+    joined = tensordot(left, right, axes=((2 * axis + 1,), (2 * axis,)))
+    first = [i for i in range(2 * ndim) if i != 2 * axis + 1]
+    second = [i for i in range(2 * ndim) if i != 2 * axis]
+
+    # Pair up the indices of the two copies along every other axis.
+    perm = []
+    shape = []
+    for d in range(ndim):
+        if d == axis:
+            perm += [first.index(2 * d), len(first) + second.index(2 * d + 1)]
+            shape += [left.shape[2 * d], right.shape[2 * d + 1]]
+        else:
+            for i in (2 * d, 2 * d + 1):
+                perm += [first.index(i), len(first) + second.index(i)]
+                shape.append(left.shape[i] * right.shape[i])
+    return np.reshape(np.transpose(joined, perm), shape)
+
+
+def coarseGrain(arr, axis, precision, maxBond=None):
+    '''
+    Contracts two copies of the cell tensor arr along the specified axis and truncates the
+    doubled indices along every other axis.
+
+    The arguments are:
+            arr			-	The cell tensor.
+            axis		-	The axis along which to join the copies.
+            precision	-	The largest fraction of the weight of each bond which may be
+                                    discarded.
+            maxBond		-	The largest bond dimension to keep. If None there is no limit.
+
+    Returns the new cell tensor, normalized so its largest element has magnitude one, the
+    log of the factor removed in doing so and the largest fraction of weight discarded.
+    '''
+    cell = join(arr, arr, axis)
+
+    worst = 0
+    for d in range(arr.ndim // 2):
+        if d == axis:
+            continue
+        u, error = truncation(cell, 2 * d, 2 * d + 1, precision, maxBond=maxBond)
+        worst = max(worst, error)
+        cell = truncate(cell, d, u)
+
+    scale = np.max(np.abs(cell))
+    return cell / scale, np.log(scale), worst
+
+
+def hotrg(site, shape, accuracy, maxBond=None):
+    '''
+    Contracts the periodic hypercubic lattice of the specified shape with the cell tensor
+    site on every site.
+
+    The arguments are:
+            site		-	The cell tensor, with indices ordered as in latticeCell.
+            shape		-	The shape of the lattice. Each side must be a power of two.
+            accuracy	-	The largest fraction of the weight of each bond which may be
+                                    discarded at each step, as in the SVD truncation used
+                                    elsewhere in the package.
+            maxBond		-	The largest bond dimension to keep. If None there is no limit.
+
+    Returns a rank-0 ArrayTensor holding the contraction, whose logScalar is the log of
+    the partition function.
+    '''
+    shape = list(shape)
+    if site.rank != 2 * len(shape):
+        raise ValueError('Cell tensor has rank ' + str(site.rank) +
+                         ' but the lattice has ' + str(len(shape)) + ' dimensions.')
+    for s in shape:
+        if s < 1 or s & (s - 1) != 0:
+            raise ValueError('Lattice sides must be powers of two. Got ' + str(shape) + '.')
+
+    arr = np.array(site.scaledArray)
+    logScalar = site.logScalar
+
+    step = 0
+    while max(shape) > 1:
+        # Join along the longest remaining axis, so the cell stays close to isotropic.
+        axis = int(np.argmax(shape))
+        arr, logScale, error = coarseGrain(arr, axis, accuracy, maxBond=maxBond)
+        # Both copies carried the old prefactor.
+        logScalar = 2 * logScalar + logScale
+        shape[axis] //= 2
+        step += 1
+        logger.debug('Step ' + str(step) + ': joined along axis ' + str(axis) +
+                     ', cell shape ' + str(arr.shape) + ', discarded weight ' +
+                     str(error) + '.')
+
+    # The remaining cell spans the whole lattice, so each pair of indices wraps around.
+    labels = [d for d in range(len(shape)) for _ in range(2)]
+    z = np.einsum(arr, labels, [])
+
+    logger.info('Contracted ' + str(2**step) + ' sites in ' + str(step) + ' steps.')
+
+    return ArrayTensor(z, logScalar=logScalar)
+
+
+def sideTypes(length):
+    '''
+    Returns the kinds of cell along an axis of an open lattice of the specified length:
+    the first and last cells, which lack the bond before and after them respectively, and
+    the bulk cells between them. A lattice of length one has a single cell lacking both.
+    '''
+    if length == 1:
+        return ['single']
+    if length == 2:
+        return ['first', 'last']
+    return ['first', 'bulk', 'last']
+
+
+# The sides of each kind of cell on which there is no bond, as in latticeCell.
+openSides = {'single': (True, True), 'first': (True, False),
+             'bulk': (False, False), 'last': (False, True)}
+
+
+def sideSources(length):
+    '''
+    Returns a dictionary mapping each kind of cell along an axis of an open lattice, once
+    its length is halved, to the pair of kinds of cell joined to make it.
+    '''
+    half = length // 2
+    if half == 1:
+        return {'single': ('first', 'last')}
+    sources = {'first': ('first', 'bulk'), 'last': ('bulk', 'last')}
+    if half > 2:
+        sources['bulk'] = ('bulk', 'bulk')
+    return sources
+
+
+def hotrgOpen(cells, shape, accuracy, maxBond=None):
+    '''
+    Contracts the open hypercubic lattice of the specified shape.
+
+    Cells of an open lattice differ according to whether they lie on its boundary, so
+    rather than a single cell tensor one is kept for each kind of cell: along each axis a
+    cell is either the first, the last or one of the bulk cells between them. All bulk
+    cells along an axis are the same, so each step joins pairs of kinds of cell as hotrg
+    joins pairs of cells, and the lattice is contracted in as many steps as the periodic
+    one. Each bond is truncated with one isometry for all the cells along a row, chosen
+    from the bulk cell of the row if it has one.
+
+    The arguments are:
+            cells		-	A function taking a sequence of pairs of booleans marking the
+                                    open sides of a cell, as in latticeCell, and returning the
+                                    cell Tensor with indices of dimension one on them.
+            shape		-	The shape of the lattice. Each side must be a power of two.
+            accuracy	-	As in hotrg.
+            maxBond		-	The largest bond dimension to keep. If None there is no limit.
+
+    Returns a rank-0 ArrayTensor holding the contraction, whose logScalar is the log of
+    the partition function.
+    '''
+    shape = list(shape)
+    for s in shape:
+        if s < 1 or s & (s - 1) != 0:
+            raise ValueError('Lattice sides must be powers of two. Got ' + str(shape) + '.')
+    ndim = len(shape)
+
+    # The tensor and log prefactor of each kind of cell, keyed by its kind along each axis.
+    blocks = {}
+    for kinds in itertools.product(*[sideTypes(s) for s in shape]):
+        t = cells(tuple(openSides[k] for k in kinds))
+        if t.rank != 2 * ndim:
+            raise ValueError('Cell tensor has rank ' + str(t.rank) +
+                             ' but the lattice has ' + str(ndim) + ' dimensions.')
+        blocks[kinds] = (np.array(t.scaledArray), t.logScalar)
+
+    step = 0
+    while max(shape) > 1:
+        axis = int(np.argmax(shape))
+        sources = sideSources(shape[axis])
+        shape[axis] //= 2
+
+        joined = {}
+        for kinds in itertools.product(*[sideTypes(s) for s in shape]):
+            left, right = (kinds[:axis] + (k,) + kinds[axis + 1:]
+                           for k in sources[kinds[axis]])
+            joined[kinds] = (join(blocks[left][0], blocks[right][0], axis),
+                             blocks[left][1] + blocks[right][1])
+        blocks = joined
+
+        worst = 0
+        for d in range(ndim):
+            if d == axis or shape[d] == 1:
+                continue
+
+            # Truncate the bonds of each row of cells along d with one isometry.
+            for kinds in itertools.product(*[sideTypes(s) if e != d else [None]
+                                             for e, s in enumerate(shape)]):
+                row = {k: kinds[:d] + (k,) + kinds[d + 1:] for k in sideTypes(shape[d])}
+                if 'bulk' in row:
+                    u, error = truncation(blocks[row['bulk']][0], 2 * d, 2 * d + 1,
+                                          accuracy, maxBond=maxBond)
+                else:
+                    spectra = [gramSpectrum(blocks[row['first']][0], 2 * d + 1),
+                               gramSpectrum(blocks[row['last']][0], 2 * d)]
+                    u, error = chooseIsometry(spectra, accuracy, maxBond=maxBond)
+                worst = max(worst, error)
+                for k, key in row.items():
+                    arr, logScalar = blocks[key]
+                    blocks[key] = (truncate(arr, d, u, before=k != 'first',
+                                            after=k != 'last'), logScalar)
+
+        for kinds, (arr, logScalar) in blocks.items():
+            scale = np.max(np.abs(arr))
+            blocks[kinds] = (arr / scale, logScalar + np.log(scale))
+
+        step += 1
+        logger.debug('Step ' + str(step) + ': joined along axis ' + str(axis) + ', ' +
+                     str(len(blocks)) + ' kinds of cell, discarded weight ' +
+                     str(worst) + '.')
+
+    # Only one cell remains, and every index on it is open.
+    arr, logScalar = blocks[('single',) * ndim]
+    z = np.sum(arr)
+
+    logger.info('Contracted ' + str(2**step) + ' sites in ' + str(step) + ' steps.')
+
+    return ArrayTensor(z, logScalar=logScalar)
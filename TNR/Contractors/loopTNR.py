@@ -0,0 +1,177 @@
+'''
+This module contracts translation-invariant square lattices by loop tensor network
+renormalization (Loop-TNR, arXiv:1512.04938). Each step is a TRG step: every cell tensor
+is split in two along a diagonal, and the halves meeting around every other plaquette
+are contracted into a new cell tensor, halving the number of cells and rotating the
+lattice by 45 degrees.
+
+Truncating each split separately, as TRG does, keeps short-range correlations around
+the remaining plaquettes which build up near criticality. Loop-TNR instead treats the
+eight halves around one of those plaquettes as a ring and optimizes them together, with
+the machinery in TNR.TensorLoopOptimization.loopOpt, so that the ring as a whole stays
+as close as possible to the four cells it replaces.
+
+The lattice is bipartite, with cells A on sites whose coordinates sum to an even number
+and cells B on the others. Cell tensors carry indices (left, right, down, up) as in
+TNR.Models.lattice.latticeCell.
+
+Around a plaquette with B cells at its lower-left and upper-right corners the ring runs
+anticlockwise through
+        p0	-	Lower-right half of the lower-left cell (B).
+        p1	-	Lower-left half of the lower-right cell (A).
+        p2	-	Upper-right half of the lower-right cell (A).
+        p3	-	Lower-right half of the upper-right cell (B).
+        p4	-	Upper-left half of the upper-right cell (B).
+        p5	-	Upper-right half of the upper-left cell (A).
+        p6	-	Lower-left half of the upper-left cell (A).
+        p7	-	Upper-left half of the lower-left cell (B).
+each of which is a rank-3 tensor whose first and last indices join its neighbours in the
+ring and whose middle index points away from the plaquette.
+'''
+import numpy as np
+
+from TNR.Tensor.arrayTensor import ArrayTensor
+from TNR.TensorLoopOptimization.loopOpt import optimizeRank, norm
+from TNR.Utilities.svd import rankByPrecision
+
+from TNR.Utilities.logger import makeLogger
+from TNR import config
+logger = makeLogger(__name__, config.levels['loopTNR'])
+
+
+def split(arr, left, right, precision, maxBond=None):
+    '''
+    Splits arr in two by SVD, with the specified indices on the left and the rest on the
+    right, truncating the new bond as specified. Returns the halves, each of which has
+    the new bond as its last and first index respectively.
+    '''
+    rest = [i for i in range(arr.ndim) if i not in left]
+    mat = np.transpose(arr, left + rest)
+    shape = mat.shape
+    mat = np.reshape(mat, (int(np.prod(shape[:len(left)])), -1))
+
+    u, s, v = np.linalg.svd(mat, full_matrices=False)
+    rank = rankByPrecision(s, precision, maxRank=maxBond)
+    s = np.sqrt(s[:rank])
+    u = np.reshape(u[:, :rank] * s, shape[:len(left)] + (rank,))
+    v = np.reshape(s[:, np.newaxis] * v[:rank], (rank,) + shape[len(left):])
+    return u, v
+
+
+def ring(a, b, precision, maxBond=None):
+    '''
+    Splits the cells a and b along their diagonals and returns the halves in ring order.
+    '''
+    # a = a1 a3, with a1 holding (left, down) and a3 holding (right, up).
+    a1, a3 = split(a, [0, 2], [1, 3], precision, maxBond=maxBond)
+    # b = b2 b4, with b2 holding (left, up) and b4 holding (right, down).
+    b2, b4 = split(b, [0, 3], [1, 2], precision, maxBond=maxBond)
+
+    return [np.transpose(b4, (0, 2, 1)),
+            a1,
+            a3,
+            np.transpose(b4, (2, 1, 0)),
+            np.transpose(b2, (2, 1, 0)),
+            np.transpose(a3, (1, 2, 0)),
+            np.transpose(a1, (2, 0, 1)),
+            np.transpose(b2, (1, 0, 2))]
+
+
+def coarseGrain(a, b, precision, maxBond=None, tol=1e-6, maxSweeps=10):
+    '''
+    Performs one Loop-TNR step on the lattice with cells a and b.
+
+    The arguments are:
+            a, b		-	The cell tensors, normalized to order one.
+            precision	-	The largest fraction of the weight of each split which may
+                                    be discarded.
+            maxBond		-	The largest bond dimension to keep. If None there is no limit.
+            tol			-	The relative change in the error of the ring below which loop
+                                    optimization stops.
+            maxSweeps	-	The largest number of loop optimization sweeps.
+
+    Returns the new cells and the relative error of the ring.
+    '''
+    exact = ring(a, b, 0)
+    halves = ring(a, b, precision, maxBond=maxBond)
+
+    # The norm of the ring is cheapest to find with each cell whole.
+    cells = [np.einsum('aib,bjc->aijc', exact[i], exact[(i + 1) % 8]) for i in (1, 3, 5, 7)]
+    target = norm([np.reshape(c, (c.shape[0], -1, c.shape[-1])) for c in cells])
+
+    if any(h.shape != e.shape for h, e in zip(*(halves, exact))):
+        halves, err = optimizeRank(exact, None, tol, start=halves,
+                                   maxSweeps=maxSweeps, target=target)
+    else:
+        # Nothing was truncated, so the ring is already exact.
+        err = 0
+
+    p0, p1, p2, p3, p4, p5, p6, p7 = halves
+
+    # The new cells sit on the plaquettes on either side of the ring, rotated by 45
+    # degrees so that their left and right indices join along the old diagonal.
+    a = np.einsum('uLT,TRr,dRB,BLl->lrdu', p0, p1, p4, p5)
+    b = np.einsum('lBE,ETu,rTW,WBd->lrdu', p2, p3, p6, p7)
+
+    return a, b, max(err, 0) / target
+
+
+def loopTNR(site, shape, accuracy, maxBond=None, tol=1e-6, maxSweeps=10):
+    '''
+    Contracts the periodic square lattice of the specified shape with the cell tensor site
+    on every site.
+
+    The arguments are:
+            site		-	The cell tensor, with indices ordered as in latticeCell.
+            shape		-	The shape of the lattice, which must be square with sides a
+                                    power of two.
+            accuracy	-	The largest fraction of the weight of each split which may be
+                                    discarded, as in the SVD truncation used elsewhere in the
+                                    package.
+            maxBond		-	The largest bond dimension to keep. If None there is no limit.
+            tol			-	The relative change in the error of each ring below which
+                                    loop optimization stops.
+            maxSweeps	-	The largest number of loop optimization sweeps per step.
+
+    Returns a rank-0 ArrayTensor holding the contraction, whose logScalar is the log of
+    the partition function.
+    '''
+    if site.rank != 4 or len(shape) != 2:
+        raise ValueError('Loop-TNR requires a two-dimensional lattice.')
+    nX, nY = shape
+    if nX != nY or nX < 2 or nX & (nX - 1) != 0:
+        raise ValueError('Lattice must be square with sides a power of two. Got ' +
+                         str(shape) + '.')
+
+    a = np.array(site.scaledArray)
+    b = a
+    logA = site.logScalar
+    logB = site.logScalar
+
+    # The log of the factors removed from the cells so far.
+    logScalar = 0
+    cells = nX * nY
+
+    step = 0
+    while cells > 2:
+        logScalar += (cells // 2) * (logA + logB)
+        a, b, err = coarseGrain(a, b, accuracy, maxBond=maxBond,
+                                tol=tol, maxSweeps=maxSweeps)
+        scaleA = np.max(np.abs(a))
+        scaleB = np.max(np.abs(b))
+        a = a / scaleA
+        b = b / scaleB
+        logA = np.log(scaleA)
+        logB = np.log(scaleB)
+        cells //= 2
+        step += 1
+        logger.debug('Step ' + str(step) + ': cell shape ' + str(a.shape) +
+                     ', ring error ' + str(err) + '.')
+
+    # The two remaining cells neighbour one another across every index.
+    logScalar += logA + logB
+    z = np.einsum('lrdu,rlud->', a, b)
+
+    logger.info('Contracted ' + str(nX * nY) + ' sites in ' + str(step) + ' steps.')
+
+    return ArrayTensor(z, logScalar=logScalar)
@@ -1,17 +1,144 @@
+from collections import OrderedDict
+
 from TNR.TreeTensor.treeTensor import TreeTensor
+from TNR.Tensor.arrayTensor import ArrayTensor
+from TNR.Network.node import Node
 from TNR.Network.traceMin import traceMin
 import numpy as np
 import networkx
 import matplotlib.pyplot as plt
 import matplotlib.cm as cm
 
+from TNR.Utilities.memory import accountant
+from TNR.Utilities.fingerprint import digest, mergeFingerprint
+
 from TNR.Utilities.logger import makeLogger
 from TNR import config
 logger = makeLogger(__name__, config.levels['mergeContractor'])
 
-#import resource
-#soft, hard = resource.getrlimit(resource.RLIMIT_AS)
-#resource.setrlimit(resource.RLIMIT_AS, (config.mem_limit, hard))
+
+def admissibleMerge(n, heuristic, count=None):
+    '''
+    Returns a pair of connected Nodes in the network n whose merge is predicted to fit
+    within the memory budget. The best count candidates of the heuristic are tried in
+    order first, count defaulting to admissibleCandidates in the config file. Only if none
+    of them fits is every merge in the network predicted, and the smallest taken.
+    Raises a MemoryError if no merge fits.
+    '''
+    if count is None:
+        count = config.admissibleCandidates
+
+    for _, n1, n2 in heuristic(n, count=count):
+        if accountant.admits(accountant.predictMerge(n1, n2)):
+            return n1, n2
+
+    best = [None, None, None]
+    for n1 in n.nodes:
+        for n2 in n1.connectedNodes:
+            nbytes = accountant.predictMerge(n1, n2)
+            if best[0] is None or nbytes < best[0]:
+                best = [nbytes, n1, n2]
+
+    if best[0] is None or not accountant.admits(best[0]):
+        raise MemoryError('No merge fits within the memory budget. Resident: ' +
+                          str(accountant.resident) + ' bytes. Smallest merge: ' +
+                          str(best[0]) + ' bytes. Limit: ' + str(accountant.limit) + ' bytes.')
+
+    return best[1], best[2]
+
+
+def sliceBudget(n):
+    '''
+    Returns the number of elements each intermediate may hold within the memory budget, if
+    the largest intermediate of a greedy dense contraction of the network n is predicted to
+    exceed it, and None otherwise.
+    '''
+    # The slice contractor builds on this module.
+    from TNR.Contractors.sliceContractor import networkShape, greedyOrder
+
+    if accountant.limit is None or len(n.nodes) == 0:
+        return None
+
+    _, keys, dims = networkShape(n)
+    _, peak, _ = greedyOrder(keys, dims)
+    itemsize = np.result_type(*[nn.tensor.dtype for nn in n.nodes]).itemsize
+    available = max(1, (accountant.limit - accountant.resident) // itemsize)
+    if peak <= available:
+        return None
+    return available
+
+
+def contractSliced(n, maxSize):
+    '''
+    Contracts the network n exactly with the slice contractor, bounding its intermediates
+    by maxSize elements, and replaces its Nodes by a single Node holding the result.
+    Slices are contracted one at a time, as running them in parallel would multiply the
+    memory they use.
+    '''
+    # The slice contractor builds on this module.
+    from TNR.Contractors.sliceContractor import sliceContractor
+
+    arr, logAcc, _ = sliceContractor(n, maxSize, processes=1)
+
+    # The axes of the result follow the ids of the external Buckets.
+    buckets = sorted(n.externalBuckets, key=lambda b: b.id)
+    for nn in list(n.nodes):
+        n.removeNode(nn)
+    nn = Node(ArrayTensor(np.reshape(arr, [b.size for b in buckets]), logScalar=logAcc),
+              Buckets=buckets)
+    n.addNode(nn)
+    return nn
+
+
+class MergeMemo:
+    '''
+    A MergeMemo remembers the tensors produced by merges, keyed by the fingerprints of the
+    two tensors merged, the indices joined and the accuracy and optimization the merge was
+    done with, so that merging an identical pair again,
+    as happens throughout the bulk of a regular network, reuses the earlier result
+    instead of contracting it anew. The least recently used results are forgotten once
+    more than size are held.
+    '''
+
+    def __init__(self, size=None):
+        if size is None:
+            size = config.mergeMemoSize
+        self.size = size
+        self.results = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, network, n1, n2, accuracy, optimize):
+        '''
+        Returns the key of the merge of the Nodes n1 and n2 in the specified Network, done
+        to the specified accuracy and with or without optimization.
+        '''
+        indices, _ = network.mergeIndices(n1, n2)
+        return digest(mergeFingerprint(n1.tensor, indices[0], n2.tensor, indices[1]),
+                      float(accuracy), bool(optimize))
+
+    def get(self, key):
+        '''
+        Returns the tensor remembered for the specified key, or None if there is none.
+        TreeTensors are returned as copies, so the one remembered is never modified.
+        '''
+        t = self.results.get(key)
+        if t is None:
+            self.misses += 1
+            return None
+        self.results.move_to_end(key)
+        self.hits += 1
+        return t.copy() if hasattr(t, 'network') else t
+
+    def put(self, key, t):
+        '''
+        Remembers the tensor t as the result of the merge with the specified key.
+        '''
+        if self.size <= 0:
+            return
+        self.results[key] = t.copy() if hasattr(t, 'network') else t
+        while len(self.results) > self.size:
+            self.results.popitem(last=False)
 
 
 def mergeContractor(
@@ -21,7 +148,12 @@ def mergeContractor(
         optimize=True,
         merge=True,
         plot=False,
-        mergeCut=35):
+        mergeCut=35,
+        refineDtype=None,
+        refineCut=2,
+        simplify=True,
+        memoize=False,
+        slicing=False):
     '''
     This method contracts the network n to the specified accuracy using the specified heuristic.
 
@@ -30,7 +162,45 @@ def mergeContractor(
 
     The plot option, if True, plots the entire network at each step and saves the result to a PNG
     file in the top-level Overview folder. This defaults to False.
+
+    Before each merge its size is predicted and checked against the memory budget (mem_limit
+    in the config file). Merges which do not fit are replaced by the best of the heuristic's
+    top candidates which does, or failing that by the smallest merge which does, and if none
+    fits a MemoryError is raised before anything is allocated. The heuristic must therefore
+    accept a count argument, as those in heuristics.py do.
+
+    The refineDtype option, if not None, specifies a dtype policy (e.g. float64) which the
+    network is switched to once at most refineCut nodes remain. This allows the memory-bound
+    early stages to run in single precision while the final contractions are refined in
+    double precision.
+
+    The simplify option, if True (default), first absorbs all Nodes of rank at most two into
+    their neighbours, fuses parallel links and cuts links of dimension one in a single bulk
+    pass, so that the heuristic only ever sees the remaining network. Set it to False to
+    leave the order of every merge to the heuristic.
+
+    The memoize option, if True, remembers the result of each merge, after loop elimination
+    and optimization, in a MergeMemo. A later merge of a pair of tensors with the same
+    fingerprints over the same indices reuses it, TreeTensor structure included. A MergeMemo
+    may also be passed, to share remembered merges between contractions. This defaults to
+    False, as fingerprinting every merge and holding the remembered tensors cost time and
+    memory which only pay off for networks with many identical merges, typically regular
+    ones.
+
+    The slicing option, if True, predicts before each merge the largest intermediate of a
+    greedy dense contraction of the remaining network. Once that exceeds the memory budget,
+    the rest of the network is handed to the slice contractor, which fixes bonds until each
+    intermediate of that greedy contraction fits and contracts the slices exactly, one by
+    one. The network is then left holding a single Node with the result. This defaults to
+    False, as the prediction itself costs time at every merge.
     '''
+    if isinstance(memoize, MergeMemo):
+        memo = memoize
+    else:
+        memo = MergeMemo() if memoize else None
+
+    if simplify:
+        n.simplify()
 
     if plot:
         pos = None
@@ -38,6 +208,19 @@ def mergeContractor(
 
     while len(n.internalBuckets) > 0:
 
+        if slicing:
+            budget = sliceBudget(n)
+            if budget is not None:
+                logger.info('Remaining network exceeds the memory budget. Slicing it to ' +
+                            str(budget) + ' elements per intermediate.')
+                contractSliced(n, budget)
+                break
+
+        if refineDtype is not None and len(
+                n.nodes) <= refineCut and n.dtype != refineDtype:
+            logger.info('Refining network to ' + str(refineDtype) + '.')
+            n.setDtype(refineDtype)
+
         if plot:
             g = n.toGraph()
             reusePos = {}
@@ -58,12 +241,28 @@ def mergeContractor(
 
         q, n1, n2 = heuristic(n)
 
-        n3 = n.mergeNodes(n1, n2)
+        nbytes = accountant.predictMerge(n1, n2)
+        if not accountant.admits(nbytes):
+            logger.info('Merge of ' + str(nbytes) +
+                        ' bytes exceeds the memory budget. Choosing a smaller one.')
+            n1, n2 = admissibleMerge(n, heuristic)
+
+        key = memo.key(n, n1, n2, accuracy, optimize) if memo is not None else None
+        t = memo.get(key) if memo is not None else None
+
+        if t is not None:
+            _, buckets = n.mergeIndices(n1, n2)
+            n3 = n.replaceNodes(n1, n2, t, buckets)
+        else:
+            n3 = n.mergeNodes(n1, n2)
 
-        n3.eliminateLoops()
+            n3.eliminateLoops()
 
-        if optimize:
-            n3.tensor.optimize()
+            if optimize:
+                n3.tensor.optimize()
+
+            if memo is not None:
+                memo.put(key, n3.tensor)
 
         if merge:
             logger.info('Merging nodes...')
@@ -112,4 +311,8 @@ def mergeContractor(
                     str(len(n3.connectedNodes)) +
                     ' nodes.')
 
+    if memo is not None:
+        logger.info('Reused ' + str(memo.hits) + ' of ' + str(memo.hits + memo.misses) +
+                    ' merges.')
+
     return n
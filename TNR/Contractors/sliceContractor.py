@@ -0,0 +1,235 @@
+from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor
+import itertools as it
+import pickle
+import numpy as np
+
+from TNR.Contractors.mergeContractor import mergeContractor
+
+from TNR.Utilities.logger import makeLogger
+from TNR import config
+logger = makeLogger(__name__, config.levels['sliceContractor'])
+
+
+def bondKey(bucket):
+    '''
+    Returns a key identifying the bond on which bucket sits. The key is preserved by
+    deep copies and pickling of the Network, so it identifies the same bond in each copy.
+    '''
+    if bucket.linked:
+        return min(bucket.id, bucket.otherBucket.id)
+    return bucket.id
+
+
+def networkShape(n):
+    '''
+    Returns the Nodes of the network n, a list of frozensets holding the bond keys of
+    each Node, and a dictionary mapping each bond key to its dimension.
+    '''
+    nodes = list(n.nodes)
+    keys = []
+    dims = {}
+    for nn in nodes:
+        keys.append(frozenset(bondKey(b) for b in nn.buckets))
+        for b in nn.buckets:
+            dims[bondKey(b)] = b.size
+    return nodes, keys, dims
+
+
+def greedyOrder(keys, dims):
+    '''
+    Determines a contraction order for tensors with the specified bond keys by greedily
+    merging the connected pair whose merge shrinks the total size the most.
+
+    Takes as input:
+            keys	-	A list of frozensets of bond keys, one per tensor.
+            dims	-	A dictionary mapping bond keys to dimensions.
+
+    Returns the list of merges, each a pair of positions in the list of tensors, with the
+    result of each merge appended to the end of that list, the size of the largest tensor
+    encountered and the total size of all intermediates. Disconnected components are left
+    as separate tensors.
+    '''
+    def size(k):
+        s = 1
+        for q in k:
+            s *= dims[q]
+        return s
+
+    keys = list(keys)
+    peak = max([size(k) for k in keys] + [1])
+    total = 0
+
+    owners = {}
+    for i, k in enumerate(keys):
+        for q in k:
+            owners.setdefault(q, set()).add(i)
+
+    order = []
+    while True:
+        best = None
+        for q, o in owners.items():
+            if len(o) == 2:
+                i, j = sorted(o)
+                k = keys[i] ^ keys[j]
+                cost = size(k) - size(keys[i]) - size(keys[j])
+                if best is None or cost < best[0]:
+                    best = (cost, i, j, k)
+
+        if best is None:
+            break
+
+        _, i, j, k = best
+        keys.append(k)
+        for q in keys[i].union(keys[j]):
+            owners[q].difference_update((i, j))
+            if q in k:
+                owners[q].add(len(keys) - 1)
+            else:
+                del owners[q]
+        order.append((i, j))
+        peak = max(peak, size(k))
+        total += size(k)
+
+    return order, peak, total
+
+
+def chooseSlices(n, maxSize):
+    '''
+    Chooses a set of bonds in the network n such that fixing each of them to a single
+    value bounds the largest intermediate tensor of a greedy contraction by maxSize.
+    Bonds are chosen greedily, each time picking the one whose removal most reduces the
+    largest intermediate.
+
+    Returns the list of bond keys and the predicted largest intermediate size.
+    '''
+    _, keys, dims = networkShape(n)
+    internal = set(bondKey(b) for b in n.internalBuckets)
+
+    # Candidates are ranked by the largest intermediate they leave, with ties broken
+    # by the total size of all intermediates.
+    sliced = []
+    _, peak, total = greedyOrder(keys, dims)
+    while peak > maxSize:
+        best = None
+        for q in internal.difference(sliced):
+            _, p, t = greedyOrder([k.difference([q]) for k in keys], dims)
+            if best is None or (p, t) < best[:2]:
+                best = (p, t, q)
+
+        if best is None or best[:2] >= (peak, total):
+            break
+
+        peak, total, q = best
+        sliced.append(q)
+        keys = [k.difference([q]) for k in keys]
+
+    return sliced, peak
+
+
+def contractSlice(n, sliced, values, accuracy=None, heuristic=None):
+    '''
+    Contracts a deep copy of the network n with the bonds in sliced fixed to the
+    specified values. If a heuristic is specified the slice is contracted by the
+    mergeContractor to the given accuracy, otherwise it is contracted exactly in a
+    greedy order.
+
+    Returns the array, the log of its prefactor and the bucket dictionary, as in
+    Network.array.
+    '''
+    n = deepcopy(n)
+
+    buckets = {b.id: b for b in n.internalBuckets}
+    for q, v in zip(*(sliced, values)):
+        n.sliceLink(buckets[q].link, v)
+
+    if heuristic is not None:
+        mergeContractor(n, accuracy, heuristic, optimize=True, merge=False)
+    else:
+        nodes, keys, dims = networkShape(n)
+        order, _, _ = greedyOrder(keys, dims)
+        for i, j in order:
+            nodes.append(n.mergeNodes(nodes[i], nodes[j]))
+
+    return n.array
+
+
+# The network being sliced in each worker process, set by initWorker.
+workerNetwork = None
+
+
+def initWorker(data):
+    global workerNetwork
+    workerNetwork = pickle.loads(data)
+
+
+def contractWorkerSlice(args):
+    return contractSlice(workerNetwork, *args)
+
+
+def sliceContractor(
+        n,
+        maxSize,
+        accuracy=None,
+        heuristic=None,
+        processes=None):
+    '''
+    This method contracts the network n down to an array while bounding the size of the
+    intermediate tensors. A set of bonds is chosen such that fixing each to a single value
+    keeps the largest intermediate tensor of a greedy contraction below maxSize. Each
+    assignment of values to those bonds defines a slice, which is contracted independently,
+    and the slices are summed in log-scale arithmetic.
+
+    The arguments are:
+            n			-	The network to contract. This is not modified.
+            maxSize		-	The number of elements bounding the intermediate tensors.
+            accuracy	-	The accuracy passed to the mergeContractor.
+            heuristic	-	If specified, each slice is contracted by the mergeContractor with this
+                                    heuristic. Otherwise slices are contracted exactly.
+            processes	-	The number of worker processes. If 1 the slices are contracted in this
+                                    process. Defaults to the number of processors.
+
+    Returns the array, the log of a prefactor and a bucket dictionary, as in Network.array.
+    '''
+    sliced, peak = chooseSlices(n, maxSize)
+
+    dims = {bondKey(b): b.size for b in n.internalBuckets}
+    values = it.product(*[range(dims[q]) for q in sliced])
+
+    logger.info('Contracting ' + str(int(np.prod([dims[q] for q in sliced]))) +
+                ' slices over ' + str(len(sliced)) + ' bonds with largest intermediate of size ' +
+                str(peak) + '.')
+
+    args = ((sliced, v, accuracy, heuristic) for v in values)
+
+    if processes == 1:
+        results = (contractSlice(n, *a) for a in args)
+        return sumSlices(results)
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=initWorker,
+                             initargs=(pickle.dumps(n),)) as executor:
+        return sumSlices(executor.map(contractWorkerSlice, args))
+
+
+def sumSlices(results):
+    '''
+    Sums the slices produced by contractSlice, keeping the result normalized by
+    accumulating in log-scale arithmetic. Returns the same form as contractSlice.
+    '''
+    arr = None
+    logAcc = -np.inf
+    bdict = None
+    for arr2, logAcc2, bdict2 in results:
+        if not np.isfinite(logAcc2):
+            # This slice vanishes.
+            continue
+
+        if arr is None:
+            arr, logAcc, bdict = np.array(arr2), logAcc2, bdict2
+        elif logAcc2 > logAcc:
+            arr = arr * np.exp(logAcc - logAcc2) + arr2
+            logAcc = logAcc2
+        else:
+            arr = arr + arr2 * np.exp(logAcc2 - logAcc)
+
+    return arr, logAcc, bdict
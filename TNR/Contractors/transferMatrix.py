@@ -0,0 +1,82 @@
+'''
+This module contracts 1D chains through their transfer matrices. A periodic chain whose
+sites contribute the transfer matrices M_0, M_1, ... has partition function
+Tr(M_0 M_1 ... M_{N-1}), so a chain of N identical sites needs only O(log N) matrix
+products by repeated squaring, and a disordered chain can be streamed through in blocks
+without ever building its network.
+
+Products are carried as ArrayTensors, whose logScalar keeps the scale of the product
+out of the array, so chains of any length can be handled without overflow.
+'''
+import numpy as np
+
+from TNR.Tensor.arrayTensor import ArrayTensor
+
+from TNR.Utilities.logger import makeLogger
+from TNR import config
+logger = makeLogger(__name__, config.levels['transferMatrix'])
+
+
+def matrixPower(matrix, n):
+    '''
+    Returns the n-th power of the square matrix Tensor matrix, for n at least one, by
+    repeated squaring.
+    '''
+    result = None
+    power = matrix
+    while True:
+        if n & 1:
+            result = power if result is None else result.contract([1], power, [0])
+        n >>= 1
+        if n == 0:
+            return result
+        power = power.contract([1], power, [0])
+
+
+def blockProduct(matrices):
+    '''
+    Returns the ordered product of a stack of matrices of shape (B, d, d) as an ArrayTensor.
+    Pairs of neighbouring matrices are multiplied together at once until one remains, with
+    each normalized along the way.
+    '''
+    matrices = np.asarray(matrices)
+    scale = np.max(np.abs(matrices), axis=(1, 2), keepdims=True)
+    logScalar = np.sum(np.log(scale))
+    matrices = matrices / scale
+
+    while len(matrices) > 1:
+        odd = matrices[-1:] if len(matrices) % 2 == 1 else matrices[:0]
+        matrices = np.matmul(matrices[:-1:2], matrices[1::2])
+        scale = np.max(np.abs(matrices), axis=(1, 2), keepdims=True)
+        logScalar += np.sum(np.log(scale))
+        matrices = np.concatenate((matrices / scale, odd))
+
+    return ArrayTensor(matrices[0], logScalar=logScalar)
+
+
+def uniformChain(matrix, n):
+    '''
+    Returns the partition function of a periodic chain of n sites with the specified
+    transfer matrix, as a rank-0 ArrayTensor whose logScalar is its log.
+    '''
+    if not hasattr(matrix, 'contract'):
+        matrix = ArrayTensor(matrix)
+    t = matrixPower(matrix, n).trace([0], [1])
+    logger.debug('Contracted a uniform chain of ' + str(n) + ' sites.')
+    return t
+
+
+def streamChain(blocks):
+    '''
+    Returns the partition function of a periodic chain whose transfer matrices are
+    supplied in order by blocks, an iterable of arrays of shape (B, d, d), as a rank-0
+    ArrayTensor whose logScalar is its log. Only one block is held at a time.
+    '''
+    product = None
+    n = 0
+    for block in blocks:
+        t = blockProduct(block)
+        product = t if product is None else product.contract([1], t, [0])
+        n += len(block)
+    logger.debug('Contracted a chain of ' + str(n) + ' sites.')
+    return product.trace([0], [1])
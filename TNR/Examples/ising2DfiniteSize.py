@@ -0,0 +1,32 @@
+import numpy as np
+import time
+from functools import partial
+
+from TNR.Models.isingModel import IsingModel2DopenCell, exactIsing2D
+from TNR.Contractors.finiteSize import BlockCache
+
+from TNR.Utilities.logger import makeLogger
+from TNR import config
+logger = makeLogger(__name__, config.levels['generic'])
+
+cache = BlockCache()
+
+h = 0
+chi = 32
+sizes = range(2, 65)
+
+for J in [-0.3, -0.44, -0.6]:
+    cells = partial(IsingModel2DopenCell, h, J)
+
+    res = []
+    start = time.time()
+    for s in sizes:
+        logger.info('Examining system of size ' + str(s) + ' and J = ' + str(J) + '.')
+        f = cache.logPartition((h, J), cells, s, chi=chi) / s**2
+        res.append((s, f, f - exactIsing2D(-J), time.time() - start))
+
+    res = np.array(res)
+
+    print(res)
+
+    np.savetxt('ising2DJ_finiteSize_J=' + str(J) + '.dat', res)
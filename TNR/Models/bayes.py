@@ -14,7 +14,8 @@ def BayesTest1(
         discreteQ,
         discreteW,
         discreteH,
-        accuracy):
+        accuracy,
+        dtype=None):
     '''
     observations is a list of (k,M) pairs
     where k is the number of heads and M-k is the
@@ -37,7 +38,7 @@ def BayesTest1(
     discreteH is the same for h_i.
     '''
 
-    network = Network()
+    network = Network(dtype=dtype)
 
     # Global tensors
     n = len(observations)
@@ -86,7 +87,8 @@ def BayesTest2(
         discreteQ,
         discreteW,
         discreteH,
-        accuracy):
+        accuracy,
+        dtype=None):
     '''
     observations is a list of (k,M) pairs
     where k is the number of heads and M-k is the
@@ -109,7 +111,7 @@ def BayesTest2(
     discreteH is the same for h_i.
     '''
 
-    network = Network()
+    network = Network(dtype=dtype)
 
     # Local tensors
     hs = []
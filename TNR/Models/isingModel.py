@@ -6,100 +6,109 @@ from TNR.Network.node import Node
 from TNR.Network.network import Network
 from TNR.TreeTensor.identityTensor import IdentityTensor
 from TNR.Tensor.arrayTensor import ArrayTensor
-
-
-def IsingModel1D(nX, h, J, accuracy):
-    network = Network()
-
-    # Place to store the tensors
-    lattice = []
-    onSite = []
-    bond = []
-
-    # Each lattice site has seven indices of width five, and returns zero if
-    # they are unequal and one otherwise.
-    for i in range(nX):
-        lattice.append(Node(IdentityTensor(2, 3, accuracy=accuracy)))
-
-    # Each on-site term has one index of width two, and returns exp(-h) or
-    # exp(h) for 0 or 1 respectively.
-    for i in range(nX):
-        arr = np.zeros((2))
-        arr[0] = np.exp(-h)
-        arr[1] = np.exp(h)
-        onSite.append(Node(ArrayTensor(arr)))
-
-    # Each bond term has two indices of width two and returns
-    # exp(-J*(1+delta(index0,index1))/2).
-    for i in range(nX):
-        arr = np.zeros((2, 2))
-        arr[0][0] = np.exp(-J)
-        arr[1][1] = np.exp(-J)
-        arr[0][1] = np.exp(J)
-        arr[1][0] = np.exp(J)
-        bond.append(Node(ArrayTensor(arr)))
-
-    # Attach links
-    for i in range(nX):
-        Link(lattice[i].buckets[0], onSite[i].buckets[0])
-        Link(lattice[i].buckets[1], bond[i].buckets[0])
-        Link(lattice[i].buckets[2], bond[(i + 1) % nX].buckets[1])
-
-    # Add to Network
-    for i in range(nX):
-        network.addNode(lattice[i])
-        network.addNode(onSite[i])
-        network.addNode(bond[i])
-
-    return network
-
-
-def IsingModel1Ddisordered(nX, h0, J0, accuracy):
-    network = Network()
-
-    # Place to store the tensors
-    lattice = []
-    onSite = []
-    bond = []
-
-    # Each lattice site has seven indices of width five, and returns zero if
-    # they are unequal and one otherwise.
-    for i in range(nX):
-        lattice.append(Node(IdentityTensor(2, 3, accuracy=accuracy)))
-
-    # Each on-site term has one index of width two, and returns exp(-h) or
-    # exp(h) for 0 or 1 respectively.
-    for i in range(nX):
-        h = h0 * np.random.randn()
-        arr = np.zeros((2))
-        arr[0] = np.exp(-h)
-        arr[1] = np.exp(h)
-        onSite.append(Node(ArrayTensor(arr)))
-
-    # Each bond term has two indices of width two and returns
-    # exp(-J*(1+delta(index0,index1))/2).
-    for i in range(nX):
-        J = J0 * np.random.randn()
-        arr = np.zeros((2, 2))
-        arr[0][0] = np.exp(-J)
-        arr[1][1] = np.exp(-J)
-        arr[0][1] = np.exp(J)
-        arr[1][0] = np.exp(J)
-        bond.append(Node(ArrayTensor(arr)))
-
-    # Attach links
-    for i in range(nX):
-        Link(lattice[i].buckets[0], onSite[i].buckets[0])
-        Link(lattice[i].buckets[1], bond[i].buckets[0])
-        Link(lattice[i].buckets[2], bond[(i + 1) % nX].buckets[1])
-
-    # Add to Network
-    for i in range(nX):
-        network.addNode(lattice[i])
-        network.addNode(onSite[i])
-        network.addNode(bond[i])
-
-    return network
+from TNR.Models.lattice import latticeSites, latticeBonds, latticeCell, buildLattice
+
+
+def onSiteArray(h):
+    '''
+    Returns the on-site term, which has one index of width two and returns exp(-h) or
+    exp(h) for 0 or 1 respectively. If h is an array one term is returned per entry.
+    '''
+    h = np.asarray(h)
+    return np.stack((np.exp(-h), np.exp(h)), axis=-1)
+
+
+def bondArray(J):
+    '''
+    Returns the bond term, which has two indices of width two and returns exp(-J) if they
+    are equal and exp(J) otherwise. If J is an array one term is returned per entry.
+    '''
+    J = np.asarray(J)[..., np.newaxis, np.newaxis]
+    return np.exp(J * (1 - 2 * np.identity(2)))
+
+
+def IsingModel(shape, h, J, accuracy, periodic=True, dtype=None):
+    '''
+    Builds the network for the Ising model on a hypercubic lattice of the specified shape.
+    Each lattice site is an identity tensor of width two joined to an on-site term and to
+    a bond term per neighbour.
+
+    The arguments are:
+            shape		-	The shape of the lattice.
+            h, J		-	The field and coupling. Either may be an array holding one
+                                    value per site or per bond (in the order of latticeBonds)
+                                    for disordered models. An array with a single entry is
+                                    taken as a uniform value.
+            accuracy	-	The accuracy of the identity tensors.
+            periodic	-	Whether the lattice wraps around. Defaults to True.
+            dtype		-	The dtype policy of the network.
+    '''
+    sites = latticeSites(shape).ravel()
+    bonds = latticeBonds(shape, periodic=periodic)
+
+    # A field or coupling with a single entry is the same on every site or bond.
+    if np.size(h) == 1:
+        h = np.ravel(h)[0]
+    if np.size(J) == 1:
+        J = np.ravel(J)[0]
+
+    onSite = onSiteArray(h)
+    if onSite.ndim == 1:
+        onSite = ArrayTensor(onSite)
+    bond = bondArray(J)
+    if bond.ndim == 2:
+        bond = ArrayTensor(bond)
+
+    return buildLattice(len(sites), 2, [(sites[:, np.newaxis], onSite), (bonds, bond)],
+                        accuracy, dtype=dtype)
+
+
+def IsingModelCell(ndim, h, J, dtype=None):
+    '''
+    Returns the unit-cell tensor of the Ising model on a periodic hypercubic lattice with
+    ndim dimensions, with indices ordered as in latticeCell.
+    '''
+    return ArrayTensor(latticeCell(onSiteArray(h), bondArray(J), ndim), dtype=dtype)
+
+
+def IsingSpinCell(ndim, h, J, dtype=None):
+    '''
+    Returns the unit-cell tensor of IsingModelCell with the spin on its site, +1 or -1 for
+    0 or 1 respectively, inserted as a factor. Contracted in place of one cell this gives
+    the magnetisation.
+    '''
+    onSite = onSiteArray(h) * np.array([1, -1])
+    return ArrayTensor(latticeCell(onSite, bondArray(J), ndim), dtype=dtype)
+
+
+def IsingModel1D(nX, h, J, accuracy, dtype=None):
+    return IsingModel((nX,), h, J, accuracy, dtype=dtype)
+
+
+def IsingModel1Ddisordered(nX, h0, J0, accuracy, dtype=None):
+    return IsingModel((nX,), h0 * np.random.randn(nX), J0 * np.random.randn(nX),
+                      accuracy, dtype=dtype)
+
+
+def IsingTransferMatrix(h, J):
+    '''
+    Returns the transfer matrix of a site of the Ising chain, the on-site term of the site
+    times the bond term joining it to the next site. If h and J are arrays of equal length
+    a stack of matrices is returned, one per site.
+    '''
+    return onSiteArray(h)[..., np.newaxis] * bondArray(J)
+
+
+def IsingTransferBlocks1Ddisordered(nX, h0, J0, blockSize=2**16):
+    '''
+    Yields the transfer matrices of a disordered Ising chain distributed as that of
+    IsingModel1Ddisordered, in blocks of at most blockSize sites. The disorder is drawn one
+    block at a time, the fields of a block before its couplings, so for the same seed the
+    chain differs from that of IsingModel1Ddisordered, which draws all fields first.
+    '''
+    for start in range(0, nX, blockSize):
+        n = min(blockSize, nX - start)
+        yield IsingTransferMatrix(h0 * np.random.randn(n), J0 * np.random.randn(n))
 
 
 def exactIsing1Dh(h):
@@ -122,256 +131,43 @@ def exactIsing1DJ(n, J):
     return np.log(l1) + f
 
 
-def IsingModel2D(nX, nY, h, J, accuracy):
-    network = Network()
-
-    # Place to store the tensors
-    lattice = [[] for i in range(nX)]
-    onSite = [[] for i in range(nX)]
-    bondV = [[] for i in range(nX)]
-    bondH = [[] for i in range(nX)]
-
-    # Each lattice site has seven indices of width five, and returns zero if
-    # they are unequal and one otherwise.
-    for i in range(nX):
-        for j in range(nY):
-            lattice[i].append(Node(IdentityTensor(2, 5, accuracy=accuracy)))
-
-    # Each on-site term has one index of width two, and returns exp(-h) or
-    # exp(h) for 0 or 1 respectively.
-    for i in range(nX):
-        for j in range(nY):
-            arr = np.zeros((2))
-            arr[0] = np.exp(-h)
-            arr[1] = np.exp(h)
-            onSite[i].append(Node(ArrayTensor(arr)))
-
-    # Each bond term has two indices of width two and returns
-    # exp(-J*(1+delta(index0,index1))/2).
-    for i in range(nX):
-        for j in range(nY):
-            arr = np.zeros((2, 2))
-            arr[0][0] = np.exp(-J)
-            arr[1][1] = np.exp(-J)
-            arr[0][1] = np.exp(J)
-            arr[1][0] = np.exp(J)
-            bondV[i].append(Node(ArrayTensor(arr)))
-            bondH[i].append(Node(ArrayTensor(arr)))
-
-    # Attach links
-    for i in range(nX):
-        for j in range(nY):
-            Link(lattice[i][j].buckets[0], onSite[i][j].buckets[0])
-            Link(lattice[i][j].buckets[1], bondV[i][j].buckets[0])
-            Link(lattice[i][j].buckets[2], bondV[i][(j + 1) % nY].buckets[1])
-            Link(lattice[i][j].buckets[3], bondH[i][j].buckets[0])
-            Link(lattice[i][j].buckets[4], bondH[(i + 1) % nX][j].buckets[1])
-
-    # Add to Network
-    for i in range(nX):
-        for j in range(nY):
-            network.addNode(lattice[i][j])
-            network.addNode(onSite[i][j])
-            network.addNode(bondV[i][j])
-            network.addNode(bondH[i][j])
-
-    return network
-
+def IsingModel2D(nX, nY, h, J, accuracy, dtype=None):
+    return IsingModel((nX, nY), h, J, accuracy, dtype=dtype)
 
-def IsingModel2Dopen(nX, nY, h, J, accuracy):
-    network = Network()
 
-    # Place to store the tensors
-    lattice = [[] for i in range(nX)]
-    onSite = [[] for i in range(nX)]
-    bondV = [[] for i in range(nX)]
-    bondH = [[] for i in range(nX - 1)]
-
-    counters = [[0 for j in range(nY)] for i in range(nX)]
-
-    # Each lattice site has seven indices of width five, and returns zero if
-    # they are unequal and one otherwise.
-    lattice[0].append(Node(IdentityTensor(2, 3, accuracy=accuracy)))
-    lattice[-1].append(Node(IdentityTensor(2, 3, accuracy=accuracy)))
-    for j in range(1, nY - 1):
-        lattice[0].append(Node(IdentityTensor(2, 4, accuracy=accuracy)))
-        lattice[-1].append(Node(IdentityTensor(2, 4, accuracy=accuracy)))
-    lattice[0].append(Node(IdentityTensor(2, 3, accuracy=accuracy)))
-    lattice[-1].append(Node(IdentityTensor(2, 3, accuracy=accuracy)))
-
-    for i in range(1, nX - 1):
-        lattice[i].append(Node(IdentityTensor(2, 4, accuracy=accuracy)))
-        for j in range(1, nY - 1):
-            lattice[i].append(Node(IdentityTensor(2, 5, accuracy=accuracy)))
-        lattice[i].append(Node(IdentityTensor(2, 4, accuracy=accuracy)))
-
-    # Each on-site term has one index of width two, and returns exp(-h) or
-    # exp(h) for 0 or 1 respectively.
-    for i in range(nX):
-        for j in range(nY):
-            arr = np.zeros((2))
-            arr[0] = np.exp(-h)
-            arr[1] = np.exp(h)
-            onSite[i].append(Node(ArrayTensor(arr)))
-
-    # Each bond term has two indices of width two and returns
-    # exp(-J*(1+delta(index0,index1))/2).
-    for i in range(nX):
-        for j in range(nY):
-            arr = np.zeros((2, 2))
-            arr[0][0] = np.exp(-J)
-            arr[1][1] = np.exp(-J)
-            arr[0][1] = np.exp(J)
-            arr[1][0] = np.exp(J)
-            if j < nY - 1:
-                bondV[i].append(Node(ArrayTensor(arr)))
-
-            if i < nX - 1:
-                bondH[i].append(Node(ArrayTensor(arr)))
-
-    # Attach links
-    for i in range(nX):
-        for j in range(nY):
-            counters[i][j] += 1
-            Link(lattice[i][j].buckets[0], onSite[i][j].buckets[0])
-
-    for i in range(nX):
-        for j in range(nY):
-            print(len(bondH), len(bondV), len(bondV[0]), len(bondV[1]))
-            if j > 0:
-                Link(lattice[i][j].buckets[counters[i][j]],
-                     bondV[i][j - 1].buckets[0])
-                counters[i][j] += 1
-            if j < nY - 1:
-                print(counters[i][j])
-                Link(lattice[i][j].buckets[counters[i][j]],
-                     bondV[i][j].buckets[1])
-                counters[i][j] += 1
-            if i > 0:
-                print(counters[i][j])
-                Link(lattice[i][j].buckets[counters[i][j]],
-                     bondH[i - 1][j].buckets[0])
-                counters[i][j] += 1
-            if i < nX - 1:
-                print(counters[i][j])
-                Link(lattice[i][j].buckets[counters[i][j]],
-                     bondH[i][j].buckets[1])
-                counters[i][j] += 1
+def IsingModel2Dopen(nX, nY, h, J, accuracy, dtype=None):
+    return IsingModel((nX, nY), h, J, accuracy, periodic=False, dtype=dtype)
 
-    # Add to Network
-    for x in lattice:
-        for y in x:
-            network.addNode(y)
-    for x in onSite:
-        for y in x:
-            network.addNode(y)
-    for x in bondV:
-        for y in x:
-            network.addNode(y)
-    for x in bondH:
-        for y in x:
-            network.addNode(y)
 
-    return network
+def IsingModel2DopenRow(nX, nY, h, J, y, dtype=None):
+    '''
+    Returns the cell tensors of row y of the open Ising model on an nX by nY lattice, as a
+    list of ArrayTensors with indices ordered as in latticeCell. Cells on the edge of the
+    lattice have indices of dimension one in place of the missing bonds.
+    '''
+    # A row has at most three distinct cells, which are shared.
+    cells = {}
+    row = []
+    for x in range(nX):
+        open = ((x == 0, x == nX - 1), (y == 0, y == nY - 1))
+        if open not in cells:
+            cells[open] = IsingModel2DopenCell(h, J, open, dtype=dtype)
+        row.append(cells[open])
+    return row
 
 
-def IsingModel2Ddisordered(nX, nY, h0, J0, accuracy):
-    network = Network()
+def IsingModel2DopenCell(h, J, open, dtype=None):
+    '''
+    Returns the cell tensor of the open Ising model with no bonds on the sides marked by
+    open, a pair of pairs of booleans as in latticeCell.
+    '''
+    return ArrayTensor(latticeCell(onSiteArray(h), bondArray(J), 2, open=open), dtype=dtype)
 
-    # Place to store the tensors
-    lattice = [[] for i in range(nX)]
-    onSite = [[] for i in range(nX)]
-    bondV = [[] for i in range(nX)]
-    bondH = [[] for i in range(nX - 1)]
-
-    counters = [[0 for j in range(nY)] for i in range(nX)]
-
-    # Each lattice site has seven indices of width five, and returns zero if
-    # they are unequal and one otherwise.
-    lattice[0].append(Node(IdentityTensor(2, 3, accuracy=accuracy)))
-    lattice[-1].append(Node(IdentityTensor(2, 3, accuracy=accuracy)))
-    for j in range(1, nY - 1):
-        lattice[0].append(Node(IdentityTensor(2, 4, accuracy=accuracy)))
-        lattice[-1].append(Node(IdentityTensor(2, 4, accuracy=accuracy)))
-    lattice[0].append(Node(IdentityTensor(2, 3, accuracy=accuracy)))
-    lattice[-1].append(Node(IdentityTensor(2, 3, accuracy=accuracy)))
-
-    for i in range(1, nX - 1):
-        lattice[i].append(Node(IdentityTensor(2, 4, accuracy=accuracy)))
-        for j in range(1, nY - 1):
-            lattice[i].append(Node(IdentityTensor(2, 5, accuracy=accuracy)))
-        lattice[i].append(Node(IdentityTensor(2, 4, accuracy=accuracy)))
-
-    # Each on-site term has one index of width two, and returns exp(-h) or
-    # exp(h) for 0 or 1 respectively.
-    for i in range(nX):
-        for j in range(nY):
-            h = h0 * np.random.randn()
-            arr = np.zeros((2))
-            arr[0] = np.exp(-h)
-            arr[1] = np.exp(h)
-            onSite[i].append(Node(ArrayTensor(arr)))
-
-    # Each bond term has two indices of width two and returns
-    # exp(-J*(1+delta(index0,index1))/2).
-    for i in range(nX):
-        for j in range(nY):
-            J = J0 * np.random.randn()
-            arr = np.zeros((2, 2))
-            arr[0][0] = np.exp(-J)
-            arr[1][1] = np.exp(-J)
-            arr[0][1] = np.exp(J)
-            arr[1][0] = np.exp(J)
-            if j < nY - 1:
-                bondV[i].append(Node(ArrayTensor(arr)))
-
-            if i < nX - 1:
-                bondH[i].append(Node(ArrayTensor(arr)))
-
-    # Attach links
-    for i in range(nX):
-        for j in range(nY):
-            counters[i][j] += 1
-            Link(lattice[i][j].buckets[0], onSite[i][j].buckets[0])
-
-    for i in range(nX):
-        for j in range(nY):
-            print(len(bondH), len(bondV), len(bondV[0]), len(bondV[1]))
-            if j > 0:
-                Link(lattice[i][j].buckets[counters[i][j]],
-                     bondV[i][j - 1].buckets[0])
-                counters[i][j] += 1
-            if j < nY - 1:
-                print(counters[i][j])
-                Link(lattice[i][j].buckets[counters[i][j]],
-                     bondV[i][j].buckets[1])
-                counters[i][j] += 1
-            if i > 0:
-                print(counters[i][j])
-                Link(lattice[i][j].buckets[counters[i][j]],
-                     bondH[i - 1][j].buckets[0])
-                counters[i][j] += 1
-            if i < nX - 1:
-                print(counters[i][j])
-                Link(lattice[i][j].buckets[counters[i][j]],
-                     bondH[i][j].buckets[1])
-                counters[i][j] += 1
-
-    # Add to Network
-    for x in lattice:
-        for y in x:
-            network.addNode(y)
-    for x in onSite:
-        for y in x:
-            network.addNode(y)
-    for x in bondV:
-        for y in x:
-            network.addNode(y)
-    for x in bondH:
-        for y in x:
-            network.addNode(y)
 
-    return network
+def IsingModel2Ddisordered(nX, nY, h0, J0, accuracy, dtype=None):
+    nBonds = (nX - 1) * nY + nX * (nY - 1)
+    return IsingModel((nX, nY), h0 * np.random.randn(nX * nY), J0 * np.random.randn(nBonds),
+                      accuracy, periodic=False, dtype=dtype)
 
 
 def exactIsing2D(J):
@@ -385,124 +181,47 @@ def exactIsing2D(J):
     return np.log(2) / 2 + (1 / (2 * np.pi)) * inte
 
 
-def IsingModel3Dopen(nX, nY, nZ, h, J, accuracy):
-    network = Network()
+def enumerateIsing(shape, h, J, periodic=True):
+    '''
+    Returns the log of the partition function of the Ising model on a hypercubic lattice
+    of the specified shape by summing over every configuration, for checking small
+    lattices.
+    '''
+    n = int(np.prod(shape))
+    spins = 1 - 2 * ((np.arange(2**n)[:, np.newaxis] >> np.arange(n)) & 1)
+    spins = spins.reshape((-1,) + tuple(shape))
+    sites = tuple(range(1, len(shape) + 1))
+    e = -h * np.sum(spins, axis=sites, dtype=float)
+    for axis in sites:
+        pairs = spins * np.roll(spins, 1, axis=axis)
+        if not periodic:
+            pairs = np.take(pairs, range(1, spins.shape[axis]), axis=axis)
+        e -= J * np.sum(pairs, axis=sites)
+    return np.log(np.sum(np.exp(e)))
 
-    # Place to store the tensors
-    lattice = [[[] for j in range(nY)] for i in range(nX)]
-    onSite = [[[] for j in range(nY)] for i in range(nX)]
-    bondV = [[[] for j in range(nY)] for i in range(nX - 1)]
-    bondH = [[[] for j in range(nY - 1)] for i in range(nX)]
-    bondZ = [[[] for j in range(nY)] for i in range(nX)]
-
-    # Each lattice site has seven indices of width five, and returns zero if
-    # they are unequal and one otherwise.
-    for i in range(nX):
-        for j in range(nY):
-            for k in range(nZ):
-                counter = 0
-                if i == 0 or i == nX - 1:
-                    counter += 1
-                if j == 0 or j == nY - 1:
-                    counter += 1
-                if k == 0 or k == nZ - 1:
-                    counter += 1
-                lattice[i][j].append(
-                    Node(
-                        IdentityTensor(
-                            2,
-                            7 - counter,
-                            accuracy=accuracy)))
-
-    # Each on-site term has one index of width two, and returns exp(-h) or
-    # exp(h) for 0 or 1 respectively.
-    for i in range(nX):
-        for j in range(nY):
-            for k in range(nZ):
-                arr = np.zeros((2))
-                arr[0] = np.exp(-h)
-                arr[1] = np.exp(h)
-                onSite[i][j].append(Node(ArrayTensor(arr)))
-
-    # Each bond term has two indices of width two and returns
-    # exp(-J*(1+delta(index0,index1))/2).
-    for i in range(nX):
-        for j in range(nY):
-            for k in range(nZ):
-                arr = np.zeros((2, 2))
-                arr[0][0] = np.exp(-J)
-                arr[1][1] = np.exp(-J)
-                arr[0][1] = np.exp(J)
-                arr[1][0] = np.exp(J)
-                if i < nX - 1:
-                    bondV[i][j].append(Node(ArrayTensor(arr)))
-                if j < nY - 1:
-                    bondH[i][j].append(Node(ArrayTensor(arr)))
-                if k < nZ - 1:
-                    bondZ[i][j].append(Node(ArrayTensor(arr)))
-
-    # Attach links
-    for i in range(nX):
-        for j in range(nY):
-            for k in range(nZ):
-                counter = 0
-
-                Link(
-                    lattice[i][j][k].buckets[counter],
-                    onSite[i][j][k].buckets[0])
-                counter += 1
-
-                if i > 0:
-                    Link(lattice[i][j][k].buckets[counter],
-                         bondV[i - 1][j][k].buckets[0])
-                    counter += 1
-
-                if i < nX - 1:
-                    Link(
-                        lattice[i][j][k].buckets[counter],
-                        bondV[i][j][k].buckets[1])
-                    counter += 1
-
-                if j > 0:
-                    Link(lattice[i][j][k].buckets[counter],
-                         bondH[i][j - 1][k].buckets[0])
-                    counter += 1
-
-                if j < nY - 1:
-                    Link(
-                        lattice[i][j][k].buckets[counter],
-                        bondH[i][j][k].buckets[1])
-                    counter += 1
-
-                if k > 0:
-                    Link(lattice[i][j][k].buckets[counter],
-                         bondZ[i][j][k - 1].buckets[0])
-                    counter += 1
-
-                if k < nZ - 1:
-                    Link(
-                        lattice[i][j][k].buckets[counter],
-                        bondZ[i][j][k].buckets[1])
-                    counter += 1
 
-    # Add to Network
-    for i in range(nX):
-        for j in range(nY):
-            for k in range(nZ):
-                network.addNode(lattice[i][j][k])
-                network.addNode(onSite[i][j][k])
-                if i < nX - 1:
-                    network.addNode(bondV[i][j][k])
-                if j < nY - 1:
-                    network.addNode(bondH[i][j][k])
-                if k < nZ - 1:
-                    network.addNode(bondZ[i][j][k])
+def enumerateIsing2D(nX, nY, h, J, periodic=True):
+    '''
+    Returns the log of the partition function of the Ising model on an nX by nY lattice by
+    summing over every configuration, for checking small lattices.
+    '''
+    return enumerateIsing((nX, nY), h, J, periodic=periodic)
 
-    return network
+
+def IsingModel3Dopen(nX, nY, nZ, h, J, accuracy, dtype=None):
+    return IsingModel((nX, nY, nZ), h, J, accuracy, periodic=False, dtype=dtype)
+
+
+def IsingModel3DopenCell(h, J, open, dtype=None):
+    '''
+    Returns the cell tensor of the open 3D Ising model with no bonds on the sides marked by
+    open, a sequence of three pairs of booleans as in latticeCell.
+    '''
+    return ArrayTensor(latticeCell(onSiteArray(h), bondArray(J), 3, open=open), dtype=dtype)
 
 
-def IsingSpinGlass(n, J, k, accuracy):
-    network = Network()
+def IsingSpinGlass(n, J, k, accuracy, dtype=None):
+    network = Network(dtype=dtype)
 
     nBonds = int(n * k)
 
@@ -0,0 +1,210 @@
+'''
+This module builds networks of the form used by the models in this package in bulk.
+A model is specified by a number of sites, each carrying a variable of the same
+dimension, and groups of factors. Each factor is a tensor with one leg per site it
+couples. Every site becomes an IdentityTensor with one leg per factor leg attached to
+it, so that all factors attached to a site see the same value of its variable.
+
+Factors in a group either share a single Tensor, in which case every Node of the group
+refers to the same read-only buffer, or each take one row of a stacked array, as in
+disordered models.
+'''
+import numpy as np
+
+from TNR.Network.link import Link
+from TNR.Network.node import Node
+from TNR.Network.network import Network
+from TNR.TreeTensor.identityTensor import IdentityTensor
+from TNR.Tensor.arrayTensor import ArrayTensor
+
+
+def latticeSites(shape):
+    '''
+    Returns an array of the given shape numbering the sites of a hypercubic lattice.
+    '''
+    return np.arange(int(np.prod(shape))).reshape(shape)
+
+
+def latticeBonds(shape, periodic=True):
+    '''
+    Returns an array of shape (M, 2) listing the pairs of neighbouring sites of a hypercubic
+    lattice, with sites numbered as in latticeSites. Bonds along the first axis come first,
+    then those along the second axis and so on.
+
+    The arguments are:
+            shape		-	The shape of the lattice.
+            periodic	-	If True the lattice wraps around along every axis. Otherwise the
+                                    bonds across the boundary are left out.
+    '''
+    sites = latticeSites(shape)
+    bonds = []
+    for axis in range(len(shape)):
+        pairs = np.stack((sites, np.roll(sites, -1, axis=axis)), axis=-1)
+        if not periodic:
+            pairs = np.take(pairs, range(shape[axis] - 1), axis=axis)
+        bonds.append(pairs.reshape(-1, 2))
+    return np.concatenate(bonds)
+
+
+def latticeStencils(shape):
+    '''
+    Returns an array of shape (N, 1 + 2 * len(shape)) listing each site of a periodic
+    hypercubic lattice followed by its neighbours before and after it along each axis in
+    turn, with sites numbered as in latticeSites.
+    '''
+    sites = latticeSites(shape)
+    legs = [sites]
+    for axis in range(len(shape)):
+        legs.append(np.roll(sites, 1, axis=axis))
+        legs.append(np.roll(sites, -1, axis=axis))
+    return np.stack(legs, axis=-1).reshape(-1, 1 + 2 * len(shape))
+
+
+def buildLattice(nSites, dimension, factors, accuracy, dtype=None):
+    '''
+    Builds a network from the specified sites and factors.
+
+    The arguments are:
+            nSites		-	The number of sites.
+            dimension	-	The dimension of the variable on each site.
+            factors		-	A list of pairs (legs, tensor). legs is an integer array of
+                                    shape (M, k) holding the site attached to each of the k legs of
+                                    each of M factors. tensor is either a Tensor shared by all M
+                                    factors or an array of shape (M,) + (dimension,) * k holding
+                                    one factor per row.
+            accuracy	-	The accuracy of the IdentityTensors on the sites.
+            dtype		-	The dtype policy of the network.
+
+    Returns the network.
+    '''
+    network = Network(dtype=dtype)
+
+    legs = [np.asarray(l, dtype=int).reshape(len(l), -1) for l, _ in factors]
+
+    # Each site needs one leg per factor leg attached to it. These are handed out in the
+    # order the factor legs are listed, which a stable sort of the sites gives directly.
+    sites = np.concatenate([l.ravel() for l in legs])
+    degree = np.bincount(sites, minlength=nSites)
+    order = np.argsort(sites, kind='stable')
+    slots = np.empty(len(sites), dtype=int)
+    slots[order] = np.arange(len(sites)) - (np.cumsum(degree) - degree)[sites[order]]
+
+    # Sites of equal degree are structural copies of one IdentityTensor, and so share
+    # its arrays.
+    templates = {}
+    lattice = []
+    for d in degree:
+        if d not in templates:
+            templates[d] = IdentityTensor(dimension, d, accuracy=accuracy, dtype=dtype)
+        lattice.append(Node(templates[d].copy()))
+
+    nodes = []
+    for l, (_, tensor) in zip(legs, factors):
+        if isinstance(tensor, np.ndarray):
+            if tensor.shape[0] != l.shape[0]:
+                raise ValueError('Stacked factors have ' + str(tensor.shape[0]) +
+                                 ' rows but there are ' + str(l.shape[0]) + ' factors.')
+            nodes.extend(Node(ArrayTensor(t, dtype=dtype)) for t in tensor)
+        else:
+            if dtype is not None:
+                tensor = tensor.astype(dtype)
+            if hasattr(tensor, 'network'):
+                nodes.extend(Node(tensor.copy()) for _ in range(len(l)))
+            else:
+                nodes.extend(Node(tensor) for _ in range(len(l)))
+
+    # Attach links
+    k = 0
+    offset = 0
+    for l in legs:
+        for m in range(l.shape[0]):
+            node = nodes[offset + m]
+            for j in range(l.shape[1]):
+                Link(lattice[sites[k]].buckets[slots[k]], node.buckets[j])
+                k += 1
+        offset += l.shape[0]
+
+    # Add to Network
+    for n in lattice:
+        network.addNode(n)
+    for n in nodes:
+        network.addNode(n)
+
+    return network
+
+
+def latticeCell(onSite, bond, ndim, open=None):
+    '''
+    Returns the unit-cell tensor of a translation-invariant model on a hypercubic lattice,
+    with one index before and one after the site along each axis in turn. The bond term is
+    split across the two sites it couples, so that contracting the index after one cell
+    with the index before the next one restores it.
+
+    The arguments are:
+            onSite		-	The on-site term, an array of shape (dimension,).
+            bond		-	The bond term, an array of shape (dimension, dimension)
+                                    whose first index is the site before the bond.
+            ndim		-	The number of dimensions of the lattice.
+            open		-	If not None, a sequence of ndim pairs of booleans marking the
+                                    sides of the cell, before and after the site along each
+                                    axis, on which there is no bond. These indices have
+                                    dimension one, as for cells on the edge of an open lattice.
+    '''
+    u, s, v = np.linalg.svd(bond)
+    keep = s > s[0] * np.finfo(s.dtype).eps
+    after = u[:, keep] * np.sqrt(s[keep])
+    before = np.sqrt(s[keep])[:, np.newaxis] * v[keep]
+
+    if open is None:
+        open = [(False, False)] * ndim
+
+    cell = np.asarray(onSite)
+    for o in open:
+        b = np.ones((1, len(cell))) if o[0] else before
+        a = np.ones((len(cell), 1)) if o[1] else after
+        cell = np.einsum('...s,as,sb->...abs', cell, b, a)
+    return np.einsum('...s->...', cell)
+
+
+def stencilCell(factor, ndim):
+    '''
+    Returns the unit-cell tensor of a model on a periodic hypercubic lattice whose factors
+    are stencils, one per site, coupling the site to its neighbours as in latticeStencils.
+    The cell holds the site and its own stencil. Since the stencils on either end of a bond
+    both see the values of both sites, each bond carries the pair of them, and so has the
+    square of the dimension of the variable. Indices are ordered as in latticeCell, with
+    the index before the site holding the pair (neighbour, site) and the one after it the
+    pair (site, neighbour).
+
+    The arguments are:
+            factor		-	The stencil, an array with one index for the site followed
+                                    by one for its neighbours before and after it along each
+                                    axis in turn.
+            ndim		-	The number of dimensions of the lattice.
+    '''
+    d = factor.shape[0]
+    k = 1 + 2 * ndim
+
+    # The site is copied onto each of its bonds.
+    copies = np.zeros((d,) * k)
+    copies[(np.arange(d),) * k] = 1
+
+    out = []
+    for axis in range(ndim):
+        before = 1 + 2 * axis
+        out += [before, k + 2 * axis, k + 2 * axis + 1, before + 1]
+    cell = np.einsum(factor, list(range(k)), copies, [0] + list(range(k, 2 * k - 1)), out)
+    return cell.reshape((d * d,) * (2 * ndim))
+
+
+def enumerateStencils(factor, shape):
+    '''
+    Returns the log of the partition function of the model with the stencil factor on
+    every site of the periodic hypercubic lattice of the specified shape, as in
+    stencilCell, by summing over every configuration, for checking small lattices.
+    '''
+    stencils = latticeStencils(shape)
+    d = factor.shape[0]
+    configs = np.indices((d,) * len(stencils)).reshape((len(stencils), -1)).T
+    weights = factor[tuple(np.moveaxis(configs[:, stencils], -1, 0))]
+    return np.log(np.sum(np.prod(weights, axis=1)))
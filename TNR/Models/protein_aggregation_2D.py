@@ -1,26 +1,15 @@
 import numpy as np
 from scipy.integrate import quad
 
-from TNR.Network.link import Link
-from TNR.Network.node import Node
-from TNR.Network.network import Network
-from TNR.TreeTensor.identityTensor import IdentityTensor
 from TNR.Tensor.arrayTensor import ArrayTensor
+from TNR.Models.lattice import latticeStencils, buildLattice, stencilCell
 
 
-def PA2D(nX, nY, h, J, q, accuracy):
-    network = Network()
-
-    # Place to store the tensors
-    lattice = [[] for i in range(nX)]
-    bondL = [[] for i in range(nX)]
-
-    # Each lattice site has seven indices of width five, and returns zero if
-    # they are unequal and one otherwise.
-    for i in range(nX):
-        for j in range(nY):
-            lattice[i].append(Node(IdentityTensor(2, 5, accuracy=accuracy)))
-
+def PA2Dstencil(h, J, q):
+    '''
+    Returns the stencil factor of the 2D protein aggregation model, with one index for a
+    site followed by one for its neighbours before and after it along each axis in turn.
+    '''
     arr = np.zeros((2, 2))
 
     # 2-point
@@ -56,24 +45,21 @@ def PA2D(nX, nY, h, J, q, accuracy):
                     if j + k + l + m >= 4:
                         arr[1, j, k, l, m] = 0
 
-    # Make L-bonds
-    for i in range(nX):
-        for j in range(nY):
-            bondL[i].append(Node(ArrayTensor(arr)))
+    return arr
+
+
+def PA2D(nX, nY, h, J, q, accuracy, dtype=None):
+    arr = PA2Dstencil(h, J, q)
 
-    # Attach links
-    for i in range(nX):
-        for j in range(nY):
-            Link(lattice[i][j].buckets[0], bondL[i][j].buckets[0])
-            Link(lattice[i][j].buckets[1], bondL[(i + 1) % nX][j].buckets[1])
-            Link(lattice[i][j].buckets[2], bondL[i - 1][j].buckets[2])
-            Link(lattice[i][j].buckets[3], bondL[i][(j + 1) % nY].buckets[3])
-            Link(lattice[i][j].buckets[4], bondL[i][j - 1].buckets[4])
+    # Each L-bond couples a site to its four neighbours.
+    return buildLattice(nX * nY, 2, [(latticeStencils((nX, nY)), ArrayTensor(arr))],
+                        accuracy, dtype=dtype)
 
-    # Add to Network
-    for i in range(nX):
-        for j in range(nY):
-            network.addNode(lattice[i][j])
-            network.addNode(bondL[i][j])
 
-    return network
+def PA2DCell(h, J, q, dtype=None):
+    '''
+    Returns the unit-cell tensor of the 2D protein aggregation model on a periodic lattice,
+    holding a site and its own stencil, with indices ordered as in latticeCell. Each bond
+    carries the values of both sites it joins, and so has dimension four.
+    '''
+    return ArrayTensor(stencilCell(PA2Dstencil(h, J, q), 2), dtype=dtype)
@@ -1,34 +1,16 @@
 import numpy as np
 from scipy.integrate import quad
-from copy import deepcopy
 
-from TNR.Network.link import Link
-from TNR.Network.node import Node
-from TNR.Network.network import Network
-from TNR.TreeTensor.identityTensor import IdentityTensor
 from TNR.TreeTensor.treeTensor import TreeTensor
 from TNR.Tensor.arrayTensor import ArrayTensor
+from TNR.Models.lattice import latticeStencils, buildLattice, stencilCell
 
 
-def PA3D(nX, nY, nZ, h, J, q, accuracy):
-    network = Network()
-
-    # Place to store the tensors
-    lattice = [[[] for j in range(nY)] for i in range(nX)]
-    bondL = [[[] for j in range(nY)] for i in range(nX)]
-
-    # Each lattice site has seven indices of width five, and returns zero if
-    # they are unequal and one otherwise.
-    for i in range(nX):
-        for j in range(nY):
-            for k in range(nZ):
-                lattice[i][j].append(
-                    Node(
-                        IdentityTensor(
-                            2,
-                            7,
-                            accuracy=accuracy)))
-
+def PA3Dstencil(h, J, q):
+    '''
+    Returns the stencil factor of the 3D protein aggregation model, with one index for a
+    site followed by one for its neighbours before and after it along each axis in turn.
+    '''
     arr = np.zeros((2, 2))
 
     # 2-point
@@ -96,39 +78,23 @@ def PA3D(nX, nY, nZ, h, J, q, accuracy):
                             if j + k + l + m + n + p >= 4:
                                 arr[1, j, k, l, m, n, p] = 0
 
-    t = ArrayTensor(arr)
+    return arr
+
+
+def PA3D(nX, nY, nZ, h, J, q, accuracy, dtype=None):
+    t = ArrayTensor(PA3Dstencil(h, J, q))
     tt = TreeTensor(accuracy)
     tt.addTensor(t)
 
-    # Make L-bonds
-    for i in range(nX):
-        for j in range(nY):
-            for k in range(nZ):
-                bondL[i][j].append(Node(deepcopy(tt)))
-
-    # Attach links
-    for i in range(nX):
-        for j in range(nY):
-            for k in range(nZ):
-                Link(lattice[i][j][k].buckets[0], bondL[i][j][k].buckets[0])
-                Link(lattice[i][j][k].buckets[1],
-                     bondL[(i + 1) % nX][j][k].buckets[1])
-                Link(lattice[i][j][k].buckets[2],
-                     bondL[i - 1][j][k].buckets[2])
-                Link(lattice[i][j][k].buckets[3],
-                     bondL[i][(j + 1) % nY][k].buckets[3])
-                Link(lattice[i][j][k].buckets[4],
-                     bondL[i][j - 1][k].buckets[4])
-                Link(lattice[i][j][k].buckets[5],
-                     bondL[i][j][(k + 1) % nZ].buckets[5])
-                Link(lattice[i][j][k].buckets[6],
-                     bondL[i][j][k - 1].buckets[6])
-
-    # Add to Network
-    for i in range(nX):
-        for j in range(nY):
-            for k in range(nZ):
-                network.addNode(lattice[i][j][k])
-                network.addNode(bondL[i][j][k])
-
-    return network
+    # Each L-bond couples a site to its six neighbours.
+    return buildLattice(nX * nY * nZ, 2, [(latticeStencils((nX, nY, nZ)), tt)],
+                        accuracy, dtype=dtype)
+
+
+def PA3DCell(h, J, q, dtype=None):
+    '''
+    Returns the unit-cell tensor of the 3D protein aggregation model on a periodic lattice,
+    holding a site and its own stencil, with indices ordered as in latticeCell. Each bond
+    carries the values of both sites it joins, and so has dimension four.
+    '''
+    return ArrayTensor(stencilCell(PA3Dstencil(h, J, q), 3), dtype=dtype)
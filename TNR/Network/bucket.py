@@ -4,30 +4,65 @@ import itertools
 class Bucket:
     newid = itertools.count().__next__
 
+    # Buckets are by far the most numerous objects in a network, so they
+    # carry no instance dictionary.
+    __slots__ = ('id', '_node', '_link', '_index')
+
     def __init__(self):
         self.id = Bucket.newid()
-        self.node = None
-        self.link = None
+        self._node = None
+        self._link = None
+        self._index = None
+
+    @property
+    def node(self):
+        return self._node
+
+    @node.setter
+    def node(self, node):
+        # Moving a Bucket changes the neighbours of the Node on the other side of
+        # its Link as well as those of the Nodes it moves between.
+        if self._node is not None:
+            self._node._connected = None
+        if self._link is not None:
+            other = self._link.otherBucket(self)._node
+            if other is not None:
+                other._connected = None
+        if node is not None:
+            node._connected = None
+        self._node = node
+
+    @property
+    def link(self):
+        return self._link
+
+    @link.setter
+    def link(self, link):
+        self._link = link
+        if self._node is not None:
+            self._node._connected = None
+            if self._node.network is not None:
+                self._node.network.nodeChanged(self._node)
 
     @property
     def otherBucket(self):
-        return self.link.otherBucket(self)
+        return self._link.otherBucket(self)
 
     @property
     def otherNode(self):
-        return self.link.otherBucket(self).node
+        return self._link.otherBucket(self)._node
 
     @property
     def linked(self):
-        return (self.link is not None)
+        return (self._link is not None)
 
     @property
     def index(self):
-        return self.node.bucketIndex(self)
+        return self._index
 
     @property
     def size(self):
-        return self.node.tensor.shape[self.index]
+        return self._node.tensor.shape[self._index]
 
     @property
     def otherSize(self):
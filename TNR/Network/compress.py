@@ -25,12 +25,14 @@ def compressLink(l, accuracy):
     a1 = ndArrayToMatrix(arr1, ind1I, front=False)
     a2 = ndArrayToMatrix(arr2, ind2I, front=True)
 
-    if a1.shape[1] < a1.shape[0] and a2.shape[0] < a2.shape[1]:
-        arr = matrixProductLinearOperator(a1, a2)
-        u, lam, v, p, cp = svdByPrecision(arr, accuracy, True)
-    else:
-        arr = np.dot(a1, a2)
-        u, lam, v, p, cp = svdByPrecision(arr, accuracy, True)
+    # matrixProductLinearOperator only forms the product when that is cheaper than
+    # applying the factors separately.
+    arr = matrixProductLinearOperator(a1, a2)
+    u, lam, v = svdByPrecision(arr, accuracy, True)
+
+    p = lam**2
+    p /= np.sum(p)
+    cp = np.cumsum(p)
 
     ind = np.searchsorted(cp, accuracy, side='left')
     ind = len(cp) - ind
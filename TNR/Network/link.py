@@ -4,6 +4,8 @@ import itertools
 class Link:
     newid = itertools.count().__next__
 
+    __slots__ = ('id', 'bucket1', 'bucket2')
+
     def __init__(self, b1, b2):
         assert not b1.linked
         assert not b2.linked
@@ -14,9 +16,9 @@ class Link:
         b2.link = self
 
     def otherBucket(self, bucket):
-        if bucket == self.bucket1:
+        if bucket is self.bucket1:
             return self.bucket2
-        elif bucket == self.bucket2:
+        elif bucket is self.bucket2:
             return self.bucket1
         else:
             raise ValueError
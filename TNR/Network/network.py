@@ -1,6 +1,10 @@
 from TNR.Network.node import Node
 from TNR.Network.link import Link
+from TNR.Network.table import NetworkTable
 from TNR.Network.compress import compressLink
+from TNR.Tensor.arrayTensor import ArrayTensor
+from TNR.Utilities.plans import tensordot
+from TNR.Utilities.batch import batchContract
 
 from copy import deepcopy
 import numpy as np
@@ -15,14 +19,72 @@ class Network:
     '''
     A Network is an object storing Nodes as well as providing helper methods
     for manipulating those Nodes.
+
+    A Network may carry a dtype policy. When it does, every Tensor entering the Network
+    is cast according to it, so merges and splits downstream inherit the same precision.
     '''
 
-    def __init__(self):
+    def __init__(self, dtype=None):
+        self.dtype = dtype
         self.nodes = set()
         self.buckets = set()
         self.internalBuckets = set()
         self.externalBuckets = set()
         self.optimizedLinks = set()
+        self.version = 0
+        self.listeners = []
+        self._table = None
+
+    def __getstate__(self):
+        # Listeners and the table refer to this particular Network, so copies
+        # start without them and rebuild the table when needed.
+        state = dict(self.__dict__)
+        state['listeners'] = []
+        state['_table'] = None
+        return state
+
+    def subscribe(self, listener):
+        '''
+        Registers listener to be called as listener(event, *args) after every change to
+        the topology of the Network. The events are:
+                'addNode'		-	(node,) once node has been added.
+                'removeNode'	-	(node,) just before node is removed.
+                'changeNode'	-	(node,) when the tensor, Buckets or Links of node change.
+                'mergeBuckets'	-	(node, buckets, bucket) when the buckets of node are
+                                        merged into bucket.
+                'mergeNodes'	-	(n1, n2, node) when n1 and n2 are merged into node.
+        Merges are also reported through the events of their parts.
+        '''
+        self.listeners.append(listener)
+
+    def unsubscribe(self, listener):
+        self.listeners.remove(listener)
+
+    def publish(self, event, *args):
+        '''
+        Increments the version of the Network and reports event to all listeners.
+        '''
+        self.version += 1
+        for listener in self.listeners:
+            listener(event, *args)
+
+    @property
+    def table(self):
+        '''
+        A NetworkTable holding the topology of the Network in arrays. It is built on
+        first use and kept up to date from then on.
+        '''
+        if self._table is None:
+            self._table = NetworkTable(self)
+            self.subscribe(self._table.update)
+        return self._table
+
+    def nodeChanged(self, node):
+        '''
+        Called by Nodes in the Network when their tensor, Buckets or Links change.
+        '''
+        if node in self.nodes:
+            self.publish('changeNode', node)
 
     def __str__(self):
         s = 'Network\n'
@@ -62,7 +124,7 @@ class Network:
             n = isolated.pop()
             arr2 = n.tensor.array
             logAcc += np.log(np.max(np.abs(arr2)))
-            arr = np.tensordot(arr, arr2 / np.max(np.abs(arr2)), axes=0)
+            arr = tensordot(arr, arr2 / np.max(np.abs(arr2)), axes=0)
             logger.debug('Computing array. Log is ' + str(logAcc) + '.')
             buckets.extend(n.buckets)
 
@@ -97,6 +159,9 @@ class Network:
         assert node not in self.nodes
         assert node.network is None
 
+        if self.dtype is not None:
+            node.tensor = node.tensor.astype(self.dtype)
+
         node.network = self
         self.nodes.add(node)
         for b in node.buckets:
@@ -109,6 +174,8 @@ class Network:
             else:
                 self.externalBuckets.add(b)
 
+        self.publish('addNode', node)
+
     def removeNode(self, node):
         '''
         De-registers a Node from the Network.
@@ -119,6 +186,8 @@ class Network:
         '''
         assert node in self.nodes
 
+        self.publish('removeNode', node)
+
         node.network = None
         self.nodes.remove(node)
         for b in node.buckets:
@@ -131,10 +200,10 @@ class Network:
             if b in self.externalBuckets:
                 self.externalBuckets.remove(b)
 
-    def dummyMergeNodes(self, n1, n2):
+    def mergeIndices(self, n1, n2):
         '''
-        Calculates the tensor and bucket array which would arise
-        were the nodes n1 and n2 to be merged.
+        Returns the indices on n1 and n2 which a merge of the two would contract,
+        as a pair of lists, and the list of buckets the merged Node would have.
         '''
         links = n1.linksConnecting(n2)
         indices = [[], []]
@@ -149,8 +218,6 @@ class Network:
             indices[0].append(b1.index)
             indices[1].append(b2.index)
 
-        t = n1.tensor.contract(indices[0], n2.tensor, indices[1])
-
         buckets = []
         for b in n1.buckets:
             if not b.linked or b.otherBucket not in n2.buckets:
@@ -159,14 +226,18 @@ class Network:
             if not b.linked or b.otherBucket not in n1.buckets:
                 buckets.append(b)
 
-        return t, buckets
+        return indices, buckets
 
-    def mergeNodes(self, n1, n2):
+    def dummyMergeNodes(self, n1, n2):
         '''
-        Merges the specified Nodes.
+        Calculates the tensor and bucket array which would arise
+        were the nodes n1 and n2 to be merged.
         '''
-        t, buckets = self.dummyMergeNodes(n1, n2)
+        indices, buckets = self.mergeIndices(n1, n2)
+        t = n1.tensor.contract(indices[0], n2.tensor, indices[1])
+        return t, buckets
 
+    def replaceNodes(self, n1, n2, t, buckets):
         n = Node(t, Buckets=buckets)
 
         # The order matters here: we have to remove the old nodes before
@@ -175,9 +246,140 @@ class Network:
         self.removeNode(n1)
         self.removeNode(n2)
         self.addNode(n)
+        self.publish('mergeNodes', n1, n2, n)
 
         return n
 
+    def mergeNodes(self, n1, n2):
+        '''
+        Merges the specified Nodes.
+        '''
+        t, buckets = self.dummyMergeNodes(n1, n2)
+        return self.replaceNodes(n1, n2, t, buckets)
+
+    def mergeNodesBatch(self, pairs):
+        '''
+        Merges each of the specified pairs of Nodes. No Node may appear in more than one
+        pair. Pairs of ArrayTensors are contracted together through batchContract, so that
+        the many small merges of a tree are not each dispatched separately.
+
+        Returns the list of merged Nodes, in the order of the pairs.
+        '''
+        merged = [None] * len(pairs)
+        batched = []
+        for k, (n1, n2) in enumerate(pairs):
+            if hasattr(n1.tensor, 'network') or hasattr(n2.tensor, 'network'):
+                merged[k] = self.mergeNodes(n1, n2)
+            else:
+                batched.append((k, n1, n2) + tuple(self.mergeIndices(n1, n2)))
+
+        tensors = batchContract([b[1].tensor for b in batched],
+                                [b[2].tensor for b in batched],
+                                [b[3][0] for b in batched],
+                                [b[3][1] for b in batched])
+
+        for (k, n1, n2, _, buckets), t in zip(*(batched, tensors)):
+            merged[k] = self.replaceNodes(n1, n2, t, buckets)
+
+        return merged
+
+    def mergeSmallNodes(self, rank, minRank=0):
+        '''
+        Merges each Node of rank between minRank and rank inclusive into one of its
+        neighbours until no such Node remains connected to the rest of the Network. Each
+        round merges a set of disjoint pairs together through mergeNodesBatch.
+
+        Returns the list of merged Nodes.
+        '''
+        merged = []
+        while True:
+            used = set()
+            pairs = []
+            for n in self.nodes:
+                if minRank <= n.tensor.rank <= rank and n not in used:
+                    for m in self.internalConnected(n):
+                        if m not in used:
+                            pairs.append((n, m))
+                            used.update((n, m))
+                            break
+
+            if len(pairs) == 0:
+                break
+
+            merged.extend(self.mergeNodesBatch(pairs))
+
+        return merged
+
+    def simplify(self):
+        '''
+        Reduces the Network to an equivalent one with fewer Nodes and Links, without any
+        approximation beyond that of TreeTensor contraction. Until nothing changes, every
+        Node of rank at most two is merged into a neighbour, parallel Links are fused, and
+        Links of dimension one are cut. Both merging and fusing Links may close loops inside
+        TreeTensors, so these are eliminated on every Node touched.
+
+        Returns the number of Nodes removed.
+        '''
+        start = len(self.nodes)
+        changed = True
+        while changed:
+            touched = self.mergeSmallNodes(2)
+
+            changed = False
+            for n in list(self.nodes):
+                if n in self.nodes:
+                    merged = self.mergeLinks(n)
+                    if len(merged) > 0:
+                        touched.extend([n] + merged)
+                        changed = True
+
+            for n in set(touched):
+                if n in self.nodes:
+                    n.eliminateLoops()
+
+            trivial = [b.link for b in self.internalBuckets if b.size == 1]
+            for l in set(trivial):
+                self.sliceLink(l, 0)
+                changed = True
+
+        logger.info('Simplified network from ' + str(start) +
+                    ' to ' + str(len(self.nodes)) + ' nodes.')
+        return start - len(self.nodes)
+
+    def sliceLink(self, link, value):
+        '''
+        Fixes the bond represented by link to the specified value. The link is cut and a
+        unit vector selecting value is contracted into each of its ends.
+        Returns the two resulting Nodes.
+        '''
+        b1 = link.bucket1
+        b2 = link.bucket2
+        assert b1 in self.internalBuckets and b2 in self.internalBuckets
+
+        b1.link = None
+        b2.link = None
+
+        nodes = []
+        for b in (b1, b2):
+            arr = np.zeros(b.size)
+            arr[value] = 1
+            n = Node(ArrayTensor(arr, dtype=b.node.tensor.dtype))
+            Link(b, n.buckets[0])
+            self.addNode(n)
+            nodes.append(self.mergeNodes(b.node, n))
+
+        return nodes
+
+    def setDtype(self, dtype):
+        '''
+        Sets the dtype policy of the Network and casts all Nodes accordingly.
+        A dtype of None removes the policy without casting anything.
+        '''
+        self.dtype = dtype
+        if dtype is not None:
+            for n in self.nodes:
+                n.tensor = n.tensor.astype(dtype)
+
     def mergeLinks(self, n, compress=False, accuracy=1e-4):
         merged = []
         for n1 in n.connectedNodes:
@@ -241,12 +443,11 @@ class Network:
         return None
 
     def internalConnected(self, node):
-        return self.nodes.intersection(set(node.connectedNodes))
+        return self.nodes.intersection(node.connectedNodes)
 
     def toGraph(self):
-        g = networkx.Graph()
-        g.add_nodes_from(self.nodes)
-        for n in self.nodes:
-            for m in self.internalConnected(n):
-                g.add_edge(n, m, weight=np.log(n.tensor.size * m.tensor.size))
-        return g
+        '''
+        Returns a networkx graph of the Nodes, built edge by edge from the table. Use
+        self.table.toSparse for an adjacency matrix that avoids building the graph.
+        '''
+        return self.table.toGraph(order=self.nodes)
@@ -5,19 +5,20 @@ from TNR.Network.bucket import Bucket
 class Node:
     newid = itertools.count().__next__
 
+    __slots__ = ('_tensor', 'id', 'network', '_buckets', '_connected')
+
     def __init__(self, tensor, Buckets=None):
-        self.tensor = tensor
+        self._tensor = tensor
         self.id = Node.newid()
         self.network = None
+        self._buckets = []
+        self._connected = None
 
         if Buckets is None:
             Buckets = [Bucket() for _ in range(self.tensor.rank)]
 
         self.buckets = Buckets
 
-        for b in Buckets:
-            b.node = self
-
     def __str__(self):
         s = 'Node with ID ' + str(self.id) + \
             ' and tensor shape ' + str(self.tensor.shape)
@@ -26,13 +27,49 @@ class Node:
             s = s + str(n.id) + ' ' + str(self.indicesConnecting(n)) + '\n'
         return s
 
+    @property
+    def tensor(self):
+        return self._tensor
+
+    @tensor.setter
+    def tensor(self, tensor):
+        self._tensor = tensor
+        if self.network is not None:
+            self.network.nodeChanged(self)
+
+    @property
+    def buckets(self):
+        return self._buckets
+
+    @buckets.setter
+    def buckets(self, buckets):
+        '''
+        Sets the list of Buckets, recording in each its position so that Bucket.index
+        is a lookup. The list must be replaced rather than modified in place.
+        '''
+        self._buckets = buckets
+        self._connected = None
+        for i, b in enumerate(buckets):
+            b.node = self
+            b._index = i
+        if self.network is not None:
+            self.network.nodeChanged(self)
+
     @property
     def linkedBuckets(self):
-        return [b for b in self.buckets if b.linked]
+        return [b for b in self._buckets if b.linked]
 
     @property
     def connectedNodes(self):
-        return set([b.otherBucket.node for b in self.linkedBuckets])
+        '''
+        The set of Nodes linked to this one. This is cached, and the cache is cleared
+        whenever the Buckets or Links of this Node or its neighbours change, so the set
+        is shared and must not be modified.
+        '''
+        if self._connected is None:
+            self._connected = frozenset(
+                b.otherBucket.node for b in self._buckets if b.linked)
+        return self._connected
 
     def findLinks(self, other):
         links = []
@@ -74,7 +111,8 @@ class Node:
         return indices
 
     def bucketIndex(self, b):
-        return self.buckets.index(b)
+        assert b.node is self
+        return b.index
 
     def eliminateLoops(self):
         if hasattr(self.tensor, 'compressedSize'):
@@ -87,10 +125,11 @@ class Node:
         In the case of a TreeTensor this merges the external legs.
         '''
         inds = [b.index for b in buckets]
-        self.tensor = self.tensor.flatten(inds)
-        self.buckets = [b for i, b in enumerate(self.buckets) if i not in inds]
-        self.buckets.append(Bucket())
-        self.buckets[-1].node = self
+        # The tensor and Buckets are swapped together, so the Network is only
+        # notified once both agree.
+        self._tensor = self.tensor.flatten(inds)
+        self.buckets = [b for i, b in enumerate(self.buckets)
+                        if i not in inds] + [Bucket()]
 
         network = self.network
         if network is not None:
@@ -111,4 +150,6 @@ class Node:
                 raise ValueError(
                     'Error: Provided buckets are a mixture of internal and external buckets!')
 
+            network.publish('mergeBuckets', self, buckets, self.buckets[-1])
+
         return self.buckets[-1]
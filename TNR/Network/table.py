@@ -0,0 +1,201 @@
+import numpy as np
+import networkx
+from scipy.sparse import csr_matrix
+
+
+class NetworkTable:
+    '''
+    A NetworkTable is a columnar view of the topology of a Network. Each Node occupies a
+    row holding its size and rank, and each Link joining two Nodes of the Network occupies
+    a row holding the rows of its ends and its dimension. Rows freed by removed Nodes and
+    Links are reused, and a mask marks which rows are live.
+
+    The table subscribes to the events of its Network, which report every Node added or
+    removed and every change to the tensor, Buckets or Links of a Node, so the table never
+    has to be rebuilt. This lets heuristics score every edge of the Network with a few
+    array operations instead of walking the object graph.
+    '''
+
+    def __init__(self, network):
+        self.nodeRows = {}
+        self.nodes = []
+        self.freeNodes = []
+        self.size = np.zeros(0)
+        self.rank = np.zeros(0, dtype=int)
+        self.nodeLive = np.zeros(0, dtype=bool)
+
+        self.edgeRows = {}
+        self.links = []
+        self.freeEdges = []
+        self.ends = np.zeros((0, 2), dtype=int)
+        self.dim = np.zeros(0, dtype=int)
+        self.edgeLive = np.zeros(0, dtype=bool)
+
+        # The Links of each Node which have rows in the table.
+        self.incident = {}
+
+        for n in network.nodes:
+            self.addNode(n)
+
+    def update(self, event, *args):
+        if event == 'addNode':
+            self.addNode(args[0])
+        elif event == 'removeNode':
+            self.removeNode(args[0])
+        elif event == 'changeNode' and args[0] in self.nodeRows:
+            self.syncNode(args[0])
+
+    def addNode(self, node):
+        if len(self.freeNodes) > 0:
+            row = self.freeNodes.pop()
+            self.nodes[row] = node
+        else:
+            row = len(self.nodes)
+            self.nodes.append(node)
+            if row == len(self.size):
+                capacity = max(8, 2 * row)
+                self.size = np.resize(self.size, capacity)
+                self.rank = np.resize(self.rank, capacity)
+                self.nodeLive = np.resize(self.nodeLive, capacity)
+                self.nodeLive[row:] = False
+
+        self.nodeRows[node] = row
+        self.nodeLive[row] = True
+        self.incident[node] = set()
+        self.syncNode(node)
+
+    def removeNode(self, node):
+        for l in list(self.incident[node]):
+            self.removeEdge(l)
+        del self.incident[node]
+
+        row = self.nodeRows.pop(node)
+        self.nodes[row] = None
+        self.nodeLive[row] = False
+        self.freeNodes.append(row)
+
+    def valid(self, link):
+        '''
+        Returns True if link currently joins two Nodes in the table.
+        '''
+        for b in (link.bucket1, link.bucket2):
+            n = b.node
+            if b.link is not link or n not in self.nodeRows:
+                return False
+            if b.index >= len(n.buckets) or n.buckets[b.index] is not b:
+                return False
+        return True
+
+    def syncNode(self, node):
+        '''
+        Brings the row of node and the rows of the Links on it up to date.
+        '''
+        row = self.nodeRows[node]
+        self.size[row] = node.tensor.size
+        self.rank[row] = node.tensor.rank
+
+        links = set(b.link for b in node.buckets if b.linked)
+        for l in self.incident[node].difference(links):
+            self.removeEdge(l)
+        for l in links:
+            if l not in self.edgeRows and self.valid(l):
+                self.addEdge(l)
+            if l in self.edgeRows:
+                self.dim[self.edgeRows[l]] = l.bucket1.size
+
+    def addEdge(self, link):
+        if len(self.freeEdges) > 0:
+            row = self.freeEdges.pop()
+            self.links[row] = link
+        else:
+            row = len(self.links)
+            self.links.append(link)
+            if row == len(self.dim):
+                capacity = max(8, 2 * row)
+                self.ends = np.resize(self.ends, (capacity, 2))
+                self.dim = np.resize(self.dim, capacity)
+                self.edgeLive = np.resize(self.edgeLive, capacity)
+                self.edgeLive[row:] = False
+
+        n1 = link.bucket1.node
+        n2 = link.bucket2.node
+        self.edgeRows[link] = row
+        self.ends[row] = (self.nodeRows[n1], self.nodeRows[n2])
+        self.edgeLive[row] = True
+        self.incident[n1].add(link)
+        self.incident[n2].add(link)
+
+    def removeEdge(self, link):
+        row = self.edgeRows.pop(link)
+        self.links[row] = None
+        self.edgeLive[row] = False
+        self.freeEdges.append(row)
+        for i in self.ends[row]:
+            self.incident[self.nodes[i]].discard(link)
+
+    def edges(self):
+        '''
+        Returns the rows of the live Links, with a single Link kept for each pair of Nodes
+        joined by several.
+        '''
+        rows = np.flatnonzero(self.edgeLive[:len(self.links)])
+        ends = np.sort(self.ends[rows], axis=1)
+        _, first = np.unique(ends, axis=0, return_index=True)
+        return rows[np.sort(first)]
+
+    def toSparse(self, weights=None):
+        '''
+        Returns the symmetric adjacency matrix of the Nodes over the table's node rows,
+        with entry weights[k] for the k-th edge row returned by edges, or one for each
+        pair of Nodes joined by a Link if weights is None.
+        '''
+        rows = self.edges()
+        if weights is None:
+            weights = np.ones(len(rows))
+        n = len(self.nodes)
+        i, j = self.ends[rows].T
+        return csr_matrix((np.concatenate((weights, weights)),
+                           (np.concatenate((i, j)), np.concatenate((j, i)))), shape=(n, n))
+
+    def commonNeighbours(self, rows):
+        '''
+        Returns the number of Nodes linked to both ends of each of the specified edge rows,
+        read off the square of the adjacency matrix.
+        '''
+        if len(rows) == 0:
+            return np.zeros(0, dtype=int)
+        a = self.toSparse()
+        i, j = self.ends[rows].T
+        return np.asarray((a @ a)[i, j], dtype=int).ravel()
+
+    def toGraph(self, order=None):
+        '''
+        Returns a networkx graph of the Nodes, with each pair of linked Nodes joined by an
+        edge weighted by the log of the product of their sizes. If order is given the
+        Nodes are added in that order, and the edges in order of their earliest end, which
+        fixes how cycle searches on the graph break ties.
+
+        The edges and weights are computed from the table's arrays, but the graph itself is
+        still built node by node and edge by edge, so this costs as much as building it
+        from the Network. Only toSparse exports the table without walking its rows in
+        Python.
+        '''
+        rows = self.edges()
+        i, j = self.ends[rows].T
+
+        if order is None:
+            order = list(self.nodeRows.keys())
+        else:
+            order = list(order)
+            position = np.zeros(len(self.nodes), dtype=int)
+            position[[self.nodeRows[n] for n in order]] = np.arange(len(order))
+            first = np.argsort(np.minimum(position[i], position[j]), kind='stable')
+            i = i[first]
+            j = j[first]
+        weights = np.log(self.size[i] * self.size[j])
+
+        g = networkx.Graph()
+        g.add_nodes_from(order)
+        g.add_weighted_edges_from(
+            zip(*([self.nodes[k] for k in i], [self.nodes[k] for k in j], weights)))
+        return g
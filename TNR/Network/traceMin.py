@@ -183,6 +183,11 @@ class traceMin:
 
         otherNodes is a list of other nodes containing tree tensors whose graphs should be
         accomodated in evaluating loops.
+
+        The graphs are built once and then follow the change events of the networks
+        involved, so each merge or swap only touches the Nodes it changes. Quantities
+        derived from the whole graph, such as the cycle basis and utility, are computed
+        when first needed after a change.
         '''
         otherNodes = None  # TODODODODODODODODODODO
         if otherNodes is None:
@@ -190,35 +195,100 @@ class traceMin:
 
         self.network = network
         self.otherNodes = otherNodes
+        self.networks = [network] + [n.tensor.network for n in otherNodes
+                                     if hasattr(n.tensor, 'compressedSize')]
+
+        # Swap benefits are cached by the set of Nodes they were computed on, and
+        # forgotten once any of those Nodes changes.
         self.diffVals = {}
+        self.cachedWith = defaultdict(set)
 
         # Construct graph and cycle basis
-        self.refresh()
-
-    def refresh(self):
-        graphs = []
-        graphs.append(self.network.toGraph())
-        for n in self.otherNodes:
-            if hasattr(n.tensor, 'compressedSize'):
-                graphs.append(n.tensor.network.toGraph())
-
-        assert len(graphs) > 0
-
-        u = networkx.Graph(networkx.union_all(graphs))
+        self.selfGraph = networkx.Graph()
+        self.g = networkx.Graph()
+        for net in self.networks:
+            for n in net.nodes:
+                self.g.add_node(n)
+                if net is network:
+                    self.selfGraph.add_node(n)
+        for n in self.g.nodes():
+            self.linkNode(n)
+        self.changed()
+
+        for net in self.networks:
+            net.subscribe(self.update)
+
+    def close(self):
+        '''
+        Stops following the networks.
+        '''
+        for net in self.networks:
+            net.unsubscribe(self.update)
+
+    def update(self, event, *args):
+        if event == 'addNode':
+            node = args[0]
+            self.g.add_node(node)
+            if node.network is self.network:
+                self.selfGraph.add_node(node)
+            self.linkNode(node)
+        elif event == 'removeNode':
+            node = args[0]
+            self.forget(node)
+            self.g.remove_node(node)
+            if node in self.selfGraph:
+                self.selfGraph.remove_node(node)
+        elif event in ('changeNode', 'mergeBuckets') and args[0] in self.g:
+            node = args[0]
+            self.forget(node)
+            self.g.remove_edges_from(list(self.g.edges(node)))
+            if node in self.selfGraph:
+                self.selfGraph.remove_edges_from(list(self.selfGraph.edges(node)))
+            self.linkNode(node)
+        else:
+            return
+        self.changed()
+
+    def linkNode(self, node):
+        '''
+        Adds the edges joining node to the other Nodes in the graph, weighted by the log of
+        the product of their sizes.
+        '''
+        for b in node.buckets:
+            if b.linked:
+                m = b.otherNode
+                if m is not node and m in self.g:
+                    weight = np.log(node.tensor.size * m.tensor.size)
+                    self.g.add_edge(node, m, weight=weight)
+                    if node in self.selfGraph and m in self.selfGraph:
+                        self.selfGraph.add_edge(node, m, weight=weight)
+
+    def forget(self, node):
+        '''
+        Discards the cached swap benefits computed on node.
+        '''
+        for key in self.cachedWith.pop(node, ()):
+            self.diffVals.pop(key, None)
 
-        for n in self.otherNodes:
-            if hasattr(n.tensor, 'compressedSize'):
-                for b in n.tensor.network.externalBuckets:
-                    if b.linked:
-                        u.add_edge(
-                            b.node, b.otherNode, weight=np.log(
-                                b.node.tensor.size * b.otherNode.tensor.size))
+    def changed(self):
+        self._util = None
+        self._cycles = None
 
-        self.selfGraph = self.network.toGraph()
-        self.g = u
+    @property
+    def cycles(self):
+        '''
+        The cycle basis of the network.
+        '''
+        if self._cycles is None:
+            self._cycles = networkx.cycles.cycle_basis(self.selfGraph)
+        return self._cycles
 
-        self.adj = networkx.adjacency_matrix(self.g, weight='weight').todense()
-        self.util = util(self.adj)
+    @property
+    def util(self):
+        if self._util is None:
+            adj = networkx.adjacency_matrix(self.g, weight='weight').todense()
+            self._util = util(adj)
+        return self._util
 
     def pretendSwapGraph(self, g, edge, b1, b2):
         '''
@@ -280,12 +350,12 @@ class traceMin:
                      str(len(self.diffVals)) +
                      ' cached values.')
 
-        cacheSet = set(nodes)
-
-        cacheSet = frozenset(cacheSet)
-        if cacheSet in self.diffVals:
+        # The benefit depends on the swap as well as on the cycles it touches.
+        cacheSet = frozenset(nodes)
+        key = (cacheSet, b1, b2)
+        if key in self.diffVals:
             logger.debug('Cache hit.')
-            return self.diffVals[cacheSet]
+            return self.diffVals[key]
 
         logger.debug('Not cached. Recomputing on' + str(len(nodes)) + 'nodes.')
         subG = g.subgraph(nodes)
@@ -298,7 +368,9 @@ class traceMin:
 
         diff = uNew - u
 
-        self.diffVals[cacheSet] = diff
+        self.diffVals[key] = diff
+        for n in cacheSet:
+            self.cachedWith[n].add(key)
 
         return diff
 
@@ -342,7 +414,6 @@ class traceMin:
         assert n2 in self.network.nodes
 
         self.network.mergeNodes(n1, n2)
-        self.refresh()
 
     def mergeSmall(self):
         '''
@@ -373,8 +444,6 @@ class traceMin:
             if not merged:
                 done.add(n1)
 
-        self.refresh()
-
         return mergedAny
 
     def swap(self, edge, b1, b2):
@@ -395,5 +464,3 @@ class traceMin:
         nodes = self.network.splitNode(
             n, ignore=[n.bucketIndex(b1), n.bucketIndex(b2)])
         logger.debug('Swap complete.')
-
-        self.refresh()
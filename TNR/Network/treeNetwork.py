@@ -7,7 +7,9 @@ from TNR.Network.node import Node
 from TNR.Network.bucket import Bucket
 from TNR.Network.link import Link
 from TNR.Tensor.arrayTensor import ArrayTensor
-from TNR.Utilities.svd import entropy, splitArray
+from TNR.Utilities.svd import entropy, splitMatrix, splitFactors
+from TNR.Utilities.svd import svdByPrecision, denseByPrecision
+from TNR.Utilities.batch import batchSVD
 
 import sys
 sys.setrecursionlimit(10000)
@@ -32,12 +34,12 @@ class TreeNetwork(Network):
     SVD factoring is used to enforce this.
     '''
 
-    def __init__(self, accuracy=1e-4):
+    def __init__(self, accuracy=1e-4, dtype=None):
         '''
         treeNetworks require an accuracy argument which determines how accurately (in terms of relative error)
-        they promise to represent their matrix elements.
+        they promise to represent their matrix elements. The dtype policy is as in Network.
         '''
-        super().__init__()
+        super().__init__(dtype=dtype)
 
         self.accuracy = accuracy
 
@@ -83,8 +85,7 @@ class TreeNetwork(Network):
         if n1 == n2:
             # So we're just tracing an arrayTensor.
             n1.tensor = n1.tensor.trace([b1.index], [b2.index])
-            n1.buckets.remove(b1)
-            n1.buckets.remove(b2)
+            n1.buckets = [b for b in n1.buckets if b is not b1 and b is not b2]
             self.externalBuckets.remove(b1)
             self.externalBuckets.remove(b2)
         else:
@@ -114,69 +115,114 @@ class TreeNetwork(Network):
         In the latter case, the pair of indices will be required to stay together.
         This is enforced by having the pair be the first one factored.
         '''
-        nodes = []
-
-        while node.tensor.rank > 3:
-            self.removeNode(node)
-
-            array = node.tensor.scaledArray
-
-            s = []
-
-            if ignore is not None:
-                p = ignore
-                ignore = None
-            else:
-                p = entropy(array)
-
-            u, v, indices1, indices2 = splitArray(
-                array, p, accuracy=self.accuracy)
-
-            if u.shape[-1] > 1:
-                b1 = Bucket()
-                b2 = Bucket()
-                n1 = Node(
-                    ArrayTensor(
-                        u,
-                        logScalar=node.tensor.logScalar /
-                        2),
-                    Buckets=[
-                        node.buckets[i] for i in indices1] +
-                    [b1])
-                n2 = Node(ArrayTensor(v,
-                                      logScalar=node.tensor.logScalar / 2),
-                          Buckets=[b2] + [node.buckets[i] for i in indices2])
-                # This line has to happen before addNode to prevent b1 and b2
-                # from becoming externalBuckets
-                _ = Link(b1, b2)
-            else:
-                # Cut link
-                u = u[..., 0]
-                v = v[0]
-                n1 = Node(
-                    ArrayTensor(
-                        u,
-                        logScalar=node.tensor.logScalar /
-                        2),
-                    Buckets=[
-                        node.buckets[i] for i in indices1])
-                n2 = Node(
-                    ArrayTensor(
-                        v,
-                        logScalar=node.tensor.logScalar /
-                        2),
-                    Buckets=[
-                        node.buckets[i] for i in indices2])
-
-            self.addNode(n1)
-            self.addNode(n2)
-            nodes.append(n1)
-
-            node = n2
-
-        nodes.append(node)
-
-        return nodes
+        return self.splitNodes([node], ignore=[ignore])[0]
+
+    def splitNodes(self, nodes, ignore=None):
+        '''
+        Splits each of the specified Nodes as splitNode does. The Nodes are independent, so
+        they are split together one factor at a time, and in each round the decompositions
+        which would use the dense SVD are carried out together through batchSVD.
+
+        ignore may be None or a list holding None or a pair of indices for each Node.
+
+        Returns the list of the Nodes each Node was split into.
+        '''
+        if ignore is None:
+            ignore = [None] * len(nodes)
+        ignore = list(ignore)
+        current = list(nodes)
+        split = [[] for _ in nodes]
+
+        while True:
+            live = [k for k, n in enumerate(current) if n.tensor.rank > 3]
+            if len(live) == 0:
+                break
+
+            matrices = []
+            for k in live:
+                self.removeNode(current[k])
+                array = current[k].tensor.scaledArray
+                if ignore[k] is not None:
+                    p = ignore[k]
+                    ignore[k] = None
+                else:
+                    p = entropy(array)
+                matrices.append(splitMatrix(array, p))
+
+            dense = [i for i, m in enumerate(matrices)
+                     if np.all(np.isfinite(m[0])) and denseByPrecision(m[0], self.accuracy)]
+            decomps = dict(zip(dense, batchSVD([matrices[i][0] for i in dense])))
+
+            for i, k in enumerate(live):
+                arr, sh1, sh2, indices1, indices2 = matrices[i]
+                if i in decomps:
+                    u, lam, v = decomps[i]
+                else:
+                    u, lam, v = svdByPrecision(arr, self.accuracy, True)
+                u, v = splitFactors(u, lam, v, sh1, sh2, accuracy=self.accuracy)
+                n1, n2 = self.replaceBySplit(current[k], u, v, indices1, indices2)
+                split[k].append(n1)
+                current[k] = n2
+
+        for k, n in enumerate(current):
+            split[k].append(n)
+
+        return split
+
+    def replaceBySplit(self, node, u, v, indices1, indices2):
+        '''
+        Adds the two Nodes holding the factors u and v of the tensor of node, which has
+        already been removed from the Network. The indices of node listed in indices1 go
+        to the first and those in indices2 to the second. Returns the two new Nodes.
+        '''
+        if u.shape[-1] > 1:
+            b1 = Bucket()
+            b2 = Bucket()
+            n1 = Node(
+                ArrayTensor(
+                    u,
+                    logScalar=node.tensor.logScalar /
+                    2,
+                    dtype=node.tensor.dtype,
+                    copy=False),
+                Buckets=[
+                    node.buckets[i] for i in indices1] +
+                [b1])
+            n2 = Node(ArrayTensor(v,
+                                  logScalar=node.tensor.logScalar / 2,
+                                  dtype=node.tensor.dtype,
+                                  copy=False),
+                      Buckets=[b2] + [node.buckets[i] for i in indices2])
+            # This line has to happen before addNode to prevent b1 and b2
+            # from becoming externalBuckets
+            _ = Link(b1, b2)
+        else:
+            # Cut link
+            u = u[..., 0]
+            v = v[0]
+            n1 = Node(
+                ArrayTensor(
+                    u,
+                    logScalar=node.tensor.logScalar /
+                    2,
+                    dtype=node.tensor.dtype,
+                    copy=False),
+                Buckets=[
+                    node.buckets[i] for i in indices1])
+            n2 = Node(
+                ArrayTensor(
+                    v,
+                    logScalar=node.tensor.logScalar /
+                    2,
+                    dtype=node.tensor.dtype,
+                    copy=False),
+                Buckets=[
+                    node.buckets[i] for i in indices2])
+
+        self.addNode(n1)
+        self.addNode(n2)
+
+        return n1, n2
 
     def eliminateLoop(self, loop):
         '''
@@ -279,12 +325,12 @@ class TreeNetwork(Network):
 
         # This is necessary because we've been rotating the loop around and so have
         # no guarantee that the rank conditions have been preserved.
-        for i in range(3):
-            if loop[i].tensor.rank > 3:
-                ind1 = loop[i].indexConnecting(loop[i - 1])
-                ind2 = loop[i].indexConnecting(loop[(i + 1) % 3])
-                nodes = self.splitNode(loop[i], ignore=[ind1, ind2])
-                loop[i] = nodes[0]
+        # The three splits are independent, so they are done together.
+        large = [i for i in range(3) if loop[i].tensor.rank > 3]
+        ignore = [[loop[i].indexConnecting(loop[i - 1]),
+                   loop[i].indexConnecting(loop[(i + 1) % 3])] for i in large]
+        for i, nodes in zip(*(large, self.splitNodes([loop[i] for i in large], ignore))):
+            loop[i] = nodes[0]
 
         assert loop[0].tensor.rank <= 3
         assert loop[1].tensor.rank <= 3
@@ -1,23 +1,65 @@
 import numpy as np
 from TNR.Tensor.tensor import Tensor
-from TNR.Utilities.arrays import permuteIndices
+from TNR.Utilities.arrays import permuteIndices, resolveDtype, chunkedTensordot
+from TNR.Utilities.memory import accountant
+from TNR.Utilities.plans import tensordot
+from TNR import config
 
 
 class ArrayTensor(Tensor):
 
-    def __init__(self, tens, logScalar=0):
-        assert np.sum(np.isnan(tens)) == 0
+    def __init__(self, tens, logScalar=0, dtype=None, copy=True):
+        '''
+        Takes as input:
+                tens		-	The array to store.
+                logScalar	-	The log of a prefactor multiplying the array.
+                dtype		-	The dtype policy to apply. Defaults to the one in the
+                                        config file. Tensors derived from others pass their
+                                        own type here so that they keep it.
+                copy		-	If False the caller hands over tens, which is then
+                                        normalized in place rather than copied. Defaults to True.
+                                        A memory map from accountant.allocate handed over this
+                                        way stays on disk.
+        '''
+        mapped = tens if isinstance(tens, np.memmap) else None
+        tens = np.asarray(tens)
+        cast = tens.astype(resolveDtype(tens.dtype, dtype), copy=False)
+        owned = (not copy or cast is not tens) and cast.flags.writeable
+
+        # A memory map only keeps its file if it is normalized in place.
+        if not owned or cast is not tens:
+            mapped = None
 
-        self._shape = tens.shape
+        self._shape = cast.shape
         self._rank = len(self._shape)
 
-        self._size = tens.size
+        self._size = cast.size
 
         # We normalize the Tensor by factoring out the log of the
-        # maximum-magnitude element.
-        m = np.max(np.abs(tens))
+        # maximum-magnitude element. For real arrays this is found from the
+        # extrema without forming a temporary, and NaN or infinite elements
+        # propagate into it so no separate validation pass is needed.
+        if np.iscomplexobj(cast):
+            m = np.max(np.abs(cast))
+        else:
+            m = max(np.max(cast), -np.min(cast))
+        assert np.isfinite(m)
+
+        if m == 0:
+            # A zero Tensor has no scale to factor out.
+            m = 1
+
         self._logScalar = np.log(m) + logScalar
-        self._array = np.copy(tens / m)
+        if owned:
+            cast /= m
+        else:
+            cast = np.asarray(cast / m)
+        cast.flags.writeable = False
+
+        # The payload may be spilled to disk while the Tensor is idle, so the
+        # array is only ever reached through it.
+        self._payload = accountant.store(self, cast, mapped=mapped)
+        self._perm = None
 
     def __str__(self):
         return 'Tensor of shape ' + str(self.shape) + '.'
@@ -34,17 +76,58 @@ class ArrayTensor(Tensor):
     def size(self):
         return self._size
 
+    @property
+    def dtype(self):
+        return self._payload.dtype
+
     @property
     def logScalar(self):
         return self._logScalar
 
     @property
     def array(self):
-        return self._array * np.exp(self.logScalar)
+        # Computed afresh on each access rather than cached, as a cached copy could not
+        # be spilled along with the payload.
+        arr = np.asarray(self.scaledArray * np.exp(self.logScalar))
+        arr.flags.writeable = False
+        return arr
 
     @property
     def scaledArray(self):
-        return self._array
+        if self._perm is None:
+            return self._payload.array
+        return np.transpose(self._payload.array, self._perm)
+
+    @property
+    def physical(self):
+        '''
+        Returns the stored array along with the permutation taking its axes to those
+        of this Tensor, so that axis i of the Tensor is axis perm[i] of the array.
+        '''
+        if self._perm is None:
+            return self._payload.array, list(range(self.rank))
+        return self._payload.array, list(self._perm)
+
+    def transpose(self, perm):
+        '''
+        Returns a Tensor whose axis i is axis perm[i] of this one. The permutation is
+        only recorded, so no data is moved until an operation needs it to be.
+        '''
+        perm = list(perm)
+        if perm == list(range(self.rank)):
+            return self
+
+        _, p = self.physical
+        t = ArrayTensor.__new__(ArrayTensor)
+        t._shape = tuple(self._shape[i] for i in perm)
+        t._rank = self._rank
+        t._size = self._size
+        t._logScalar = self._logScalar
+        t._payload = accountant.share(t, self._payload)
+        t._perm = tuple(p[i] for i in perm)
+        if t._perm == tuple(range(t._rank)):
+            t._perm = None
+        return t
 
     def contract(self, ind, other, otherInd):
         '''
@@ -62,10 +145,37 @@ class ArrayTensor(Tensor):
             # expect.
             return other.contract(otherInd, self, ind, front=False)
         else:
-            arr = np.tensordot(
-                self.scaledArray, other.scaledArray, axes=(
-                    (ind, otherInd)))
-            return ArrayTensor(arr, logScalar=self.logScalar + other.logScalar)
+            ind = [int(i) for i in np.atleast_1d(ind)]
+            otherInd = [int(i) for i in np.atleast_1d(otherInd)]
+
+            # The contraction acts on the stored arrays, so any pending permutation
+            # is folded into the transpose tensordot performs anyway. The permutation
+            # of the result is then just recorded.
+            a, pa = self.physical
+            b, pb = other.physical
+            axesA = [pa[i] for i in ind]
+            axesB = [pb[i] for i in otherInd]
+
+            dtype = np.result_type(a, b)
+            size = a.size * b.size // max(1, int(np.prod([a.shape[i] for i in axesA]))**2)
+            nbytes = a.nbytes + b.nbytes + size * dtype.itemsize
+            if nbytes > config.contractChunkBytes:
+                # Large merges are tiled so that transposed copies of whole
+                # operands are never formed. A result which is itself too large
+                # is written straight to a memory-mapped file when spilling is
+                # enabled, and its Tensor starts out spilled.
+                out = None
+                if size * dtype.itemsize > config.contractChunkBytes:
+                    shape = [a.shape[i] for i in range(a.ndim) if i not in axesA] + \
+                        [b.shape[i] for i in range(b.ndim) if i not in axesB]
+                    out = accountant.allocate(shape, dtype)
+                arr = chunkedTensordot(a, b, (axesA, axesB), out=out)
+            else:
+                arr = tensordot(a, b, axes=((axesA, axesB)))
+
+            t = ArrayTensor(arr, logScalar=self.logScalar + other.logScalar,
+                            dtype=arr.dtype, copy=False)
+            return t.transpose(contractedPerm(pa, pb, axesA, axesB))
 
     def trace(self, ind0, ind1):
         '''
@@ -80,43 +190,65 @@ class ArrayTensor(Tensor):
 
         Returns a Tensor containing the trace over all of the pairs of indices.
         '''
-        arr = self.array
-
-        ind0 = list(ind0)
-        ind1 = list(ind1)
+        # Traced pairs share a label, so a single einsum sums over all of
+        # their diagonals at once and only allocates the result.
+        labels = list(range(self.rank))
+        for i, j in zip(*(ind0, ind1)):
+            labels[j] = labels[i]
 
-        for i in range(len(ind0)):
-            arr = np.trace(arr, axis1=ind0[i], axis2=ind1[i])
-            for j in range(len(ind0)):
-                d0 = 0
-                d1 = 0
+        traced = set(ind0).union(ind1)
+        out = [labels[i] for i in range(self.rank) if i not in traced]
 
-                if ind0[j] > ind0[i]:
-                    d0 += 1
-                if ind0[j] > ind1[i]:
-                    d0 += 1
+        arr = np.einsum(self.scaledArray, labels, out)
 
-                if ind1[j] > ind0[i]:
-                    d1 += 1
-                if ind1[j] > ind1[i]:
-                    d1 += 1
-
-                ind0[j] -= d0
-                ind1[j] -= d1
-
-        return ArrayTensor(arr)
+        return ArrayTensor(arr, logScalar=self.logScalar,
+                           dtype=self.dtype, copy=False)
 
     def flatten(self, inds):
-        arr = np.copy(self.scaledArray)
-        arr = permuteIndices(arr, inds, front=False)
-        arr = np.reshape(arr, list(arr.shape[:-len(inds)]) + [-1])
-        return ArrayTensor(arr, logScalar=self.logScalar)
+        view = permuteIndices(self.scaledArray, inds, front=False)
+        arr = np.reshape(view, list(view.shape[:-len(inds)]) + [-1])
+        # The reshape copies unless the stored layout already matches, in which
+        # case the result is a view which must not be normalized in place.
+        fresh = not np.may_share_memory(arr, view)
+        return ArrayTensor(arr, logScalar=self.logScalar,
+                           dtype=self.dtype, copy=not fresh)
 
     def getIndexFactor(self, ind):
-        return self.scaledArray, ind
+        # The stored array is returned so that callers never force a transpose.
+        arr, perm = self.physical
+        return arr, perm[ind]
 
     def setIndexFactor(self, ind, arr):
-        return ArrayTensor(arr, logScalar=self.logScalar)
+        _, perm = self.physical
+        t = ArrayTensor(arr, logScalar=self.logScalar,
+                        dtype=np.result_type(self.dtype, arr))
+        return t.transpose(perm)
+
+    def astype(self, dtype):
+        '''
+        Returns a copy of this Tensor with the specified dtype policy applied.
+        '''
+        if resolveDtype(self.dtype, dtype) == self.dtype:
+            return self
+        return ArrayTensor(self.scaledArray, logScalar=self.logScalar, dtype=dtype)
 
     def __deepcopy__(self, memo):
         return self
+
+    def __reduce__(self):
+        # The payload is registered with this process's memory accountant, so
+        # unpickled copies have to be constructed afresh.
+        return (ArrayTensor, (self.scaledArray, self.logScalar, self.dtype))
+
+
+def contractedPerm(pa, pb, axesA, axesB):
+    '''
+    Returns the permutation taking the axes of np.tensordot(a, b, (axesA, axesB)) to the
+    order ArrayTensor.contract promises, where pa and pb are the permutations of the
+    Tensors whose stored arrays are a and b.
+    '''
+    freeA = [i for i in range(len(pa)) if i not in axesA]
+    freeB = [i for i in range(len(pb)) if i not in axesB]
+    perm = [freeA.index(p) for p in pa if p not in axesA]
+    perm += [len(freeA) + freeB.index(p) for p in pb if p not in axesB]
+    return perm
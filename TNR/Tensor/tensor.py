@@ -40,6 +40,23 @@ class Tensor(ABC):
         '''
         pass
 
+    @property
+    @abstractmethod
+    def dtype(self):
+        '''
+        Returns the NumPy element type of the Tensor.
+        '''
+        pass
+
+    @abstractmethod
+    def astype(self, dtype):
+        '''
+        Returns a copy of the Tensor with the specified dtype policy applied.
+        Real elements are cast to dtype, complex elements to the complex type of the same
+        precision.
+        '''
+        pass
+
     @abstractmethod
     def contract(self, ind, other, otherInd):
         '''
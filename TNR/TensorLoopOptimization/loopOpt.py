@@ -1,6 +1,12 @@
 import numpy as np
 from scipy.sparse.linalg import LinearOperator, bicgstab, lsqr
 
+from TNR.Utilities.plans import tensordot, einsum
+
+from TNR.Utilities.logger import makeLogger
+from TNR import config
+logger = makeLogger(__name__, config.levels['loopOpt'])
+
 def shift(l, n):
 	'''
 	Shifts the list l forward by n indices.
@@ -17,7 +23,7 @@ def zipTensors(t1, t2):
 	The return value is the list of rank-4 tensors which results from contracting corresponding
 	tensors in these lists.
 	'''
-	return [np.tensordot(a,b, axes=((1,),(1,))) for a,b in zip(*(t1, t2))]
+	return [tensordot(a,b, axes=((1,),(1,))) for a,b in zip(*(t1, t2))]
 
 def contractRank4(tens1, tens2):
 	'''
@@ -34,7 +40,7 @@ def contractRank4(tens1, tens2):
 	'''
 
 	# Contract tensors
-	x = np.tensordot(tens1, tens2, axes=((1,3),(0,2)))
+	x = tensordot(tens1, tens2, axes=((1,3),(0,2)))
 
 	# Now the result has the form
 	#
@@ -65,7 +71,7 @@ def contract(t1, t2):
 		x = contractRank4(x, y)
 
 	# Contract the periodic indices
-	n = np.einsum('iijj->',x)
+	n = einsum('iijj->',x)
 
 	return n
 
@@ -108,7 +114,7 @@ def normMat(tensors, index):
 	#
 	# We outer product with the identity
 	iden = np.identity(tensors[index].shape[1])
-	x = np.tensordot(x, iden, axes=(tuple(),tuple()))
+	x = tensordot(x, iden, axes=(tuple(),tuple()))
 	# This gives
 	#
 	#	0 -		  - 1
@@ -134,7 +140,7 @@ def normMat(tensors, index):
 
 	return x
 
-def optimizeTensor(t1, t2, index, eps=1e-5):
+def optimizeTensor(t1, t2, index, eps=1e-5, target=None):
 	'''
 	t1 and t2 are lists of rank-3 tensors set such that in each list the last index of
 	each contracts with the first index of the next, and the last index of the last tensor
@@ -160,10 +166,13 @@ def optimizeTensor(t1, t2, index, eps=1e-5):
 	other than that associated with t2[index], and doing the same for W.
 
 	Note that this method requires that norm(t1) == norm(t2) == 1.
+
+	If target is not None it is taken to be norm(t1), which is otherwise recomputed on
+	each call.
 	'''
 
 	# Contract the connections between the two lists
-	cont = [np.tensordot(a,b, axes=((1,1))) for a,b in zip(*(t1, t2))]
+	cont = [tensordot(a,b, axes=((1,1))) for a,b in zip(*(t1, t2))]
 	
 	# Rotate cont so that index becomes len(cont)-1.
 	cont = shift(cont, len(cont) - 1 - index)
@@ -172,13 +181,13 @@ def optimizeTensor(t1, t2, index, eps=1e-5):
 	x = cont[0]
 	x = np.swapaxes(x, 1, 2)
 	for y in cont[1:len(cont)-1]:
-		x = np.tensordot(x, y, axes=((2,3),(0,2)))
+		x = tensordot(x, y, axes=((2,3),(0,2)))
 
 
 	# Now we construct N and W.
 
 	# Contract with the tensor immediately opposing index. Flattening then yields W.
-	W = np.tensordot(x, t1[index], axes=((2,0),(0,2)))
+	W = tensordot(x, t1[index], axes=((2,0),(0,2)))
 	W = np.swapaxes(W, 0, 1)
 	W = np.swapaxes(W, 1, 2)
 	W = np.reshape(W, (-1,))
@@ -196,12 +205,14 @@ def optimizeTensor(t1, t2, index, eps=1e-5):
 
 	x = ret[index].reshape((-1,))
 	y = t2[index].reshape((-1,))
-	err0 = norm(t1) + np.dot(y, np.dot(op, y)) - 2 * np.dot(y, W)
-	err1 = norm(t1) + np.dot(x, np.dot(op, x)) - 2 * np.dot(x, W)
+	if target is None:
+		target = norm(t1)
+	err0 = target + np.dot(y, np.dot(op, y)) - 2 * np.dot(y, W)
+	err1 = target + np.dot(x, np.dot(op, x)) - 2 * np.dot(x, W)
 
 	return ret, err0, err1
 
-def optimizeRank(tensors, ranks, stop, start=None):
+def optimizeRank(tensors, ranks, stop, start=None, maxSweeps=None, target=None):
 	'''
 	tensors is a list of rank-3 tensors set such that the last index of each contracts
 	with the first index of the next, and the last index of the last tensor contracts
@@ -216,6 +227,9 @@ def optimizeRank(tensors, ranks, stop, start=None):
 	change in the error between optimization sweeps (once it drops below this point the algorithm halts).
 
 	A starting point for optimization may be provided using the option start.
+
+	If maxSweeps is not None at most that many sweeps are made. If target is not None it
+	is taken to be norm(tensors).
 	'''
 
 	# Generate random starting point and normalize.
@@ -228,14 +242,18 @@ def optimizeRank(tensors, ranks, stop, start=None):
 	# Optimization loop
 	dlnerr = 1
 	err1 = 1e100
+	sweeps = 0
+	if target is None:
+		target = norm(tensors)
 
-	while dlnerr > stop:
+	while dlnerr > stop and (maxSweeps is None or sweeps < maxSweeps):
 		for i in range(len(tensors)):
-			t2, _, err2 = optimizeTensor(tensors, t2, i)
+			t2, _, err2 = optimizeTensor(tensors, t2, i, target=target)
 		derr = (err1 - err2)
-		dlnerr = derr / err1
-		print(dlnerr,err1,err2)
+		dlnerr = derr / err1 if err1 > 0 else 0
+		logger.debug('Sweep ' + str(sweeps) + ': error ' + str(err2) + ', relative change ' + str(dlnerr) + '.')
 		err1 = err2
+		sweeps += 1
 
 	return t2, err1
 
@@ -281,13 +299,12 @@ def optimize(tensors, tol):
 				# Optimize
 				t2New, errNew = optimizeRank(tensors, ranksNew, (err)**0.5, start=start)
 				options.append((ranksNew, t2New, errNew))
-				print(ranksNew, errNew)
+				logger.debug('Ranks ' + str(ranksNew) + ': error ' + str(errNew) + '.')
 
 		# Pick the best option
-		print(min(options, key=lambda x: x[2])[2], err)
 		assert min(options, key=lambda x: x[2])[2] < err
 		ranks, t2, err = min(options, key=lambda x: x[2])
-		print(ranks, err)
+		logger.debug('Chose ranks ' + str(ranks) + ' with error ' + str(err) + '.')
 
 	return ranks, err, t2
 
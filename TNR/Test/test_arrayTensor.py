@@ -1,4 +1,5 @@
 import numpy as np
+import pytest
 from scipy.linalg import expm
 from TNR.Tensor.arrayTensor import ArrayTensor
 
@@ -73,6 +74,15 @@ def test_trace():
         assert np.sum((xt.trace([0, 3], [1, 4]).array -
                        np.einsum('iijkk->j', x))**2) < epsilon
 
+    for i in range(5):
+        # The log scale must survive traces whose result would overflow.
+        x = np.random.randn(3, 4, 3, 4)
+        xt = ArrayTensor(x, logScalar=1000)
+        tt = xt.trace([0, 1], [2, 3])
+        y = np.einsum('ijij->', x)
+        assert tt.shape == ()
+        assert abs(tt.logScalar - 1000 - np.log(abs(y))) < epsilon
+
 
 def test_flatten():
     for i in range(5):
@@ -153,3 +163,81 @@ def test_IndexFactor():
         zt2 = xt.contract([0], yt, [0])
 
         assert np.sum((zt.array - zt2.array)**2) < epsilon
+
+
+def test_dtype():
+    for i in range(5):
+        x = np.random.randn(3, 4, 3)
+        y = np.random.randn(3, 4, 3) + 1j * np.random.randn(3, 4, 3)
+
+        xt = ArrayTensor(x, dtype='float32')
+        yt = ArrayTensor(y, dtype='float32')
+
+        assert xt.dtype == np.float32
+        assert yt.dtype == np.complex64
+        assert xt.contract(0, xt, 0).dtype == np.float32
+        assert xt.contract(0, yt, 0).dtype == np.complex64
+        assert xt.trace([0], [2]).dtype == np.float32
+        assert xt.flatten([0, 1]).dtype == np.float32
+
+        zt = xt.astype('float64')
+        assert zt.dtype == np.float64
+        assert np.sum((zt.array - x)**2) / np.sum(x**2) < 1e-12
+        assert yt.astype('float64').dtype == np.complex128
+
+
+def test_buffers():
+    for i in range(5):
+        x = np.random.randn(3, 4, 3)
+        y = np.copy(x)
+
+        xt = ArrayTensor(x)
+        assert np.sum((x - y)**2) == 0
+        assert not xt.scaledArray.flags.writeable
+        assert not xt.array.flags.writeable
+
+        yt = ArrayTensor(y, copy=False)
+        assert np.shares_memory(y, yt.scaledArray)
+        assert np.sum((yt.array - x)**2) < epsilon
+
+        zt = ArrayTensor(np.zeros((3, 4)))
+        assert np.sum(zt.array**2) == 0
+
+        st = ArrayTensor(np.array(-2.))
+        assert st.array == -2.
+
+        x[0, 0, 0] = np.nan
+        with pytest.raises(AssertionError):
+            ArrayTensor(x)
+
+
+def test_transpose():
+    for i in range(5):
+        x = np.random.randn(3, 4, 5)
+        y = np.random.randn(5, 3, 2)
+
+        xt = ArrayTensor(x).transpose([2, 0, 1])
+        assert xt.shape == (5, 3, 4)
+        assert np.sum((xt.array - np.transpose(x, [2, 0, 1]))**2) < epsilon
+
+        # No data moves until it is needed.
+        arr, perm = xt.physical
+        assert arr.shape == x.shape and perm == [2, 0, 1]
+
+        yt = ArrayTensor(y).transpose([1, 2, 0])
+        zt = xt.contract([0, 1], yt, [2, 0])
+        z = np.einsum('ijk,kil->jl', x, y)
+        assert np.sum((zt.array - z)**2) < epsilon
+
+        zt = xt.contract([0], ArrayTensor(y), [0])
+        z = np.einsum('ijk,klm->ijlm', x, y)
+        assert np.sum((zt.array - np.transpose(z, [0, 1, 2, 3]))**2) < epsilon
+
+        ft = xt.flatten([0, 2])
+        f = np.reshape(np.transpose(x, [0, 2, 1]), (3, -1))
+        assert np.sum((ft.array - f)**2) < epsilon
+
+        factor, ind = xt.getIndexFactor(0)
+        assert factor.shape == x.shape and ind == 2
+        wt = xt.setIndexFactor(0, 2 * factor)
+        assert np.sum((wt.array - 2 * xt.array)**2) < epsilon
@@ -0,0 +1,20 @@
+import numpy as np
+
+from TNR.Contractors.boundaryMPS import boundaryMPS
+from TNR.Models.isingModel import IsingModel2DopenRow, enumerateIsing2D, exactIsing2D
+
+epsilon = 1e-10
+
+
+def test_boundaryMPSExact():
+    for nX, nY, h, J in [(1, 1, 0.2, 0.3), (3, 2, 0.2, 0.3), (4, 4, 0.1, -0.5), (2, 5, 0, 0.4)]:
+        z = boundaryMPS(lambda y: IsingModel2DopenRow(nX, nY, h, J, y), nY, 0)
+        assert abs(z.logScalar - enumerateIsing2D(nX, nY, h, J, periodic=False)) < 1e-8
+
+
+def test_boundaryMPSBulk():
+    # The free energy per site approaches the bulk value up to edge corrections.
+    n = 32
+    J = 0.3
+    z = boundaryMPS(lambda y: IsingModel2DopenRow(n, n, 0, J, y), n, epsilon)
+    assert abs(z.logScalar / n**2 - exactIsing2D(J)) < 1 / n
@@ -0,0 +1,32 @@
+import numpy as np
+import pytest
+
+from TNR.Contractors.ctmrg import CornerEnvironment
+from TNR.Models.isingModel import IsingModelCell, IsingSpinCell, exactIsing2D
+
+epsilon = 1e-10
+
+
+def test_ctmrgFreeEnergy():
+    # Couplings below zero favour aligned spins.
+    for J in [-0.3, 0.3, -0.6]:
+        env = CornerEnvironment(IsingModelCell(2, 0, J), 16, tol=epsilon)
+        assert env.converged
+        assert len(env.history) == env.iterations
+        assert abs(env.logPartition() - exactIsing2D(abs(J))) < 1e-8
+
+
+def test_ctmrgMagnetisation():
+    for J in [-0.5, -0.6]:
+        env = CornerEnvironment(IsingModelCell(2, 0, J), 16, tol=epsilon)
+        m = env.expectation(IsingSpinCell(2, 0, J))
+        onsager = (1 - np.sinh(-2 * J)**-4)**0.125
+        assert abs(abs(m) - onsager) < 1e-6
+
+    env = CornerEnvironment(IsingModelCell(2, 0, -0.3), 16, tol=epsilon)
+    assert abs(env.expectation(IsingSpinCell(2, 0, -0.3))) < 1e-4
+
+
+def test_ctmrgRank():
+    with pytest.raises(ValueError):
+        CornerEnvironment(IsingModelCell(3, 0, -0.3), 4)
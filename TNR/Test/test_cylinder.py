@@ -0,0 +1,38 @@
+import itertools
+import numpy as np
+
+from TNR.Contractors.cylinder import leadingEigenvalue, cylinderMPS
+from TNR.Models.isingModel import IsingModelCell, exactIsing2D
+
+epsilon = 1e-10
+
+
+def denseFreeEnergy(width, h, J):
+    # The column transfer matrix in the spin basis, with the same sign conventions as
+    # IsingModel.
+    spins = np.array(list(itertools.product([1, -1], repeat=width)))
+    column = -h * np.sum(spins, axis=1) - J * np.sum(spins * np.roll(spins, 1, axis=1), axis=1)
+    t = np.exp(column[:, np.newaxis] - J * np.dot(spins, spins.T))
+    return np.log(np.max(np.abs(np.linalg.eigvals(t)))) / width
+
+
+def test_leadingEigenvalue():
+    for width in [1, 2, 3, 5]:
+        for h, J in [(0, -0.4), (0.3, 0.5)]:
+            f = leadingEigenvalue(IsingModelCell(2, h, J), width)
+            assert abs(f - denseFreeEnergy(width, h, J)) < epsilon
+
+
+def test_cylinderMPS():
+    for width in [1, 2, 4, 6]:
+        for h, J in [(0, -0.4), (0.1, -0.44), (0.3, 0.5)]:
+            site = IsingModelCell(2, h, J)
+            f = cylinderMPS(site, width, 1e-14, tol=1e-12)
+            assert abs(f - leadingEigenvalue(site, width)) < 1e-8
+
+
+def test_cylinderMPSWide():
+    # Away from criticality wide cylinders approach the infinite lattice.
+    J = 0.3
+    f = cylinderMPS(IsingModelCell(2, 0, -J), 32, 1e-12, maxBond=16)
+    assert abs(f - exactIsing2D(J)) < 1e-8
@@ -0,0 +1,74 @@
+import numpy as np
+from copy import deepcopy
+
+from TNR.Tensor.arrayTensor import ArrayTensor
+from TNR.TreeTensor.treeTensor import TreeTensor
+from TNR.Utilities.fingerprint import fingerprint, mergeFingerprint
+from TNR.Contractors.mergeContractor import mergeContractor, MergeMemo
+from TNR.Contractors.heuristics import loopHeuristic
+from TNR.Models.isingModel import IsingModel2Dopen, enumerateIsing2D
+
+epsilon = 1e-10
+
+
+def test_arrayFingerprint():
+    x = np.random.randn(3, 4, 5)
+    assert fingerprint(ArrayTensor(x)) == fingerprint(ArrayTensor(np.copy(x)))
+    assert fingerprint(ArrayTensor(x)) != fingerprint(ArrayTensor(2 * x))
+    assert fingerprint(ArrayTensor(x)) != fingerprint(ArrayTensor(np.transpose(x, (1, 0, 2))))
+    assert fingerprint(ArrayTensor(x)) != fingerprint(ArrayTensor(x, dtype=np.float32))
+
+
+def test_treeFingerprint():
+    x = np.random.randn(2, 3, 4, 5, 6)
+    t = TreeTensor(epsilon)
+    t.addTensor(ArrayTensor(x))
+    assert len(t.network.nodes) > 1
+
+    # Copies have new Nodes and Buckets but the same structure.
+    assert fingerprint(t.copy()) == fingerprint(t)
+    assert fingerprint(deepcopy(t)) == fingerprint(t)
+
+    # Reordering the external indices changes the tensor.
+    s = t.copy()
+    s.externalBuckets = s.externalBuckets[1:] + s.externalBuckets[:1]
+    assert fingerprint(s) != fingerprint(t)
+
+    y = ArrayTensor(np.random.randn(3, 3))
+    assert mergeFingerprint(t, [1], y, [0]) == mergeFingerprint(t.copy(), [1], y, [0])
+    assert mergeFingerprint(t, [1], y, [0]) != mergeFingerprint(t, [1], y, [1])
+
+
+def test_mergeMemo():
+    h = 0.1
+    J = -0.4
+    expected = enumerateIsing2D(4, 4, h, J, periodic=False)
+
+    memo = MergeMemo()
+    n = IsingModel2Dopen(4, 4, h, J, epsilon)
+    n = mergeContractor(n, epsilon, loopHeuristic, merge=False, simplify=False, memoize=memo)
+    assert memo.hits > 0
+    assert abs(n.array[1] - expected) < epsilon
+
+    # A second contraction of the same model reuses the merges of the first.
+    hits = memo.hits
+    n = IsingModel2Dopen(4, 4, h, J, epsilon)
+    n = mergeContractor(n, epsilon, loopHeuristic, merge=False, simplify=False, memoize=memo)
+    assert memo.hits > hits
+    assert abs(n.array[1] - expected) < epsilon
+
+    # Merges done to another accuracy or without optimization are kept apart.
+    n = IsingModel2Dopen(4, 4, h, J, epsilon)
+    n1 = next(iter(n.nodes))
+    n2 = next(iter(n1.connectedNodes))
+    key = memo.key(n, n1, n2, epsilon, True)
+    assert key == memo.key(n, n1, n2, epsilon, True)
+    assert key != memo.key(n, n1, n2, 1e-6, True)
+    assert key != memo.key(n, n1, n2, epsilon, False)
+
+    memo = MergeMemo(size=0)
+    n = IsingModel2Dopen(4, 4, h, J, epsilon)
+    n = mergeContractor(n, epsilon, loopHeuristic, merge=False, simplify=False, memoize=memo)
+    assert memo.hits == 0
+    assert len(memo.results) == 0
+    assert abs(n.array[1] - expected) < epsilon
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+from functools import partial
+
+from TNR.Contractors.finiteSize import CornerBlocks, BlockCache
+from TNR.Contractors.boundaryMPS import boundaryMPS
+from TNR.Models.isingModel import IsingModel2DopenCell, IsingModel2DopenRow, enumerateIsing2D
+
+epsilon = 1e-10
+
+
+def test_cornerBlocksExact():
+    for h, J in [(0, -0.4), (0.1, -0.4), (0.2, 0.3)]:
+        blocks = CornerBlocks(partial(IsingModel2DopenCell, h, J))
+        for size in [2, 3, 4]:
+            expected = enumerateIsing2D(size, size, h, J, periodic=False)
+            assert abs(blocks.logPartition(size) - expected) < epsilon
+
+        z = boundaryMPS(lambda y: IsingModel2DopenRow(6, 6, h, J, y), 6, 0)
+        assert abs(blocks.logPartition(6) - z.logScalar) < 1e-8
+
+
+def test_cornerBlocksTruncated():
+    h = 0.1
+    J = -0.4
+    size = 16
+    z = boundaryMPS(lambda y: IsingModel2DopenRow(size, size, h, J, y), size, 1e-14)
+    blocks = CornerBlocks(partial(IsingModel2DopenCell, h, J), chi=16)
+    assert abs(blocks.logPartition(size) - z.logScalar) / size**2 < 1e-7
+    assert blocks.corners[0].shape == (16, 16)
+
+
+def test_blockCache():
+    cache = BlockCache()
+    cells = partial(IsingModel2DopenCell, 0.1, -0.4)
+    series = [cache.logPartition((0.1, -0.4), cells, size, chi=8) for size in range(2, 10)]
+
+    # A larger lattice continues from the blocks of the smaller ones, and smaller ones
+    # are then looked up without growing.
+    blocks = cache.blocks[((0.1, -0.4), 8)]
+    moves = blocks.moves
+    assert cache.logPartition((0.1, -0.4), cells, 5, chi=8) == series[3]
+    assert blocks.moves == moves
+
+    fresh = CornerBlocks(cells, chi=8)
+    assert abs(fresh.logPartition(9) - series[-1]) < epsilon
+
+    # Different truncations are held separately.
+    cache.logPartition((0.1, -0.4), cells, 4, chi=None)
+    assert len(cache.blocks) == 2
+
+    with pytest.raises(ValueError):
+        cache.logPartition((0.1, -0.4), cells, 1, chi=8)
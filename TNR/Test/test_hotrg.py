@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from functools import partial
+
+from TNR.Contractors.hotrg import hotrg, hotrgOpen
+from TNR.Contractors.boundaryMPS import boundaryMPS
+from TNR.Models.isingModel import IsingModelCell, IsingModel2DopenCell, IsingModel2DopenRow, \
+    IsingModel3DopenCell, enumerateIsing, enumerateIsing2D, exactIsing1DJ, exactIsing2D
+from TNR.Models.protein_aggregation_2D import PA2D, PA2DCell, PA2Dstencil
+from TNR.Models.protein_aggregation_3d import PA3DCell, PA3Dstencil
+from TNR.Models.lattice import enumerateStencils
+from TNR.Contractors.mergeContractor import mergeContractor
+from TNR.Contractors.heuristics import loopHeuristic
+
+epsilon = 1e-10
+
+
+def test_hotrg1D():
+    for nX in [1, 4, 32]:
+        for J in [-0.5, 0.2]:
+            z = hotrg(IsingModelCell(1, 0, J), (nX,), epsilon)
+            assert abs(z.logScalar / nX - exactIsing1DJ(nX, J)) < 1e-8
+
+
+def test_hotrgExact():
+    for h, J in [(0, 0.3), (0.2, -0.5)]:
+        z = hotrg(IsingModelCell(2, h, J), (4, 4), 0)
+        assert abs(z.logScalar - enumerateIsing2D(4, 4, h, J)) < 1e-8
+
+
+def test_hotrg2D():
+    J = 0.3
+    z = hotrg(IsingModelCell(2, 0, J), (64, 64), epsilon, maxBond=8)
+    assert abs(z.logScalar / 64**2 - exactIsing2D(J)) < 1e-6
+
+
+def test_hotrgShape():
+    with pytest.raises(ValueError):
+        hotrg(IsingModelCell(2, 0, 0.3), (6, 4), epsilon)
+    with pytest.raises(ValueError):
+        hotrg(IsingModelCell(2, 0, 0.3), (4, 4, 4), epsilon)
+
+
+def test_hotrgStencils():
+    h = 0.1
+    J = 0.5
+    q = 0.1
+
+    # The cell reproduces the network built from the stencils.
+    n = mergeContractor(PA2D(4, 2, h, J, q, epsilon), epsilon, loopHeuristic, merge=False)
+    z = hotrg(PA2DCell(h, J, q), (4, 2), 0)
+    assert abs(z.logScalar - n.array[1]) < 1e-8
+    assert abs(z.logScalar - enumerateStencils(PA2Dstencil(h, J, q), (4, 2))) < 1e-8
+    z = hotrg(PA2DCell(h, J, q), (4, 4), epsilon, maxBond=64)
+    assert abs(z.logScalar - enumerateStencils(PA2Dstencil(h, J, q), (4, 4))) < 1e-6
+
+    z = hotrg(PA3DCell(h, J, q), (2, 1, 1), 0)
+    assert abs(z.logScalar - enumerateStencils(PA3Dstencil(h, J, q), (2, 1, 1))) < 1e-10
+
+
+def test_hotrgOpen():
+    h = 0.1
+    J = -0.4
+    for shape in [(1, 1), (2, 1), (4, 2), (4, 4)]:
+        z = hotrgOpen(partial(IsingModel2DopenCell, h, J), shape, 0)
+        assert abs(z.logScalar - enumerateIsing(shape, h, J, periodic=False)) < 1e-10
+    for shape in [(2, 2, 2), (4, 2, 2)]:
+        z = hotrgOpen(partial(IsingModel3DopenCell, h, J), shape, 0)
+        assert abs(z.logScalar - enumerateIsing(shape, h, J, periodic=False)) < 1e-10
+
+    size = 16
+    expected = boundaryMPS(lambda y: IsingModel2DopenRow(size, size, h, J, y), size, 1e-14)
+    z = hotrgOpen(partial(IsingModel2DopenCell, h, J), (size, size), epsilon, maxBond=16)
+    assert abs(z.logScalar - expected.logScalar) / size**2 < 1e-9
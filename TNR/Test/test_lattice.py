@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from TNR.Models.lattice import latticeBonds, latticeStencils
+from TNR.Models.isingModel import IsingModel, IsingModel1D, IsingModel2Ddisordered, IsingModel3Dopen, exactIsing1DJ
+
+epsilon = 1e-10
+
+
+def test_latticeBonds():
+    assert len(latticeBonds((3, 4))) == 24
+    assert len(latticeBonds((3, 4), periodic=False)) == 17
+    assert len(latticeBonds((2, 3, 4), periodic=False)) == 12 + 16 + 18
+
+    bonds = latticeBonds((5,), periodic=True)
+    assert set(map(tuple, bonds)) == {(0, 1), (1, 2), (2, 3), (3, 4), (4, 0)}
+
+    stencils = latticeStencils((3, 4))
+    assert list(stencils[5]) == [5, 1, 9, 4, 6]
+
+
+def test_IsingModel1D():
+    for nX in [3, 6]:
+        for J in [-0.5, 0.2]:
+            n = IsingModel1D(nX, 0, J, epsilon)
+            arr, logAcc, _ = n.array
+            assert abs((np.log(arr) + logAcc) / nX - exactIsing1DJ(nX, J)) < 1e-8
+
+
+def test_sharing():
+    n = IsingModel3Dopen(3, 3, 3, 0.1, 0.2, epsilon)
+    assert len(n.nodes) == 27 + 27 + 54
+
+    # Identical terms share one Tensor, and identical sites share their arrays.
+    onSite = set(id(nn.tensor) for nn in n.nodes if nn.tensor.rank == 1)
+    assert len(onSite) == 1
+    payloads = set()
+    for nn in n.nodes:
+        if hasattr(nn.tensor, 'network'):
+            for m in nn.tensor.network.nodes:
+                payloads.add(id(m.tensor))
+    assert len(payloads) < 27
+
+    # Disordered terms each get their own.
+    n = IsingModel2Ddisordered(3, 3, 0.1, 0.2, epsilon)
+    bonds = set(id(nn.tensor) for nn in n.nodes if nn.tensor.rank == 2)
+    assert len(bonds) == 12
+
+    # A single entry is a uniform value, and stacked terms need one row per factor.
+    n = IsingModel1D(5, np.array([0.1]), np.array([0.2]), epsilon)
+    onSite = set(id(nn.tensor) for nn in n.nodes if nn.tensor.rank == 1)
+    assert len(onSite) == 1
+    with pytest.raises(ValueError):
+        IsingModel((3, 3), np.zeros(4), 0.2, epsilon)
@@ -0,0 +1,28 @@
+import numpy as np
+import pytest
+
+from TNR.Contractors.loopTNR import loopTNR
+from TNR.Models.isingModel import IsingModelCell, enumerateIsing2D, exactIsing2D
+
+epsilon = 1e-10
+
+
+def test_loopTNRExact():
+    for nX in [2, 4]:
+        for h, J in [(0, 0.3), (0.2, -0.5)]:
+            z = loopTNR(IsingModelCell(2, h, J), (nX, nX), 1e-15)
+            assert abs(z.logScalar - enumerateIsing2D(nX, nX, h, J)) < 1e-8
+
+
+def test_loopTNRCritical():
+    # At the critical coupling a small bond dimension still gives the free energy closely.
+    J = np.log(1 + np.sqrt(2)) / 2
+    z = loopTNR(IsingModelCell(2, 0, J), (256, 256), epsilon, maxBond=4)
+    assert abs(z.logScalar / 256**2 - exactIsing2D(J)) < 5e-5
+
+
+def test_loopTNRShape():
+    with pytest.raises(ValueError):
+        loopTNR(IsingModelCell(2, 0, 0.3), (8, 4), epsilon)
+    with pytest.raises(ValueError):
+        loopTNR(IsingModelCell(1, 0, 0.3), (8,), epsilon)
@@ -0,0 +1,148 @@
+import gc
+import numpy as np
+import pytest
+
+from TNR.Network.network import Network
+from TNR.Network.node import Node
+from TNR.Network.link import Link
+from TNR.Tensor.arrayTensor import ArrayTensor
+from TNR.Contractors.mergeContractor import admissibleMerge
+from TNR.Utilities.memory import accountant
+
+epsilon = 1e-10
+
+
+def chain(shapes):
+    '''
+    Returns a Network holding a chain of matrices with the specified shapes,
+    along with its Nodes in order.
+    '''
+    net = Network()
+    nodes = [Node(ArrayTensor(np.random.randn(*sh))) for sh in shapes]
+    for n1, n2 in zip(*(nodes[:-1], nodes[1:])):
+        Link(n1.buckets[-1], n2.buckets[0])
+    for n in nodes:
+        net.addNode(n)
+    return net, nodes
+
+
+def test_track():
+    gc.collect()
+    before = accountant.resident
+
+    xt = ArrayTensor(np.random.randn(32, 32))
+    assert accountant.resident == before + 8192
+
+    # The rescaled array is computed on demand and never held.
+    _ = xt.array
+    assert accountant.resident == before + 8192
+
+    # Transposes share the buffer, which is released once all of them are gone.
+    yt = xt.transpose([1, 0])
+    del xt
+    gc.collect()
+    assert accountant.resident == before + 8192
+
+    del yt
+    gc.collect()
+    assert accountant.resident == before
+
+    # Tiny buffers are not tracked at all.
+    xt = ArrayTensor(np.random.randn(10, 10))
+    assert accountant.resident == before
+    assert not xt._payload.tracked
+
+
+def test_predictMerge():
+    for i in range(5):
+        net, nodes = chain([(3, 4), (4, 5, 6), (6, 2)])
+        for n1, n2 in zip(*(nodes[:-1], nodes[1:])):
+            nbytes = accountant.predictMerge(n1, n2)
+            t, _ = net.dummyMergeNodes(n1, n2)
+            assert nbytes == t.scaledArray.nbytes
+
+
+def test_admissibleMerge():
+    limit = accountant.limit
+    try:
+        net, nodes = chain([(30, 2), (2, 30), (30, 30)])
+
+        # A heuristic preferring the larger merge.
+        def heuristic(n, count=None):
+            return [[0, nodes[0], nodes[1]], [1, nodes[1], nodes[2]]][:count]
+
+        # The heuristic's first choice is taken when it fits, even if it is not the
+        # smallest, and the next is tried when it does not.
+        accountant.limit = accountant.resident + 30 * 30 * 8
+        assert admissibleMerge(net, heuristic) == (nodes[0], nodes[1])
+        accountant.limit = accountant.resident + 30 * 2 * 8
+        assert admissibleMerge(net, heuristic) == (nodes[1], nodes[2])
+
+        # Past the candidates every merge is checked.
+        n1, n2 = admissibleMerge(net, heuristic, count=1)
+        assert set((n1, n2)) == set(nodes[1:])
+
+        accountant.limit = accountant.resident
+        with pytest.raises(MemoryError):
+            admissibleMerge(net, heuristic)
+    finally:
+        accountant.limit = limit
+
+
+def test_spill(tmp_path):
+    spillLimit, spillDir = accountant.spillLimit, accountant.spillDir
+    try:
+        accountant.spillDir = str(tmp_path)
+        accountant.spillLimit = accountant.resident + 3 * 8 * 32**2
+
+        xs = [np.random.randn(32, 32) for _ in range(6)]
+        xts = [ArrayTensor(x) for x in xs]
+
+        assert accountant.resident <= accountant.spillLimit
+        assert not xts[0]._payload.resident
+        assert xts[-1]._payload.resident
+        assert len(list(tmp_path.iterdir())) >= 3
+
+        # Paging in is transparent, and makes the tensor most recently used.
+        for x, xt in zip(*(xs, xts)):
+            assert np.sum((xt.array - x)**2) < epsilon
+            assert xt._payload.resident
+
+        del xts, xt
+        gc.collect()
+        assert len(list(tmp_path.iterdir())) == 0
+    finally:
+        accountant.spillLimit, accountant.spillDir = spillLimit, spillDir
+        accountant.spill()
+
+
+def test_spillDirectory():
+    # Without a configured directory, payloads are spilled to a temporary one which is
+    # removed at exit along with anything still in it.
+    import os
+    import subprocess
+    import sys
+    import tempfile
+
+    script = '''
+import os
+import numpy as np
+from TNR.Tensor.arrayTensor import ArrayTensor
+from TNR.Utilities.memory import accountant
+
+accountant.spillDir = None
+accountant.spillLimit = accountant.resident + 8 * 32**2
+xts = [ArrayTensor(np.random.randn(32, 32)) for _ in range(3)]
+assert len(os.listdir(accountant.spillDir)) == 2
+print(accountant.spillDir)
+'''
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env['PYTHONPATH'] = os.pathsep.join([root] + env.get('PYTHONPATH', '').split(os.pathsep))
+    out = subprocess.run([sys.executable, '-c', script], env=env,
+                         capture_output=True, text=True, check=True)
+    # Logging may also go to stdout, so the directory is the last line.
+    directory = out.stdout.splitlines()[-1]
+    assert directory.startswith(tempfile.gettempdir())
+    assert not os.path.exists(directory)
+    assert 'Error' not in out.stderr
@@ -1,4 +1,5 @@
 import numpy as np
+import networkx
 
 from TNR.Network.network import Network
 from TNR.Network.node import Node
@@ -256,3 +257,239 @@ def test_mergeLinks_TreeTensor_Compress():
 
         assert np.sum((arr1 - arr2)**2) < epsilon
         assert np.sum((arr1 - arr2)**2) < epsilon
+
+
+def test_adjacency():
+    net = Network()
+    nodes = [Node(ArrayTensor(np.random.randn(2, 3, 4))) for i in range(3)]
+    Link(nodes[0].buckets[0], nodes[1].buckets[0])
+    Link(nodes[1].buckets[2], nodes[2].buckets[2])
+    for n in nodes:
+        net.addNode(n)
+
+    for n in nodes:
+        for i, b in enumerate(n.buckets):
+            assert b.index == i
+            assert not hasattr(b, '__dict__')
+
+    assert nodes[1].connectedNodes == {nodes[0], nodes[2]}
+
+    # Merging replaces a neighbour, and merging buckets moves an index.
+    n = net.mergeNodes(nodes[1], nodes[2])
+    assert nodes[0].connectedNodes == {n}
+    assert n.connectedNodes == {nodes[0]}
+    b = nodes[0].mergeBuckets([nodes[0].buckets[2], nodes[0].buckets[1]])
+    assert b.index == 1
+    assert b.size == 12
+    assert nodes[0].buckets[0].index == 0
+
+    n = net.mergeNodes(nodes[0], n)
+    assert len(n.connectedNodes) == 0
+
+
+def test_table():
+    net = Network()
+    nodes = [Node(ArrayTensor(np.random.randn(2, 3, 4))) for i in range(4)]
+    Link(nodes[0].buckets[0], nodes[1].buckets[0])
+    Link(nodes[1].buckets[2], nodes[2].buckets[2])
+    Link(nodes[2].buckets[1], nodes[0].buckets[1])
+    for n in nodes[:3]:
+        net.addNode(n)
+
+    def check():
+        table = net.table
+        assert set(table.nodeRows.keys()) == net.nodes
+        for n, row in table.nodeRows.items():
+            assert table.size[row] == n.tensor.size
+            assert table.rank[row] == n.tensor.rank
+        links = set(b.link for b in net.internalBuckets)
+        assert set(table.edgeRows.keys()) == links
+        for l, row in table.edgeRows.items():
+            assert table.dim[row] == l.bucket1.size
+            assert {table.nodes[i] for i in table.ends[row]} == {
+                l.bucket1.node, l.bucket2.node}
+        adj = table.toSparse().toarray() > 0
+        for row, (i, j) in zip(table.commonNeighbours(table.edges()),
+                               table.ends[table.edges()]):
+            assert row == np.sum(adj[i] & adj[j])
+        g = net.toGraph()
+        assert set(g.nodes()) == net.nodes
+        pairs = set(frozenset((l.bucket1.node, l.bucket2.node)) for l in links)
+        assert g.number_of_edges() == len(pairs)
+
+    check()
+    assert list(net.table.commonNeighbours(net.table.edges())) == [1, 1, 1]
+
+    # The table follows Nodes and Links added after it was built.
+    Link(nodes[3].buckets[2], nodes[0].buckets[2])
+    net.addNode(nodes[3])
+    check()
+
+    n = net.mergeNodes(nodes[1], nodes[2])
+    check()
+    assert len(net.mergeLinks(n)) == 1
+    check()
+    net.sliceLink(next(iter(net.internalBuckets)).link, 0)
+    check()
+
+    net.removeNode(next(iter(net.nodes)))
+    check()
+
+
+def test_events():
+    net = Network()
+    events = []
+    net.subscribe(lambda event, *args: events.append((event,) + args))
+
+    nodes = [Node(ArrayTensor(np.random.randn(2, 3, 4))) for i in range(2)]
+    Link(nodes[0].buckets[0], nodes[1].buckets[0])
+    Link(nodes[0].buckets[1], nodes[1].buckets[1])
+    for n in nodes:
+        net.addNode(n)
+    assert events == [('addNode', nodes[0]), ('addNode', nodes[1])]
+    assert net.version == 2
+
+    # Merging links changes both Nodes and reports each merge of buckets.
+    del events[:]
+    net.mergeLinks(nodes[0])
+    assert [e[0] for e in events].count('mergeBuckets') == 2
+    assert set(e[1] for e in events) == set(nodes)
+    version = net.version
+
+    del events[:]
+    n = net.mergeNodes(*nodes)
+    assert events[-1] == ('mergeNodes', nodes[0], nodes[1], n)
+    assert [e[0] for e in events[:-1]] == ['removeNode', 'removeNode', 'addNode']
+    assert net.version == version + 4
+
+
+def test_traceMin():
+    from TNR.Network.traceMin import traceMin, util
+    from TNR.Models.isingModel import IsingModel2D
+
+    def check(tm, net):
+        g = net.toGraph()
+        assert set(tm.g.nodes()) == set(g.nodes())
+        assert set(map(frozenset, tm.g.edges())) == set(map(frozenset, g.edges()))
+        for n, m, w in g.edges(data='weight'):
+            assert abs(tm.g.edges[n, m]['weight'] - w) < 1e-12
+        assert len(tm.cycles) == len(networkx.cycle_basis(g))
+        # The cycle basis underlying the utility breaks ties by Node order.
+        adj = networkx.adjacency_matrix(g, nodelist=list(tm.g.nodes()), weight='weight')
+        assert abs(tm.util - util(adj.todense())) < 1e-10
+
+    # The graph follows merges, link merges and slices without being rebuilt.
+    net = IsingModel2D(3, 3, 0.1, -0.4, epsilon)
+    tm = traceMin(net, None)
+    check(tm, net)
+
+    n = next(iter(net.nodes))
+    n = net.mergeNodes(n, next(iter(n.connectedNodes)))
+    check(tm, net)
+    net.mergeLinks(n)
+    check(tm, net)
+    net.sliceLink(next(iter(net.internalBuckets)).link, 0)
+    check(tm, net)
+
+    # Once closed it no longer follows the network.
+    tm.close()
+    version = len(tm.g)
+    net.simplify()
+    assert len(tm.g) == version
+
+
+def test_simplify():
+    from TNR.Models.isingModel import IsingModel1D, IsingModel2Dopen
+
+    for net in [IsingModel1D(5, 0.3, 0.5, epsilon), IsingModel2Dopen(3, 2, 0.3, 0.5, epsilon)]:
+        arr, logAcc, _ = net.array
+
+        assert net.simplify() > 0
+        for n in net.nodes:
+            assert n.tensor.rank > 2 or len(net.internalConnected(n)) == 0
+            for m in n.connectedNodes:
+                assert len(n.linksConnecting(m)) == 1
+
+        arr2, logAcc2, _ = net.array
+        assert abs(np.log(arr) + logAcc - np.log(arr2) - logAcc2) < 1e-8
+
+    # Fusing Links held on different Nodes of a TreeTensor closes a loop inside it, which
+    # must be eliminated before anything walks the tree.
+    net = Network()
+    nodes = []
+    for i in range(2):
+        t = TreeTensor(epsilon)
+        t.addTensor(ArrayTensor(np.random.randn(2, 2, 2, 2)))
+        nodes.append(Node(t))
+    legs = []
+    for n in nodes:
+        held = [b.node for b in n.tensor.externalBuckets]
+        legs.append([0, next(i for i in range(4) if held[i] is not held[0])])
+    for i, j in zip(*legs):
+        Link(nodes[0].buckets[i], nodes[1].buckets[j])
+    for n in nodes:
+        net.addNode(n)
+    arr, logAcc, _ = net.array
+
+    assert net.simplify() == 0
+    for n in net.nodes:
+        assert len(networkx.cycle_basis(n.tensor.network.toGraph())) == 0
+
+    arr2, logAcc2, _ = net.array
+    arr2 *= np.exp(logAcc2 - logAcc)
+    assert np.sum((arr - arr2)**2) < 1e-8 * np.sum(arr**2)
+
+    # mergeContractor simplifies the network before its first merge.
+    from TNR.Models.isingModel import enumerateIsing2D
+    from TNR.Contractors.mergeContractor import mergeContractor
+    from TNR.Contractors.heuristics import loopHeuristic
+
+    net = mergeContractor(IsingModel2Dopen(3, 3, 0.1, -0.4, epsilon), epsilon, loopHeuristic,
+                          merge=False)
+    assert abs(net.array[1] - enumerateIsing2D(3, 3, 0.1, -0.4, periodic=False)) < 1e-8
+
+
+def test_heuristicCandidates():
+    from TNR.Models.isingModel import IsingModel2D
+    import TNR.Contractors.heuristics as heuristics
+
+    for name, largest in [('utilHeuristic', True), ('entropyHeuristic', False),
+                          ('mergeHeuristic', True), ('smallLoopHeuristic', False),
+                          ('loopHeuristic', True), ('oneLoopHeuristic', False)]:
+        heuristic = getattr(heuristics, name)
+        net = IsingModel2D(3, 3, 0.1, -0.4, epsilon)
+
+        # The candidates are ranked, starting from the heuristic's own choice.
+        best = heuristic(net)
+        candidates = heuristic(net, count=4)
+        assert 0 < len(candidates) <= 4
+        assert candidates[0][1:] == best[1:]
+        metrics = [c[0] for c in candidates]
+        assert metrics == sorted(metrics, reverse=largest)
+
+
+def test_contractPeriodicTerminates():
+    # Loop elimination breaks ties by the order of the graph of the network, and has
+    # livelocked on small periodic lattices when that order changed.
+    import signal
+    from TNR.Models.isingModel import IsingModel2D
+    from TNR.Contractors.mergeContractor import mergeContractor
+    import TNR.Contractors.heuristics as heuristics
+
+    def timeout(signum, frame):
+        raise TimeoutError('Contraction did not terminate.')
+
+    previous = signal.signal(signal.SIGALRM, timeout)
+    try:
+        for name in ['utilHeuristic', 'entropyHeuristic', 'mergeHeuristic',
+                     'smallLoopHeuristic', 'loopHeuristic', 'oneLoopHeuristic']:
+            for _ in range(3):
+                net = IsingModel2D(3, 3, 0.1, -0.4, epsilon)
+                signal.alarm(30)
+                net = mergeContractor(net, epsilon, getattr(heuristics, name),
+                                      optimize=True, merge=False)
+                signal.alarm(0)
+                assert len(net.nodes) == 1
+    finally:
+        signal.alarm(0)
+        signal.signal(signal.SIGALRM, previous)
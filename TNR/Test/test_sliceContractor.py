@@ -0,0 +1,90 @@
+import gc
+
+import numpy as np
+
+from TNR.Network.network import Network
+from TNR.Network.node import Node
+from TNR.Network.link import Link
+from TNR.Tensor.arrayTensor import ArrayTensor
+from TNR.Models.isingModel import IsingModel2Dopen
+from TNR.Contractors.mergeContractor import mergeContractor
+from TNR.Contractors.heuristics import loopHeuristic
+from TNR.Contractors.sliceContractor import sliceContractor, chooseSlices, networkShape, greedyOrder
+
+epsilon = 1e-10
+
+
+def torus(nX, nY, dim):
+    '''
+    Returns a Network of random ArrayTensors on a periodic nX by nY lattice.
+    '''
+    net = Network()
+    nodes = [[Node(ArrayTensor(np.random.rand(dim, dim, dim, dim)))
+              for j in range(nY)] for i in range(nX)]
+    for i in range(nX):
+        for j in range(nY):
+            Link(nodes[i][j].buckets[0], nodes[(i + 1) % nX][j].buckets[2])
+            Link(nodes[i][j].buckets[1], nodes[i][(j + 1) % nY].buckets[3])
+    for i in range(nX):
+        for j in range(nY):
+            net.addNode(nodes[i][j])
+    return net
+
+
+def test_chooseSlices():
+    net = torus(3, 3, 2)
+    _, peak = chooseSlices(net, 1e10)
+    sliced, peak2 = chooseSlices(net, peak // 2)
+    assert len(sliced) > 0
+    assert peak2 <= peak // 2
+
+
+def test_sliceContractor():
+    for i in range(3):
+        net = torus(3, 3, 2)
+        arr, logAcc, _ = net.array
+        _, peak = chooseSlices(net, 1e10)
+
+        for processes in [1, 2]:
+            arr2, logAcc2, _ = sliceContractor(net, peak // 4, processes=processes)
+            assert abs(np.log(arr2) + logAcc2 - np.log(arr) - logAcc) < epsilon
+
+
+def test_sliceContractor_heuristic():
+    accuracy = 1e-5
+    net = IsingModel2Dopen(3, 3, 0.5, 0.3, accuracy)
+    arr, logAcc, _ = sliceContractor(
+        net, 2**4, accuracy=accuracy, heuristic=loopHeuristic, processes=1)
+
+    net = mergeContractor(net, accuracy, loopHeuristic, optimize=True, merge=False)
+    arr2, logAcc2, _ = net.array
+    assert abs(np.log(arr) + logAcc - np.log(arr2) - logAcc2) < 1e-3
+
+
+def test_mergeContractor_slicing():
+    # Once the remaining network is predicted not to fit in memory, the mergeContractor
+    # hands it to the slice contractor.
+    from TNR.Utilities.memory import accountant
+    from TNR.Models.isingModel import IsingModel2D
+
+    accuracy = 1e-5
+    net = IsingModel2D(4, 4, 0.5, 0.3, accuracy)
+    arr, logAcc, _ = net.array
+    _, keys, dims = networkShape(net)
+    _, peak, _ = greedyOrder(keys, dims)
+
+    # Garbage left by earlier tests would otherwise free memory mid-contraction and lift
+    # the network back under the budget.
+    gc.collect()
+    limit = accountant.limit
+    try:
+        accountant.limit = accountant.resident + 8 * peak // 4
+        net = mergeContractor(net, accuracy, loopHeuristic, optimize=True, merge=False,
+                              slicing=True)
+    finally:
+        accountant.limit = limit
+
+    assert len(net.nodes) == 1
+    assert not hasattr(next(iter(net.nodes)).tensor, 'network')
+    arr2, logAcc2, _ = net.array
+    assert abs(np.log(arr2) + logAcc2 - np.log(arr) - logAcc) < 1e-3
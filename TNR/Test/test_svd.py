@@ -0,0 +1,96 @@
+import numpy as np
+
+from TNR.Utilities.svd import svdByPrecision, svdRandomized, svdGram, matrixProductLinearOperator, rankByPrecision
+
+epsilon = 1e-10
+
+
+def lowRank(m, n, rank):
+    '''
+    Returns an m by n matrix with geometrically decaying singular values
+    which vanish beyond the specified rank.
+    '''
+    u = np.linalg.qr(np.random.randn(m, rank))[0]
+    v = np.linalg.qr(np.random.randn(n, rank))[0]
+    s = 2.0**(-np.arange(rank))
+    return np.dot(u * s, v.T)
+
+
+def test_svdByPrecision():
+    for i in range(5):
+        x = lowRank(200, 150, 20)
+        for precision in [1e-2, 1e-6, 0]:
+            u, s, v = svdByPrecision(x, precision, True)
+
+            assert np.all(s[:-1] >= s[1:])
+            err = np.sum((np.dot(u * s, v) - x)**2) / np.sum(x**2)
+            assert err <= max(precision, epsilon)
+
+
+def test_svdRandomized():
+    for i in range(5):
+        x = lowRank(300, 200, 12)
+        u, s, v = svdRandomized(x, epsilon, True)
+
+        assert np.sum((np.dot(u * s, v) - x)**2) / np.sum(x**2) < epsilon
+        assert np.sum((s[:12] - 2.0**(-np.arange(12)))**2) < epsilon
+
+
+def test_svdLinearOperator():
+    for i in range(5):
+        a = np.random.randn(300, 6)
+        b = np.random.randn(6, 250)
+        x = np.dot(a, b)
+
+        op = matrixProductLinearOperator(a, b)
+        u, s, v = svdByPrecision(op, epsilon, True)
+
+        assert np.sum((np.dot(u * s, v) - x)**2) / np.sum(x**2) < epsilon
+        assert np.sum((s - np.linalg.svd(x, compute_uv=False)
+                       [:len(s)])**2) < epsilon
+
+
+def test_svdGram():
+    for i in range(5):
+        for shape in [(400, 8), (8, 400)]:
+            x = np.random.randn(*shape)
+            for precision in [1e-3, 1e-10]:
+                u, s, v = svdGram(x, precision, True)
+
+                assert np.sum((np.dot(u * s, v) - x)**2) / \
+                    np.sum(x**2) < epsilon
+                assert np.sum((s - np.linalg.svd(x, compute_uv=False))**2) < epsilon
+                assert np.sum((np.dot(u.T, u) - np.identity(len(s)))**2) < epsilon
+
+        # Widely spread spectra require re-orthogonalisation.
+        x = lowRank(400, 8, 8)
+        u, s, v = svdGram(x, 1e-12, True)
+        assert np.sum((np.dot(u.T, u) - np.identity(len(s)))**2) < epsilon
+
+    # Zero matrices fall back to the dense decomposition.
+    x = np.zeros((40, 4))
+    assert svdGram(x, 1e-3, True) is None
+    u, s, v = svdByPrecision(x, 1e-3, True)
+    assert np.all(np.isfinite(u)) and np.all(np.isfinite(v))
+    assert np.all(s == 0)
+
+
+def test_svdDtype():
+    for i in range(5):
+        for dtype in [np.float32, np.complex64]:
+            x = lowRank(300, 200, 12).astype(dtype)
+            for precision in [1e-3, 0]:
+                u, s, v = svdByPrecision(x, precision, True)
+
+                assert u.dtype == dtype and v.dtype == dtype
+                err = np.sum(np.abs(np.dot(u * s, v) - x)**2) / np.sum(np.abs(x)**2)
+                assert err < max(precision, 1e-6)
+
+
+def test_rankByPrecision():
+    s = np.array([1, 0.1, 0.01])
+    assert rankByPrecision(s, 0) == 3
+    assert rankByPrecision(s, 1e-3) == 2
+    assert rankByPrecision(s, 0.5) == 1
+    assert rankByPrecision(s, 0, maxRank=2) == 2
+    assert rankByPrecision(np.zeros(3), 0.1) == 1
@@ -0,0 +1,60 @@
+import numpy as np
+
+from TNR.Contractors.transferMatrix import uniformChain, streamChain
+from TNR.Models.isingModel import IsingModel, IsingTransferMatrix, IsingTransferBlocks1Ddisordered, exactIsing1Dh, exactIsing1DJ
+
+epsilon = 1e-10
+
+
+def test_uniformChain():
+    for n in [1, 7, 64, 10**9]:
+        for h in [0, 0.3]:
+            z = uniformChain(IsingTransferMatrix(h, 0), n)
+            assert abs(z.logScalar / n - exactIsing1Dh(h)) < epsilon
+        for J in [-0.5, 0.2]:
+            z = uniformChain(IsingTransferMatrix(0, J), n)
+            assert abs(z.logScalar / n - exactIsing1DJ(n, J)) < epsilon
+
+
+def test_streamChain():
+    n = 10
+    h = 0.5 * np.random.randn(n)
+    J = 0.5 * np.random.randn(n)
+
+    net = IsingModel((n,), h, J, epsilon)
+    arr, logAcc, _ = net.array
+    expected = np.log(arr) + logAcc
+
+    matrices = IsingTransferMatrix(h, J)
+    for size in [1, 3, n]:
+        blocks = (matrices[i:i + size] for i in range(0, n, size))
+        assert abs(streamChain(blocks).logScalar - expected) < 1e-8
+
+
+def test_streamChainUniform():
+    n = 10**5
+    blocks = (IsingTransferMatrix(np.full(1000, 0.3), np.zeros(1000)) for _ in range(n // 1000))
+    assert abs(streamChain(blocks).logScalar / n - exactIsing1Dh(0.3)) < epsilon
+
+
+def test_streamChainDisordered():
+    # A short chain drawn in blocks matches the network built from the same disorder.
+    n = 10
+    np.random.seed(0)
+    blocks = list(IsingTransferBlocks1Ddisordered(n, 0.5, 0.5, blockSize=3))
+    np.random.seed(0)
+    h, J = [], []
+    for start in range(0, n, 3):
+        size = min(3, n - start)
+        h.append(0.5 * np.random.randn(size))
+        J.append(0.5 * np.random.randn(size))
+    net = IsingModel((n,), np.concatenate(h), np.concatenate(J), epsilon)
+    arr, logAcc, _ = net.array
+    assert abs(streamChain(blocks).logScalar - (np.log(arr) + logAcc)) < 1e-8
+
+    # A long chain streamed in blocks matches the same matrices stacked into one block.
+    n = 10**5
+    blocks = list(IsingTransferBlocks1Ddisordered(n, 0.5, 0.5, blockSize=1000))
+    z1 = streamChain(iter(blocks))
+    z2 = streamChain(iter([np.concatenate(blocks)]))
+    assert abs(z1.logScalar - z2.logScalar) < 1e-8 * n
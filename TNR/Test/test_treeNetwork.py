@@ -40,3 +40,26 @@ def test_pathing():
     assert tn.pathBetween(n3, n1) == [n3, n2, n1]
     assert tn.pathBetween(n2, n3) == [n2, n3]
     assert tn.pathBetween(n3, n2) == [n3, n2]
+
+
+def test_splitNodes():
+    tn = TreeNetwork(accuracy=epsilon)
+
+    # Two Nodes share a shape, and so have their decompositions batched, while the third
+    # is decomposed on its own and keeps a pair of indices together.
+    nodes = [Node(ArrayTensor(np.random.randn(*sh)))
+             for sh in [(2, 3, 2, 3, 2), (2, 3, 2, 3, 2), (3, 2, 2, 2)]]
+    for n in nodes:
+        tn.addNode(n)
+    arr, logAcc, _ = tn.array
+
+    split = tn.splitNodes(nodes, ignore=[None, None, [0, 3]])
+
+    assert len(split) == 3
+    for n in tn.nodes:
+        assert n.tensor.rank <= 3
+    assert nodes[2].buckets[0].node is nodes[2].buckets[3].node
+
+    arr2, logAcc2, _ = tn.array
+    arr2 *= np.exp(logAcc2 - logAcc)
+    assert np.sum((arr - arr2)**2) < 1e-8 * np.sum(arr**2)
@@ -1,3 +1,4 @@
+import os
 import numpy as np
 
 import TNR.Utilities.arrays as arrays
@@ -48,3 +49,126 @@ def test_ndArrayMatrix():
     z = arrays.matrixToNDArray(y, (2, 2, 3, 3, 4, 4), 2, front=False)
 
     assert np.sum((x - z)**2) == 0
+
+
+
+def test_chunkedTensordot():
+    for i in range(5):
+        x = np.random.randn(7, 3, 5, 4)
+        y = np.random.randn(4, 6, 3, 9)
+        for axes in [([1, 3], [2, 0]), ([1], [2]), ([3], [0])]:
+            z = np.tensordot(x, y, axes=axes)
+            for threads in [1, 3]:
+                # Tiles of a single row force the most tiles possible.
+                w = arrays.chunkedTensordot(x, y, axes, chunkBytes=1, threads=threads)
+                assert np.sum((w - z)**2) < epsilon
+
+        # Tiling over the second operand.
+        y = np.random.randn(4, 30, 3)
+        z = np.tensordot(x, y, axes=([1, 3], [2, 0]))
+        w = arrays.chunkedTensordot(x, y, ([1, 3], [2, 0]), chunkBytes=1, threads=2)
+        assert np.sum((w - z)**2) < epsilon
+
+        # Full contraction.
+        z = np.tensordot(x, x, axes=([0, 1, 2, 3], [0, 1, 2, 3]))
+        w = arrays.chunkedTensordot(x, x, ([0, 1, 2, 3], [0, 1, 2, 3]))
+        assert abs(w - z) < epsilon
+
+
+def test_chunkedTensordotMemmap(tmp_path):
+    # The result is written tile by tile into a memory-mapped file.
+    x = np.random.randn(7, 3, 5, 4)
+    y = np.random.randn(4, 6, 3, 9)
+    z = np.tensordot(x, y, axes=([1, 3], [2, 0]))
+
+    path = str(tmp_path / 'out.dat')
+    out = np.memmap(path, dtype=z.dtype, mode='w+', shape=z.shape)
+    w = arrays.chunkedTensordot(x, y, ([1, 3], [2, 0]), out=out, chunkBytes=1, threads=2)
+    assert w is out
+    out.flush()
+    del out, w
+
+    w = np.memmap(path, dtype=z.dtype, mode='r', shape=z.shape)
+    assert np.sum((w - z)**2) < epsilon
+
+    # ArrayTensor.contract maps results too large for memory to a file when spilling is
+    # enabled, and the resulting Tensor starts out spilled.
+    from TNR import config
+    from TNR.Tensor.arrayTensor import ArrayTensor
+    from TNR.Utilities.memory import accountant
+
+    chunkBytes = config.contractChunkBytes
+    spillLimit, spillDir = accountant.spillLimit, accountant.spillDir
+    try:
+        config.contractChunkBytes = 2**12
+        accountant.spillLimit = accountant.resident + 2**30
+        accountant.spillDir = str(tmp_path)
+
+        x = np.random.randn(30, 20)
+        y = np.random.randn(20, 40)
+        t = ArrayTensor(x).contract([1], ArrayTensor(y), [0])
+        assert not t._payload.resident
+        assert t._payload.path.startswith(str(tmp_path))
+        assert np.sum((t.array - np.dot(x, y))**2) < epsilon
+
+        path = t._payload.path
+        del t
+        assert not os.path.exists(path)
+    finally:
+        config.contractChunkBytes = chunkBytes
+        accountant.spillLimit, accountant.spillDir = spillLimit, spillDir
+
+
+def test_plans():
+    from TNR.Utilities.plans import tensordot, einsum, tensordotPlan
+
+    for i in range(5):
+        x = np.random.randn(7, 3, 5, 4)
+        y = np.random.randn(4, 6, 3, 9)
+        for axes in [([1, 3], [2, 0]), ((1,), (2,)), (3, 0), ((), ())]:
+            z = np.tensordot(x, y, axes=axes)
+            assert np.sum((tensordot(x, y, axes=axes) - z)**2) < epsilon
+        assert np.sum((tensordot(x[..., :3], y[:3], axes=1) -
+                       np.tensordot(x[..., :3], y[:3], axes=1))**2) < epsilon
+
+        x = np.random.randn(3, 3, 4, 4)
+        assert abs(einsum('iijj->', x) - np.einsum('iijj->', x)) < epsilon
+
+    # Repeated shapes are served from the cache.
+    hits = tensordotPlan.cache_info().hits
+    tensordot(np.ones((2, 3)), np.ones((3, 4)), axes=1)
+    tensordot(np.ones((2, 3)), np.ones((3, 4)), axes=1)
+    assert tensordotPlan.cache_info().hits > hits
+
+
+def test_batch():
+    from TNR.Utilities.batch import batchTensordot, batchContract, batchSVD, batchQR
+    from TNR.Tensor.arrayTensor import ArrayTensor
+
+    x = np.random.randn(6, 3, 4, 5)
+    y = np.random.randn(6, 5, 2, 3)
+    z = batchTensordot(x, y, ([0, 2], [2, 0]))
+    for i in range(6):
+        w = np.tensordot(x[i], y[i], axes=([0, 2], [2, 0]))
+        assert np.sum((z[i] - w)**2) < epsilon
+
+    # Transposed Tensors share their stored arrays, and so are batched with untransposed
+    # ones, while the odd shape out is contracted on its own.
+    ts = [ArrayTensor(np.random.randn(3, 4, 5)) for i in range(4)]
+    ts[1] = ts[1].transpose([2, 0, 1])
+    ts[3] = ArrayTensor(np.random.randn(3, 4, 6))
+    others = [ArrayTensor(np.random.randn(2, 4)) for i in range(4)]
+    inds = [[1], [2], [1], [1]]
+    res = batchContract(ts, others, inds, [[1]] * 4)
+    for t, o, ind, r in zip(*(ts, others, inds, res)):
+        w = np.tensordot(t.array, o.array, axes=(ind, [1]))
+        assert r.shape == w.shape
+        assert np.sum((r.array - w)**2) < epsilon
+
+    # Decompositions are grouped by shape, and each matches its unbatched counterpart.
+    ms = [np.random.randn(*sh) for sh in [(4, 3), (3, 5), (4, 3), (4, 3)]]
+    for m, (u, s, v), (q, r) in zip(*(ms, batchSVD(ms), batchQR(ms))):
+        assert np.sum((s - np.linalg.svd(m, compute_uv=False))**2) < epsilon
+        assert np.sum((np.dot(u * s, v) - m)**2) < epsilon
+        assert np.sum((np.dot(q, r) - m)**2) < epsilon
+        assert np.sum((np.dot(q.T, q) - np.identity(q.shape[1]))**2) < epsilon
@@ -16,8 +16,8 @@ class IdentityTensor(TreeTensor):
     This is done in a tree from the start to support large n.
     '''
 
-    def __init__(self, dimension, rank, accuracy=0.0):
-        super().__init__(accuracy)
+    def __init__(self, dimension, rank, accuracy=0.0, dtype=None):
+        super().__init__(accuracy, dtype=dtype)
 
         numLayers = layer(dimension)
 
@@ -15,6 +15,7 @@ from TNR.Network.link import Link
 from TNR.Network.bucket import Bucket
 from TNR.Network.traceMin import traceMin
 from TNR.Utilities.svd import entropy
+from TNR.Utilities.arrays import resolveDtype
 from TNR.Utilities.graphPlotter import makePlotter
 
 counter0 = 0
@@ -26,9 +27,9 @@ logger = makeLogger(__name__, config.levels['treeTensor'])
 
 class TreeTensor(Tensor):
 
-    def __init__(self, accuracy):
+    def __init__(self, accuracy, dtype=None):
         self.accuracy = accuracy
-        self.network = TreeNetwork(accuracy=accuracy)
+        self.network = TreeNetwork(accuracy=accuracy, dtype=dtype)
         self.externalBuckets = []
         self.optimized = set()
 
@@ -40,6 +41,35 @@ class TreeTensor(Tensor):
             self.network.splitNode(n)
         return n
 
+    def copy(self):
+        '''
+        Returns a TreeTensor with the same structure as this one. Its Nodes, Buckets and
+        Links are new, but refer to the same Node tensors, which are never modified in
+        place. This is much cheaper than a deep copy.
+        '''
+        t = type(self).__new__(type(self))
+        t.accuracy = self.accuracy
+        t.network = TreeNetwork(
+            accuracy=self.network.accuracy,
+            dtype=self.network.dtype)
+
+        buckets = {}
+        for n in self.network.nodes:
+            m = Node(n.tensor)
+            buckets.update(zip(*(n.buckets, m.buckets)))
+
+        for b in self.network.internalBuckets:
+            if not buckets[b].linked:
+                Link(buckets[b], buckets[b.otherBucket])
+
+        for b in buckets.values():
+            if b.node.network is None:
+                t.network.addNode(b.node)
+
+        t.externalBuckets = [buckets[b] for b in self.externalBuckets]
+        t.optimized = set(buckets[b] for b in self.optimized if b in buckets)
+        return t
+
     def __str__(self):
         s = ''
         s = s + 'Tree Tensor with Shape:' + str(self.shape) + ' and Network:\n'
@@ -84,6 +114,10 @@ class TreeTensor(Tensor):
 
             return s
 
+    @property
+    def dtype(self):
+        return np.result_type(*[n.tensor.dtype for n in self.network.nodes])
+
     @property
     def compressedSize(self):
         size = 0
@@ -111,7 +145,7 @@ class TreeTensor(Tensor):
         if hasattr(other, 'network'):
             t2 = deepcopy(other)
         else:
-            t2 = TreeTensor(self.accuracy)
+            t2 = TreeTensor(self.accuracy, dtype=self.network.dtype)
             t2.addTensor(other)
 
         # If front == True then we contract t2 into t1, otherwise we contract t1 into t2.
@@ -145,17 +179,7 @@ class TreeTensor(Tensor):
             t1.network.addNode(n)
 
         # Merge any rank-1 or rank-2 objects
-        done = set()
-        while len(done.intersection(t1.network.nodes)) < len(t1.network.nodes):
-            n = next(iter(t1.network.nodes.difference(done)))
-            if n.tensor.rank <= 2:
-                nodes = t1.network.internalConnected(n)
-                if len(nodes) > 0:
-                    t1.network.mergeNodes(n, nodes.pop())
-                else:
-                    done.add(n)
-            else:
-                done.add(n)
+        t1.network.mergeSmallNodes(2)
 
         t1.externalBuckets = extB
         assert t1.network.externalBuckets == set(t1.externalBuckets)
@@ -171,7 +195,7 @@ class TreeTensor(Tensor):
         global counter0
         tm = traceMin(self.network, otherNodes)
 
-        while len(networkx.cycles.cycle_basis(self.network.toGraph())) > 0:
+        while len(tm.cycles) > 0:
             if plot:
                 plotter = makePlotter('PNG/' + str(counter0))
                 plotter = plotter(self.network.toGraph())
@@ -179,7 +203,7 @@ class TreeTensor(Tensor):
             logger.debug('Cycle utility is ' +
                          str(tm.util) +
                          ' and there are ' +
-                         str(len(networkx.cycles.cycle_basis(self.network.toGraph()))) +
+                         str(len(tm.cycles)) +
                          ' cycles remaining.')
 
             merged = tm.mergeSmall()
@@ -190,6 +214,8 @@ class TreeTensor(Tensor):
 
             logger.debug(str(self.network))
 
+        tm.close()
+
         counter0 += 1
         assert len(networkx.cycles.cycle_basis(self.network.toGraph())) == 0
 
@@ -206,8 +232,6 @@ class TreeTensor(Tensor):
 
         Returns a Tensor containing the trace over all of the pairs of indices.
         '''
-        arr = self.array
-
         ind0 = list(ind0)
         ind1 = list(ind1)
 
@@ -253,12 +277,12 @@ class TreeTensor(Tensor):
 
         # Create identity array
         shape.append(np.product(shape))
-        iden = np.identity(shape[-1])
+        iden = np.identity(shape[-1], dtype=self.dtype)
         iden = np.reshape(iden, shape)
 
         # Create Tree Tensor holding the identity
-        tens = ArrayTensor(iden)
-        tn = TreeTensor(self.accuracy)
+        tens = ArrayTensor(iden, dtype=self.dtype)
+        tn = TreeTensor(self.accuracy, dtype=self.network.dtype)
         tn.addTensor(tens)
 
         # Contract the identity
@@ -272,12 +296,25 @@ class TreeTensor(Tensor):
         return ttens
 
     def getIndexFactor(self, ind):
-        return self.externalBuckets[ind].node.tensor.scaledArray, self.externalBuckets[ind].index
+        b = self.externalBuckets[ind]
+        return b.node.tensor.getIndexFactor(b.index)
 
     def setIndexFactor(self, ind, arr):
         tt = deepcopy(self)
-        tt.externalBuckets[ind].node.tensor = ArrayTensor(
-            arr, logScalar=tt.externalBuckets[ind].node.tensor.logScalar)
+        b = tt.externalBuckets[ind]
+        b.node.tensor = b.node.tensor.setIndexFactor(b.index, arr)
+        return tt
+
+    def astype(self, dtype):
+        '''
+        Returns a copy of this TreeTensor with the specified dtype policy applied
+        to each of its nodes.
+        '''
+        if all(resolveDtype(n.tensor.dtype, dtype) ==
+               n.tensor.dtype for n in self.network.nodes):
+            return self
+        tt = deepcopy(self)
+        tt.network.setDtype(dtype)
         return tt
 
     def optimize(self):
@@ -293,20 +330,7 @@ class TreeTensor(Tensor):
 
         logger.info('Stage 1: Contracting Rank-2 Tensors.')
 
-        done = set()
-        while len(
-            done.intersection(
-                self.network.nodes)) < len(
-                self.network.nodes):
-            n = next(iter(self.network.nodes.difference(done)))
-            if n.tensor.rank == 2:
-                nodes = self.network.internalConnected(n)
-                if len(nodes) > 0:
-                    self.network.mergeNodes(n, nodes.pop())
-                else:
-                    done.add(n)
-            else:
-                done.add(n)
+        self.network.mergeSmallNodes(2, minRank=2)
 
         logger.info('Stage 2: Contracting Double Links.')
 
@@ -1,4 +1,7 @@
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from TNR import config
 
 
 def insertIndex(arr, ind, newInd):
@@ -42,11 +45,18 @@ def ndArrayToMatrix(arr, index, front=True):
     then the special index is pushed to the beginning. If front is False then the
     special index is pushed to the back.
     '''
-    arr = insertIndex(arr, index, 0)
-    arr = np.reshape(arr, (arr.shape[0], -1))
-
-    if not front:
-        arr = np.transpose(arr)
+    # Whichever of the two equivalent layouts leaves the special index where it
+    # already is can be formed without copying, with the other following from a
+    # transposed view.
+    if index == len(arr.shape) - 1 and index > 0:
+        arr = np.reshape(arr, (-1, arr.shape[-1]))
+        if front:
+            arr = np.transpose(arr)
+    else:
+        arr = insertIndex(arr, index, 0)
+        arr = np.reshape(arr, (arr.shape[0], -1))
+        if not front:
+            arr = np.transpose(arr)
 
     return arr
 
@@ -61,17 +71,115 @@ def matrixToNDArray(matrix, shape, index, front=True):
 
     This method is meant to be the inverse of ndArrayToMatrix.
     '''
-    if not front:
-        matrix = np.transpose(matrix)
-
     shm = shape[:index] + shape[index + 1:]
 
-    matrix = np.reshape(matrix, [shape[index]] + list(shm))
+    # Only the long axis of the matrix is reshaped, which is a view whichever side
+    # it is on. The special index is then moved into place, also as a view.
+    if front:
+        matrix = np.reshape(matrix, [shape[index]] + list(shm))
+        return insertIndex(matrix, 0, index)
+    else:
+        matrix = np.reshape(matrix, list(shm) + [shape[index]])
+        return insertIndex(matrix, len(shape) - 1, index)
 
-    perm = list(range(len(shape)))
-    perm = perm[1:]
-    perm.insert(index, 0)
 
-    matrix = np.transpose(matrix, axes=perm)
+def resolveDtype(dtype, policy=None):
+    '''
+    This method returns the element type an array of type dtype takes on under
+    the given dtype policy, which defaults to the one in the config file.
+    Real arrays take on the policy type, while complex arrays take on the complex
+    type of the same precision as the policy.
+    '''
+    if policy is None:
+        policy = config.dtype
+    policy = np.dtype(policy)
+
+    if np.issubdtype(dtype, np.complexfloating):
+        return np.result_type(policy, np.complex64)
+    return policy
+
 
-    return matrix
+def chunkedTensordot(a, b, axes, out=None, chunkBytes=None, threads=None):
+    '''
+    This method computes np.tensordot(a, b, axes) while bounding the temporary memory
+    it requires. The contraction is tiled over the longest free axis of either array.
+    The other array is transposed into matrix form just once, and each tile is then
+    reduced to a single matrix product written directly into the output. Tiles are
+    run on a thread pool, as the matrix products release the GIL.
+
+    The arguments are:
+            a, b		-	The arrays to contract.
+            axes		-	A pair of lists of axes to contract, as in np.tensordot.
+            out			-	The array in which to store the result, which may be an
+                                    np.memmap. If None a new array is allocated.
+            chunkBytes	-	The number of bytes of temporaries each tile may use.
+                                    Defaults to the value in the config file.
+            threads		-	The number of threads to use. Defaults to the value in the
+                                    config file.
+
+    Returns the result.
+    '''
+    if chunkBytes is None:
+        chunkBytes = config.contractChunkBytes
+    if threads is None:
+        threads = config.contractThreads
+
+    axesA, axesB = [list(x) for x in axes]
+    freeA = [i for i in range(a.ndim) if i not in axesA]
+    freeB = [i for i in range(b.ndim) if i not in axesB]
+    shapeA = [a.shape[i] for i in freeA]
+    shapeB = [b.shape[i] for i in freeB]
+    k = int(np.prod([a.shape[i] for i in axesA]))
+
+    dtype = np.result_type(a, b)
+    if out is None:
+        out = np.empty(shapeA + shapeB, dtype=dtype)
+
+    if len(freeA) + len(freeB) == 0:
+        out[...] = np.tensordot(a, b, axes=(axesA, axesB))
+        return out
+
+    # Tile over the longest free axis. The tiled array is the one indexed by it, and
+    # the other is transposed once so that each tile is a single matrix product.
+    tileA = len(freeB) == 0 or (
+        len(freeA) > 0 and max(shapeA) >= max(shapeB))
+    if tileA:
+        axis = freeA[int(np.argmax(shapeA))]
+        position = freeA.index(axis)
+        other = np.reshape(np.transpose(b, axesB + freeB), (k, -1))
+    else:
+        axis = freeB[int(np.argmax(shapeB))]
+        position = len(freeA) + freeB.index(axis)
+        other = np.reshape(np.transpose(a, freeA + axesA), (-1, k))
+    length = out.shape[position]
+
+    # Each unit of the tiled axis needs a transposed slice of the tiled array as
+    # well as a slice of the result.
+    tiled = a if tileA else b
+    perUnit = (tiled.size + out.size) * dtype.itemsize // length
+    chunk = max(1, int(chunkBytes // max(perUnit, 1)))
+
+    def tile(start):
+        sl = slice(start, min(start + chunk, length))
+        t = tiled[(slice(None),) * axis + (sl,)]
+        if tileA:
+            t = np.reshape(np.transpose(t, freeA + axesA), (-1, k))
+            res = np.dot(t, other)
+        else:
+            t = np.reshape(np.transpose(t, axesB + freeB), (k, -1))
+            res = np.dot(other, t)
+
+        index = [slice(None)] * out.ndim
+        index[position] = sl
+        target = out[tuple(index)]
+        target[...] = np.reshape(res, target.shape)
+
+    starts = range(0, length, chunk)
+    if threads == 1 or len(starts) == 1:
+        for start in starts:
+            tile(start)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(tile, starts))
+
+    return out
@@ -0,0 +1,110 @@
+'''
+This module provides batched versions of small-array operations. Tree networks hold
+thousands of tiny tensors, for which the cost of dispatching each operation to NumPy
+outweighs the arithmetic. Operations sharing a shape signature are therefore stacked
+along a leading batch axis and carried out in a single vectorised call.
+'''
+import numpy as np
+
+from TNR.Tensor.arrayTensor import ArrayTensor, contractedPerm
+from TNR.Utilities.plans import normalizeAxes, tensordotPlan
+
+
+def batchTensordot(a, b, axes):
+    '''
+    Computes np.tensordot(a[i], b[i], axes) for every i at once.
+
+    The arguments are:
+            a, b	-	Arrays whose leading axis indexes the batch.
+            axes	-	The axes to contract, as in np.tensordot, referring to the
+                                axes of each item rather than of the stacked arrays.
+
+    Returns the stacked results.
+    '''
+    axesA, axesB = normalizeAxes(a.ndim - 1, axes)
+    permA, matA, permB, matB, out = tensordotPlan(
+        a.shape[1:], b.shape[1:], axesA, axesB)
+
+    n = a.shape[0]
+    at = np.reshape(np.transpose(a, (0,) + tuple(p + 1 for p in permA)), (n,) + matA)
+    bt = np.reshape(np.transpose(b, (0,) + tuple(p + 1 for p in permB)), (n,) + matB)
+    return np.reshape(np.matmul(at, bt), (n,) + out)
+
+
+def batchContract(tensors, others, indices, otherIndices):
+    '''
+    Computes tensors[i].contract(indices[i], others[i], otherIndices[i]) for each i,
+    where all Tensors are ArrayTensors. Contractions of stored arrays sharing their
+    shapes, contracted axes and dtypes are stacked and carried out together.
+
+    Returns the list of resulting ArrayTensors.
+    '''
+    groups = {}
+    for k, (t1, t2, ind, otherInd) in enumerate(
+            zip(*(tensors, others, indices, otherIndices))):
+        a, pa = t1.physical
+        b, pb = t2.physical
+        axesA = tuple(pa[i] for i in ind)
+        axesB = tuple(pb[i] for i in otherInd)
+        key = (a.shape, b.shape, axesA, axesB, a.dtype, b.dtype)
+        groups.setdefault(key, []).append((k, a, pa, b, pb))
+
+    results = [None] * len(tensors)
+    for (_, _, axesA, axesB, _, _), group in groups.items():
+        if len(group) == 1:
+            k = group[0][0]
+            results[k] = tensors[k].contract(indices[k], others[k], otherIndices[k])
+            continue
+
+        arrs = batchTensordot(np.stack([g[1] for g in group]),
+                              np.stack([g[3] for g in group]), (axesA, axesB))
+
+        # The stack is freshly allocated and its items are disjoint, so each is
+        # handed over to be normalized in place.
+        for (k, _, pa, _, pb), arr in zip(*(group, arrs)):
+            t = ArrayTensor(arr, logScalar=tensors[k].logScalar + others[k].logScalar,
+                            dtype=arr.dtype, copy=False)
+            results[k] = t.transpose(contractedPerm(pa, pb, axesA, axesB))
+
+    return results
+
+
+def groupByShape(arrays):
+    '''
+    Returns a dictionary mapping each pair of shape and dtype among arrays to the list of
+    positions of the arrays which have it.
+    '''
+    groups = {}
+    for k, a in enumerate(arrays):
+        groups.setdefault((a.shape, a.dtype), []).append(k)
+    return groups
+
+
+def batchSVD(matrices):
+    '''
+    Computes np.linalg.svd(matrices[i], full_matrices=False) for each i. Matrices sharing
+    their shapes and dtypes are stacked and decomposed together.
+
+    Returns the list of (u, s, v) triples.
+    '''
+    results = [None] * len(matrices)
+    for group in groupByShape(matrices).values():
+        u, s, v = np.linalg.svd(np.stack([matrices[k] for k in group]), full_matrices=False)
+        for i, k in enumerate(group):
+            results[k] = (u[i], s[i], v[i])
+    return results
+
+
+def batchQR(matrices):
+    '''
+    Computes the reduced QR decomposition np.linalg.qr(matrices[i]) for each i. Matrices
+    sharing their shapes and dtypes are stacked and decomposed together.
+
+    Returns the list of (q, r) pairs.
+    '''
+    results = [None] * len(matrices)
+    for group in groupByShape(matrices).values():
+        q, r = np.linalg.qr(np.stack([matrices[k] for k in group]))
+        for i, k in enumerate(group):
+            results[k] = (q[i], r[i])
+    return results
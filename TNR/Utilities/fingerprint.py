@@ -0,0 +1,85 @@
+'''
+This module computes fingerprints of tensors: short strings which are equal for tensors
+holding the same data in the same form, so that work done on one can be reused for the
+other. An ArrayTensor is fingerprinted by a hash of its shape, dtype, logScalar and
+contents. A TreeTensor is fingerprinted by Weisfeiler-Lehman colour refinement of its
+network, in which each Node starts from the fingerprint of its tensor and the positions of
+its external Buckets, and is then repeatedly recoloured by the colours of the Nodes on the
+far side of each of its Buckets, in Bucket order. Colour refinement tells trees apart up to
+isomorphism, so two TreeTensors share a fingerprint when their networks are the same tree
+with the same Node tensors and the same external index order, however their Nodes and
+Buckets happen to be numbered.
+'''
+import hashlib
+import weakref
+import numpy as np
+
+
+# ArrayTensors are never modified in place, so their fingerprints are kept for as long
+# as they are.
+_arrayFingerprints = weakref.WeakKeyDictionary()
+
+
+def digest(*parts):
+    '''
+    Returns a hash of the representations of the parts.
+    '''
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+def arrayFingerprint(tensor):
+    '''
+    Returns the fingerprint of an ArrayTensor.
+    '''
+    fp = _arrayFingerprints.get(tensor)
+    if fp is None:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(repr((tensor.shape, str(tensor.dtype), float(tensor.logScalar))).encode())
+        h.update(np.ascontiguousarray(tensor.scaledArray).tobytes())
+        fp = h.hexdigest()
+        _arrayFingerprints[tensor] = fp
+    return fp
+
+
+def treeFingerprint(tensor):
+    '''
+    Returns the fingerprint of a TreeTensor.
+    '''
+    nodes = list(tensor.network.nodes)
+    external = {b: i for i, b in enumerate(tensor.externalBuckets)}
+
+    colours = {}
+    for n in nodes:
+        colours[n] = digest(fingerprint(n.tensor), [external.get(b) for b in n.buckets])
+
+    # Refine until no colour class splits. A tree is fully refined within as many rounds
+    # as it has Nodes.
+    classes = len(set(colours.values()))
+    for _ in range(len(nodes)):
+        colours = {n: digest(colours[n],
+                             [(colours[b.otherBucket.node], b.otherBucket.index)
+                              if b.linked else None for b in n.buckets])
+                   for n in nodes}
+        new = len(set(colours.values()))
+        if new == classes:
+            break
+        classes = new
+
+    return digest('tree', sorted(colours.values()))
+
+
+def fingerprint(tensor):
+    '''
+    Returns the fingerprint of an ArrayTensor or TreeTensor.
+    '''
+    if hasattr(tensor, 'network'):
+        return treeFingerprint(tensor)
+    return arrayFingerprint(tensor)
+
+
+def mergeFingerprint(t1, ind1, t2, ind2):
+    '''
+    Returns the fingerprint of the contraction of t1 and t2 over the indices ind1 of t1
+    and ind2 of t2.
+    '''
+    return digest(fingerprint(t1), list(ind1), fingerprint(t2), list(ind2))
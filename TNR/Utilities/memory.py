@@ -0,0 +1,278 @@
+import os
+import tempfile
+import itertools
+import weakref
+from collections import OrderedDict
+import numpy as np
+
+from TNR.Utilities.logger import makeLogger
+from TNR import config
+logger = makeLogger(__name__, config.levels['memory'])
+
+
+# Payloads smaller than this are never spilled, as the file would cost more than
+# the memory it frees.
+spillMinBytes = 2**12
+
+# Buffers smaller than this are not accounted for at all. Trees hold thousands of tiny
+# tensors, and registering a finalizer and a place in the spill order for each of them
+# costs more than the bytes they hold, which could never be spilled anyway.
+trackMinBytes = spillMinBytes
+
+
+class Payload:
+    '''
+    A Payload holds the read-only array backing an ArrayTensor. When memory is tight the
+    accountant may spill it to a memory-mapped file, in which case it is read back the
+    next time it is requested. A Payload given the path of the memory-mapped file its
+    array lives in starts out spilled.
+    '''
+
+    newid = itertools.count().__next__
+
+    def __init__(self, array, path=None):
+        self._array = array
+        self.shape = array.shape
+        self.dtype = array.dtype
+        self.nbytes = array.nbytes
+        self.path = None
+        self.owners = 0
+        self.tracked = array.nbytes >= trackMinBytes or path is not None
+
+        if path is not None:
+            self._array = None
+            self.path = path
+
+    @property
+    def resident(self):
+        return self._array is not None
+
+    @property
+    def array(self):
+        if self._array is None:
+            accountant.load(self)
+        elif self.tracked:
+            accountant.touch(self)
+        return self._array
+
+    def spill(self, directory):
+        if self.path is None:
+            self.path = os.path.join(directory, str(Payload.newid()) + '.dat')
+            mm = np.memmap(self.path, dtype=self.dtype, mode='w+', shape=self.shape)
+            mm[...] = self._array
+            mm.flush()
+            del mm
+        self._array = None
+
+    def load(self):
+        mm = np.memmap(self.path, dtype=self.dtype, mode='r', shape=self.shape)
+        self._array = np.array(mm)
+        self._array.flags.writeable = False
+        del mm
+
+    def discard(self):
+        if self.path is not None:
+            # At exit the temporary spill directory may already have been removed.
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            self.path = None
+
+
+class MemoryAccountant:
+    '''
+    A MemoryAccountant tracks the number of bytes held by live tensor buffers and
+    predicts the bytes a merge of two Nodes would allocate. This allows contractors
+    to decline merges which would take the process past its memory budget instead
+    of being killed partway through allocating them.
+
+    Buffers are registered by their owners. Since tensors share buffers with their
+    deep copies, each buffer is counted once no matter how many Nodes refer to it,
+    and is released when its owner is garbage collected. Buffers smaller than
+    trackMinBytes are not registered, and so are left out of the resident bytes.
+
+    Tensor payloads are additionally kept in least-recently-used order. When the resident
+    bytes exceed the spill limit the coldest payloads are moved to memory-mapped files,
+    which no longer count as resident, until the limit is met again.
+    '''
+
+    def __init__(self, limit, spillLimit=None, spillDir=None):
+        '''
+        Takes as input:
+                limit		-	The memory budget in bytes. None means there is no budget.
+                spillLimit	-	The resident bytes beyond which payloads are spilled.
+                                        None disables spilling.
+                spillDir	-	The directory in which spilled payloads are stored.
+                                        If None a temporary directory is created on first use,
+                                        and removed with its contents at exit.
+        '''
+        self.limit = limit
+        self.spillLimit = spillLimit
+        self.spillDir = spillDir
+        self.tempDir = None
+        self.resident = 0
+        self.payloads = OrderedDict()
+        self.mapped = set()
+
+    def track(self, owner, nbytes):
+        '''
+        Registers nbytes as held until owner is garbage collected.
+        '''
+        if nbytes < trackMinBytes:
+            return
+        self.resident += nbytes
+        weakref.finalize(owner, self.release, nbytes)
+
+    def release(self, nbytes):
+        self.resident -= nbytes
+
+    def store(self, owner, array, mapped=None):
+        '''
+        Returns a Payload holding array, registered as held until owner is garbage
+        collected. The array should not be modified afterwards. If array is held in a
+        memory map returned by allocate, passed as mapped, the Payload takes over its
+        file and starts out spilled.
+        '''
+        path = None
+        if mapped is not None and mapped.filename in self.mapped:
+            mapped.flush()
+            path = mapped.filename
+            self.mapped.remove(path)
+
+        payload = Payload(array, path=path)
+        if not payload.tracked:
+            return payload
+        if payload.resident:
+            self.resident += payload.nbytes
+            self.payloads[payload] = None
+        self.share(owner, payload)
+        self.spill()
+        return payload
+
+    def share(self, owner, payload):
+        '''
+        Registers another owner of payload, which is only discarded once all of its
+        owners have been garbage collected. Returns the payload.
+        '''
+        if not payload.tracked:
+            return payload
+        payload.owners += 1
+        weakref.finalize(owner, self.discard, payload)
+        return payload
+
+    def discard(self, payload):
+        payload.owners -= 1
+        if payload.owners > 0:
+            return
+        if payload.resident:
+            self.resident -= payload.nbytes
+            del self.payloads[payload]
+        payload.discard()
+
+    def touch(self, payload):
+        self.payloads.move_to_end(payload)
+
+    def load(self, payload):
+        payload.load()
+        self.resident += payload.nbytes
+        self.payloads[payload] = None
+        logger.debug('Loaded ' + str(payload.nbytes) + ' bytes from ' + payload.path + '.')
+        self.spill()
+
+    def directory(self):
+        '''
+        Returns the spill directory, creating a temporary one if none is configured.
+        '''
+        if self.spillDir is None:
+            self.tempDir = tempfile.TemporaryDirectory(prefix='tnr')
+            self.spillDir = self.tempDir.name
+        return self.spillDir
+
+    def allocate(self, shape, dtype):
+        '''
+        Returns a writable np.memmap of the specified shape and dtype in the spill
+        directory, for results too large to be formed in memory, or None if spilling is
+        disabled. A Payload stored from it takes over the file.
+        '''
+        if self.spillLimit is None:
+            return None
+        path = os.path.abspath(os.path.join(self.directory(), str(Payload.newid()) + '.dat'))
+        self.mapped.add(path)
+        logger.debug('Mapping ' + str(np.prod(shape) * np.dtype(dtype).itemsize) +
+                     ' bytes to ' + path + '.')
+        return np.memmap(path, dtype=dtype, mode='w+', shape=tuple(shape))
+
+    def spill(self):
+        '''
+        Spills the least recently used payloads until the resident bytes are within
+        the spill limit. The most recently used payload is always kept resident.
+        '''
+        if self.spillLimit is None or self.resident <= self.spillLimit:
+            return
+
+        # Walk in from the cold end only as far as needed, choosing the payloads first
+        # since they cannot be removed while the walk is under way.
+        hot = next(reversed(self.payloads), None)
+        excess = self.resident - self.spillLimit
+        chosen = []
+        for payload in self.payloads:
+            if excess <= 0 or payload is hot:
+                break
+            if payload.nbytes < spillMinBytes:
+                continue
+            chosen.append(payload)
+            excess -= payload.nbytes
+
+        for payload in chosen:
+            payload.spill(self.directory())
+            self.resident -= payload.nbytes
+            del self.payloads[payload]
+            logger.debug('Spilled ' + str(payload.nbytes) + ' bytes to ' + payload.path + '.')
+
+    def predictMerge(self, n1, n2):
+        '''
+        Returns the number of bytes merging the Nodes n1 and n2 would allocate.
+
+        For a pair of ArrayTensors this is the size of the contracted array. TreeTensors
+        share their Node tensors with the copies made during contraction, but may merge
+        or refactor every one of them afterwards, so for those the combined compressed
+        size of both is used.
+        '''
+        t1 = n1.tensor
+        t2 = n2.tensor
+        itemsize = np.result_type(t1.dtype, t2.dtype).itemsize
+
+        if hasattr(t1, 'network') or hasattr(t2, 'network'):
+            size = 0
+            for t in (t1, t2):
+                if hasattr(t, 'compressedSize'):
+                    size += t.compressedSize
+                else:
+                    size += t.size
+            return size * itemsize
+
+        contracted = set()
+        for l in n1.linksConnecting(n2):
+            contracted.add(l.bucket1)
+            contracted.add(l.bucket2)
+
+        size = 1
+        for n in (n1, n2):
+            for b in n.buckets:
+                if b not in contracted:
+                    size *= n.tensor.shape[b.index]
+
+        return size * itemsize
+
+    def admits(self, nbytes):
+        '''
+        Returns True if nbytes may be allocated within the budget.
+        '''
+        return self.limit is None or self.resident + nbytes <= self.limit
+
+
+accountant = MemoryAccountant(
+    config.mem_limit,
+    spillLimit=config.spillLimit,
+    spillDir=config.spillDir)
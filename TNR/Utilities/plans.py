@@ -0,0 +1,84 @@
+'''
+This module provides drop-in replacements for np.tensordot and np.einsum which cache
+the bookkeeping each requires. The same contraction shapes recur throughout the package,
+so the axis permutations and matrix shapes of a tensordot, and the contraction path of
+an einsum, are computed once per signature and then looked up.
+'''
+from functools import lru_cache
+import numpy as np
+
+from TNR import config
+
+
+def normalizeAxes(ndimA, axes):
+    '''
+    Returns the pair of tuples of contracted axes specified by axes, which may take any of
+    the forms accepted by np.tensordot.
+    '''
+    if isinstance(axes, (int, np.integer)):
+        return tuple(range(ndimA - axes, ndimA)), tuple(range(axes))
+
+    axesA, axesB = axes
+    axesA = tuple(int(i) for i in np.atleast_1d(axesA))
+    axesB = tuple(int(i) for i in np.atleast_1d(axesB))
+    return axesA, axesB
+
+
+@lru_cache(maxsize=config.planCacheSize)
+def tensordotPlan(shapeA, shapeB, axesA, axesB):
+    '''
+    Returns the recipe for contracting arrays of shapes shapeA and shapeB along the
+    specified axes as a single matrix product. This consists of the permutation and
+    matrix shape of each operand and the shape of the result.
+    '''
+    axesA = [i % len(shapeA) for i in axesA]
+    axesB = [i % len(shapeB) for i in axesB]
+    for i, j in zip(*(axesA, axesB)):
+        if shapeA[i] != shapeB[j]:
+            raise ValueError('Shape mismatch for sum.')
+
+    freeA = [i for i in range(len(shapeA)) if i not in axesA]
+    freeB = [i for i in range(len(shapeB)) if i not in axesB]
+
+    k = int(np.prod([shapeA[i] for i in axesA]))
+    outA = [shapeA[i] for i in freeA]
+    outB = [shapeB[i] for i in freeB]
+
+    permA = tuple(freeA + axesA)
+    permB = tuple(axesB + freeB)
+    matA = (int(np.prod(outA)), k)
+    matB = (k, int(np.prod(outB)))
+
+    return permA, matA, permB, matB, tuple(outA + outB)
+
+
+def tensordot(a, b, axes=2):
+    '''
+    Computes np.tensordot(a, b, axes) using a cached recipe.
+    '''
+    a = np.asarray(a)
+    b = np.asarray(b)
+    axesA, axesB = normalizeAxes(a.ndim, axes)
+    permA, matA, permB, matB, out = tensordotPlan(a.shape, b.shape, axesA, axesB)
+    at = np.reshape(np.transpose(a, permA), matA)
+    bt = np.reshape(np.transpose(b, permB), matB)
+    return np.reshape(np.dot(at, bt), out)
+
+
+@lru_cache(maxsize=config.planCacheSize)
+def einsumPlan(subscripts, shapes):
+    '''
+    Returns the contraction path np.einsum should follow for operands of the specified
+    shapes.
+    '''
+    # Broadcast views stand in for the operands without allocating them.
+    dummies = [np.broadcast_to(0., s) for s in shapes]
+    return np.einsum_path(subscripts, *dummies, optimize='greedy')[0]
+
+
+def einsum(subscripts, *operands):
+    '''
+    Computes np.einsum(subscripts, *operands) along a cached contraction path.
+    '''
+    shapes = tuple(np.shape(o) for o in operands)
+    return np.einsum(subscripts, *operands, optimize=einsumPlan(subscripts, shapes))
@@ -1,6 +1,5 @@
 import numpy as np
 from numpy.linalg import svd
-from scipy.linalg.interpolative import svd as svdI
 from scipy.sparse.linalg import aslinearoperator
 from scipy.sparse.linalg import LinearOperator
 from scipy.sparse.linalg import svds
@@ -37,9 +36,14 @@ def matrixProductLinearOperator(matrix1, matrix2):
         return np.dot(matrix1, np.dot(matrix2, m))
 
     def rmatvec(v):
-        return np.dot(np.transpose(matrix2), np.dot(np.transpose(matrix1), v))
+        return np.dot(adjoint(matrix2), np.dot(adjoint(matrix1), v))
 
-    return LinearOperator(shape, matvec=matvec, matmat=matmat, rmatvec=rmatvec)
+    def rmatmat(m):
+        return np.dot(adjoint(matrix2), np.dot(adjoint(matrix1), m))
+
+    return LinearOperator(shape, matvec=matvec, matmat=matmat,
+                          rmatvec=rmatvec, rmatmat=rmatmat,
+                          dtype=np.result_type(matrix1, matrix2))
 
 
 def compareSVD(matrix, u, s, v):
@@ -86,6 +90,193 @@ def sortSVD(decomp):
     return ret
 
 
+def applyMatrix(matrix, x):
+    '''
+    Returns the product of matrix with the 1D or 2D array x.
+    The matrix may be either an array or a LinearOperator.
+    '''
+    if isinstance(matrix, LinearOperator):
+        if len(x.shape) == 1:
+            return matrix.matvec(x)
+        return matrix.matmat(x)
+    return np.dot(matrix, x)
+
+
+def applyAdjoint(matrix, x):
+    '''
+    Returns the product of the adjoint of matrix with the 1D or 2D array x.
+    The matrix may be either an array or a LinearOperator.
+    '''
+    if isinstance(matrix, LinearOperator):
+        if len(x.shape) == 1:
+            return matrix.rmatvec(x)
+        return matrix.rmatmat(x)
+    return np.dot(adjoint(matrix), x)
+
+
+def gaussianSamples(matrix, shape):
+    '''
+    Returns Gaussian random samples of the given shape with the real precision of matrix,
+    so that sketching a single precision matrix does not promote it to double precision.
+    '''
+    return np.random.randn(*shape).astype(np.finfo(matrix.dtype).dtype)
+
+
+def randomizedRangeFinder(matrix, precision, maxRank=None):
+    '''
+    This method computes an orthonormal basis Q for the range of matrix such that
+    the relative squared Frobenius error of the projection QQ^adjoint matrix is at
+    most precision. The basis is grown adaptively in blocks of random samples,
+    each of which is refined by power iterations, and the error is estimated
+    a-posteriori from a separate set of Gaussian probe vectors. The matrix is never
+    reconstructed, so it may be supplied as a LinearOperator.
+
+    The arguments are:
+            matrix		-	A 2D array or LinearOperator.
+            precision	-	The target relative squared Frobenius error.
+            maxRank		-	The number of basis vectors beyond which the search
+                                    is abandoned. Defaults to the full rank of the matrix.
+
+    Returns the basis Q and the estimated error. If the error exceeds precision the
+    search was abandoned upon reaching maxRank.
+    '''
+    m, n = matrix.shape
+    if maxRank is None:
+        maxRank = min(m, n)
+
+    # The probe vectors are independent of the sketch, so the ratio of the probed
+    # residual to the probed norm is an unbiased estimate of the relative error.
+    probes = applyMatrix(matrix, gaussianSamples(matrix, (n, config.svdProbes)))
+    norm = np.sum(np.abs(probes)**2)
+    if norm == 0:
+        return np.zeros((m, 0), dtype=matrix.dtype), 0.
+
+    # Samples smaller than this are indistinguishable from rounding error.
+    cutoff = 1e3 * np.finfo(probes.dtype).eps * np.sqrt(norm / config.svdProbes)
+
+    q = np.zeros((m, 0), dtype=probes.dtype)
+    block = config.svdBlockSize
+    error = 1.
+    while error > precision and q.shape[1] < maxRank:
+        block = min(block, maxRank - q.shape[1])
+        # Each application of the matrix is followed by projecting out the existing
+        # basis, so the power iterations act on the part of the spectrum not yet
+        # captured.
+        y = applyMatrix(matrix, gaussianSamples(matrix, (n, block)))
+        y -= np.dot(q, np.dot(adjoint(q), y))
+        for _ in range(config.svdPowerIterations):
+            y, _ = np.linalg.qr(y)
+            z, _ = np.linalg.qr(applyAdjoint(matrix, y))
+            y = applyMatrix(matrix, z)
+            y -= np.dot(q, np.dot(adjoint(q), y))
+
+        # The second projection restores orthogonality lost to cancellation.
+        # Samples which are zero to working precision are then dropped, and what
+        # remains is projected once more because normalisation amplifies whatever
+        # overlap survived.
+        y -= np.dot(q, np.dot(adjoint(q), y))
+        y, r = np.linalg.qr(y)
+        y = y[:, np.abs(np.diag(r)) > cutoff]
+        if y.shape[1] == 0:
+            break
+        y -= np.dot(q, np.dot(adjoint(q), y))
+        y, _ = np.linalg.qr(y)
+
+        q = np.concatenate((q, y), axis=1)
+        probes -= np.dot(y, np.dot(adjoint(y), probes))
+        error = np.sum(np.abs(probes)**2) / norm
+        block *= 2
+
+    return q, error
+
+
+def svdRandomized(matrix, precision, compute_uv, maxRank=None):
+    '''
+    This method computes the SVD of a matrix to the specified relative precision
+    using an adaptive randomized range finder. The matrix may be either a 2D array
+    or a LinearOperator. Returns None if the range finder reaches maxRank before
+    attaining the requested precision.
+
+    The arguments are as in svdByPrecision, with maxRank as in randomizedRangeFinder.
+    '''
+    q, error = randomizedRangeFinder(matrix, precision, maxRank=maxRank)
+
+    if error > precision:
+        logger.debug('Randomized range finder did not reach required precision. Actual: ' +
+                     str(error) + '. Requested: ' + str(precision) + '.')
+        return None
+
+    if q.shape[1] == 0:
+        # The matrix is zero, so any normalized vectors will do.
+        q = np.zeros((matrix.shape[0], 1), dtype=matrix.dtype)
+        q[0] = 1
+
+    b = adjoint(applyAdjoint(matrix, q))
+    decomp = svd(b, full_matrices=False, compute_uv=compute_uv)
+    if compute_uv:
+        u, s, v = decomp
+        decomp = (np.dot(q, u), s, v)
+
+    return decomp
+
+
+def svdGram(matrix, precision, compute_uv):
+    '''
+    This method computes the SVD of a strongly rectangular matrix to the specified
+    relative precision by diagonalising its small Gram matrix. The singular vectors
+    on the long side are then recovered with a single matrix product. When the
+    retained spectrum is wide enough that squaring it would cost orthogonality beyond
+    the requested precision, those vectors are re-orthogonalised by a QR factorisation.
+
+    Returns None if the precision requested is below what the Gram matrix resolves, or
+    if the matrix is zero to rounding error.
+
+    The arguments are as in svdByPrecision.
+    '''
+    if matrix.shape[0] < matrix.shape[1]:
+        decomp = svdGram(adjoint(matrix), precision, compute_uv)
+        if decomp is None or not compute_uv:
+            return decomp
+        u, s, v = decomp
+        return adjoint(v), s, adjoint(u)
+
+    eps = np.finfo(matrix.dtype).eps
+    n = matrix.shape[1]
+
+    # Eigenvalues of the Gram matrix below this are indistinguishable from
+    # rounding error, so discarding them costs at most n times this much weight.
+    if precision < n**2 * eps:
+        return None
+
+    w, vecs = np.linalg.eigh(np.dot(adjoint(matrix), matrix))
+    w = w[::-1]
+    vecs = vecs[:, ::-1]
+
+    # A zero matrix has no spectrum to take the precision relative to, and its singular
+    # vectors cannot be recovered by dividing by its singular values.
+    if w[0] <= 0:
+        return None
+
+    k = max(1, np.sum(w > n * eps * w[0]))
+    s = np.sqrt(w[:k])
+    vecs = vecs[:, :k]
+
+    if not compute_uv:
+        return s
+
+    u = np.dot(matrix, vecs)
+    if (s[-1] / s[0])**2 < eps / precision:
+        q, r = np.linalg.qr(u)
+        ur, s, vr = svd(r)
+        u = np.dot(q, ur)
+        v = np.dot(vr, adjoint(vecs))
+    else:
+        u /= s[np.newaxis, :]
+        v = adjoint(vecs)
+
+    return u, s, v
+
+
 def svdByPrecision(matrix, precision, compute_uv):
     '''
     This method wraps various SVD methods to provide a unified interface for computing the
@@ -93,7 +284,7 @@ def svdByPrecision(matrix, precision, compute_uv):
     descending order, which some solvers do not guarantee.
 
     The arguments are:
-            matrix		-	A 2D array
+            matrix		-	A 2D array or a LinearOperator
             precision	-	This is a float in the range [0,1) specifying
                                     the relative precision of the desired decomposition.
             compute_uv	-	A bool specifying whether or not to compute the matrices
@@ -101,13 +292,15 @@ def svdByPrecision(matrix, precision, compute_uv):
                                     intrinsically compute all of these, so when those are used
                                     this just determines whether or not U and V are returned.
 
-    For small matrices the default is to use the dense SVD implementation found in NumPy.
-    For larger matrices iterative methods are tried first and compared against the desired precision.
-    These may be applied repeatedly with different arguments until either the decomposition converges,
-    an error is found, or it becomes more performant to move on to another method.
-    Large matrices then fall back on the dense SVD.
+    Strongly rectangular matrices are decomposed through the eigendecomposition of their
+    small Gram matrix, provided the precision requested is one it can resolve.
+    Otherwise for small matrices the default is to use the dense SVD implementation found in NumPy.
+    For larger matrices and for LinearOperators an adaptive randomized SVD is tried first.
+    This grows its sketch until an a-posteriori estimate of the error meets the requested
+    precision. Once the sketch grows past the bond cutoff the dense SVD becomes more
+    performant, so large matrices then fall back on it.
 
-    The cutoff between large and small here is specified in the config file.
+    The cutoffs here are specified in the config file.
     '''
     if precision < 0:
         raise ValueError(
@@ -119,58 +312,53 @@ def svdByPrecision(matrix, precision, compute_uv):
             'Precision cannot be greater than 1. Specified: ' +
             str(precision) +
             '.')
+
+    if isinstance(matrix, LinearOperator):
+        # Operators are only formed explicitly if the randomized decomposition
+        # runs to full rank without meeting the requested precision.
+        decomp = svdRandomized(matrix, precision, compute_uv)
+        if decomp is not None:
+            return sortSVD(decomp)
+        matrix = applyMatrix(matrix, np.identity(
+            matrix.shape[1], dtype=matrix.dtype))
+
     if np.sum(1 - np.isfinite(matrix)) > 0:
         raise ValueError(
             'Cannot decompose a matrix with infinite or NaN elements.')
 
+    decomp = None
+
+    # Strongly rectangular matrices are most cheaply handled through their Gram
+    # matrix.
+    if max(matrix.shape) >= config.svdGramRatio * min(matrix.shape):
+        decomp = svdGram(matrix, precision, compute_uv)
+
     # The dense decomposition is more efficient for small matrices.
-    if matrix.size < config.svdCutoff:
-        decomp = svd(matrix, full_matrices=False, compute_uv=compute_uv)
-    else:
-        # First try the interpolative decomposition SVD. This typically
-        # performs very well.
+    if decomp is None and matrix.size >= config.svdCutoff and precision > 0:
+        maxRank = int(config.svdBondCutoff * min(matrix.shape))
         try:
-            u, s, v = svdI(matrix, precision)
-            v = np.conjugate(np.transpose(v))
-            tries = 0
-            error = compareSVD(matrix, u, s, v)
-
-            # If the error is not below the requested precision, try again with
-            # an artificially more precise request.
-            while error > precision and tries < config.svdTries:
-                logger.debug(
-                    'Interpolative SVD did not reach required precision. Actual: ' +
-                    str(error) +
-                    '. Requested: ' +
-                    str(precision) +
-                    '. Retrying with more precise request.')
-                tries += 1
-                u, s, v = svdI(matrix, precision / 2**tries)
-                v = np.conjugate(np.transpose(v))
-                error = compareSVD(matrix, u, s, v)
-
-            if error > precision:
-                # Getting to this stage means the interpolative decomposition just isn't working.
-                # We now fall back on the dense decomposition.
-                decomp = svd(
-                    matrix,
-                    full_matrices=False,
-                    compute_uv=compute_uv)
-            else:
-                if compute_uv:
-                    decomp = (u, s, v)
-                else:
-                    decomp = s
+            decomp = svdRandomized(
+                matrix, precision, compute_uv, maxRank=maxRank)
+        except np.linalg.LinAlgError:
+            decomp = None
 
-        except BaseException:
-            # Means the SVD has raised an error so we fall back on the dense
-            # one.
-            decomp = svd(matrix, full_matrices=False, compute_uv=compute_uv)
+    if decomp is None:
+        decomp = svd(matrix, full_matrices=False, compute_uv=compute_uv)
 
     decomp = sortSVD(decomp)
     return decomp
 
 
+def denseByPrecision(matrix, precision):
+    '''
+    Returns True if svdByPrecision decomposes the matrix with the dense SVD of NumPy,
+    and so would return the same decomposition as svd(matrix, full_matrices=False).
+    '''
+    if max(matrix.shape) >= config.svdGramRatio * min(matrix.shape):
+        return False
+    return matrix.size < config.svdCutoff or precision == 0
+
+
 def svdByRank(matrix, rank, compute_uv):
     '''
     This method wraps various SVD methods to provide a unified interface. It returns the SVD
@@ -215,6 +403,25 @@ def svdByRank(matrix, rank, compute_uv):
     return decomp
 
 
+def rankByPrecision(s, precision, maxRank=None):
+    '''
+    Returns the number of leading singular values s (sorted in descending order) to keep
+    so that the discarded ones carry at most a fraction precision of the total squared
+    weight. If maxRank is specified at most that many are kept. At least one is always kept.
+    '''
+    p = np.abs(s)**2
+    total = np.sum(p)
+    if total == 0:
+        return 1
+
+    # Cumulative weight of the smallest values, which are the ones discarded first.
+    tail = np.cumsum(p[::-1]) / total
+    rank = len(s) - np.searchsorted(tail, precision, side='right')
+    if maxRank is not None:
+        rank = min(rank, maxRank)
+    return max(1, int(rank))
+
+
 def entropy(array, pref=None, tol=1e-3):
     '''
     This method determines the best pair of indices to split off.
@@ -299,7 +506,7 @@ def entropy(array, pref=None, tol=1e-3):
             mat = np.copy(arr)
             if arr.shape[0] > arr.shape[1]:
                 mat = np.transpose(mat)
-            mat = np.dot(mat, np.transpose(mat))
+            mat = np.dot(mat, adjoint(mat))
 
             # If the bond dimension is too large, full SVD is required.
             lams = svdByRank(mat, bondDimension, False)
@@ -351,9 +558,11 @@ def entropy(array, pref=None, tol=1e-3):
     return list(indexLists[liveIndices[0]])
 
 
-def splitArray(array, indices, accuracy=1e-4):
-    perm = []
-
+def splitMatrix(array, indices):
+    '''
+    Returns array reshaped into a matrix whose rows run over the specified indices and
+    whose columns run over the rest, along with the shapes and indices of each side.
+    '''
     sh1 = [array.shape[i] for i in indices]
     sh2 = [array.shape[i] for i in range(len(array.shape)) if i not in indices]
     indices1 = list(indices)
@@ -361,8 +570,16 @@ def splitArray(array, indices, accuracy=1e-4):
 
     arr = permuteIndices(array, indices)
     arr = np.reshape(arr, (np.product(sh1), np.product(sh2)))
-    u, lam, v = svdByPrecision(arr, accuracy, True)
 
+    return arr, sh1, sh2, indices1, indices2
+
+
+def splitFactors(u, lam, v, sh1, sh2, accuracy=1e-4):
+    '''
+    Truncates the SVD of a matrix from splitMatrix to the specified accuracy and returns
+    the two factors, each carrying the square root of the singular values and reshaped
+    to its side of the split.
+    '''
     p = lam**2
     p /= np.sum(p)
     cp = np.cumsum(p)
@@ -380,4 +597,11 @@ def splitArray(array, indices, accuracy=1e-4):
     u = np.reshape(u, sh1 + [ind])
     v = np.reshape(v, [ind] + sh2)
 
+    return u, v
+
+
+def splitArray(array, indices, accuracy=1e-4):
+    arr, sh1, sh2, indices1, indices2 = splitMatrix(array, indices)
+    u, lam, v = svdByPrecision(arr, accuracy, True)
+    u, v = splitFactors(u, lam, v, sh1, sh2, accuracy=accuracy)
     return u, v, indices1, indices2
@@ -25,8 +25,18 @@ levels['tensor'] = 'debug'
 levels['compress'] = 'debug'
 levels['arrayTensor'] = 'debug'
 levels['traceMin'] = 'debug'
+levels['memory'] = 'debug'
+levels['loopOpt'] = 'info'
 
 levels['mergeContractor'] = 'info'
+levels['sliceContractor'] = 'info'
+levels['hotrg'] = 'info'
+levels['loopTNR'] = 'info'
+levels['ctmrg'] = 'info'
+levels['boundaryMPS'] = 'info'
+levels['transferMatrix'] = 'info'
+levels['cylinder'] = 'info'
+levels['finiteSize'] = 'info'
 levels['generic'] = 'info'
 
 # Run parameters
@@ -36,19 +46,68 @@ runParams = {}
 
 runParams['svdCutoff'] = 1e3
 
-# Determines the maximum number of attempts for the interpolative SVD.
+# Determines the initial number of samples drawn by the randomized SVD. This
+# doubles with each round until the requested precision is reached.
 
-runParams['svdTries'] = 4
+runParams['svdBlockSize'] = 8
+
+# Determines the number of power iterations used to refine each block of samples
+# in the randomized SVD.
+
+runParams['svdPowerIterations'] = 1
+
+# Determines the number of probe vectors used to estimate the error of the
+# randomized SVD.
+
+runParams['svdProbes'] = 10
 
 # Determines the maximum bond dimension for using sparse SVD. Written as a
 # fraction of the matrix rank.
 
 runParams['svdBondCutoff'] = 0.1
 
+# Determines the aspect ratio beyond which matrices are decomposed through
+# the eigendecomposition of their Gram matrix.
+
+runParams['svdGramRatio'] = 4
+
 # Sets an upper bound on memory usage
 
 runParams['mem_limit'] = 2**33
 
+# Sets the number of the heuristic's best merges checked against the memory budget when
+# its first choice does not fit, before every merge in the network is checked.
+
+runParams['admissibleCandidates'] = 16
+
+# Sets the default element type of newly constructed tensors. Must be one of
+# float32, float64, complex64 or complex128. Real inputs are cast to this type,
+# while complex inputs are cast to the complex type of the same precision.
+
+runParams['dtype'] = 'float64'
+
+# Sets the number of resident tensor bytes beyond which the least recently used
+# tensors are spilled to memory-mapped files in spillDir. None disables spilling.
+# If spillDir is None a temporary directory is used.
+
+runParams['spillLimit'] = None
+runParams['spillDir'] = None
+
+# Sets the number of bytes beyond which pairwise contractions are tiled, as well as
+# the bytes of temporaries each tile may use, and the number of threads the tiles
+# run on. If contractThreads is None it defaults to the number of processors.
+
+runParams['contractChunkBytes'] = 2**28
+runParams['contractThreads'] = None
+
+# Sets the number of contraction recipes kept for each of tensordot and einsum.
+
+runParams['planCacheSize'] = 4096
+
+# Sets the number of merge results mergeContractor keeps for reuse by identical merges.
+
+runParams['mergeMemoSize'] = 1024
+
 # Read config file if possible
 
 home = str(Path.home())
@@ -64,6 +123,27 @@ if config_file.is_file():
 			runParams[key] = data['runParams'][key]
 
 svdCutoff = int(runParams['svdCutoff'])
-svdTries = int(runParams['svdTries'])
+svdBlockSize = int(runParams['svdBlockSize'])
+svdPowerIterations = int(runParams['svdPowerIterations'])
+svdProbes = int(runParams['svdProbes'])
 svdBondCutoff = float(runParams['svdBondCutoff'])
-mem_limit = int(runParams['mem_limit'])
\ No newline at end of file
+svdGramRatio = float(runParams['svdGramRatio'])
+mem_limit = int(runParams['mem_limit'])
+admissibleCandidates = int(runParams['admissibleCandidates'])
+
+spillLimit = runParams['spillLimit']
+if spillLimit is not None:
+	spillLimit = int(spillLimit)
+spillDir = runParams['spillDir']
+
+contractChunkBytes = int(runParams['contractChunkBytes'])
+contractThreads = runParams['contractThreads']
+if contractThreads is not None:
+	contractThreads = int(contractThreads)
+
+planCacheSize = int(runParams['planCacheSize'])
+mergeMemoSize = int(runParams['mergeMemoSize'])
+
+dtype = str(runParams['dtype'])
+if dtype not in ('float32', 'float64', 'complex64', 'complex128'):
+	raise ValueError('Unsupported dtype ' + dtype + ' in configuration.')
\ No newline at end of file